@@ -1,9 +1,12 @@
-from src.app.services.auth_service import AuthService
-from src.app.services.account_service import AccountService
-from src.app.services.prediction_service import PredictionService
+from src.app.services.auth_service import AuthService, AsyncAuthService
+from src.app.services.account_service import AccountService, AsyncAccountService
+from src.app.services.prediction_service import PredictionService, AsyncPredictionService
 
 __all__ = [
     "AuthService",
     "AccountService",
-    "PredictionService"
-]
\ No newline at end of file
+    "PredictionService",
+    "AsyncAuthService",
+    "AsyncAccountService",
+    "AsyncPredictionService",
+]
@@ -1,32 +1,41 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
 from src.app.api.schemas import Balance, TopUp, TransactionOut
-from src.app.api.deps import get_current_user, get_account_service
-from src.app.services.account_service import AccountService
-from src.app.domain.user import Client
+from src.app.api.deps import get_principal, get_account_service
+from src.app.services.account_service import AsyncAccountService
+from src.app.services.admission import admission
+from src.app.domain.user import Principal
 
 
 router = APIRouter(prefix="/account", tags=["Account"])
 
 @router.get("/balance", response_model=Balance)
-def balance(user: Client = Depends(get_current_user)):
-    return Balance(balance=user.account.balance)
+async def balance(
+    user: Principal = Depends(get_principal),
+    svc: AsyncAccountService = Depends(get_account_service),
+):
+    # баланс не кэшируется: его меняет и воркер
+    acc = await svc.balance(user.account_id)
+    return Balance(balance=acc.balance, reserved=acc.reserved)
 
 
 @router.post("/top-up", response_model=Balance, status_code=201)
-def top_up(
+async def top_up(
     top: TopUp,
-    user: Client = Depends(get_current_user),
-    svc: AccountService = Depends(get_account_service),
+    user: Principal = Depends(get_principal),
+    svc: AsyncAccountService = Depends(get_account_service),
 ):
-    new_balance = svc.deposit(user.account.id, top.amount, top.reason)
-    updated_txs = svc.history(user.account.id)
+    new_balance = await svc.deposit(user.account_id, top.amount, top.reason)
+    # снимок баланса допуска пополнения не видит — следующая джоба перечитает счёт
+    admission.invalidate_balance(user.account_id)
     return Balance(balance=new_balance)
 
 
 @router.get("/transactions", response_model=list[TransactionOut])
-def history(
-    user = Depends(get_current_user),
-    svc: AccountService = Depends(get_account_service),
+async def history(
+    limit: int = Query(50, ge=1, le=500),
+    before_id: int | None = Query(None, ge=1),
+    user: Principal = Depends(get_principal),
+    svc: AsyncAccountService = Depends(get_account_service),
 ):
-    return svc.history(user.account.id)
\ No newline at end of file
+    return await svc.history(user.account_id, limit=limit, before_id=before_id)
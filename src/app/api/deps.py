@@ -1,23 +1,28 @@
 from datetime import datetime, timedelta, UTC
-from typing import Generator
+import uuid
 
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.app.infra.db import SessionLocal
-from src.app.infra.repositories import UserRepo, AccountRepo
-from src.app.services.auth_service import AuthService
-from src.app.services.account_service import AccountService
+from src.app.infra.db import SessionLocal, AsyncSessionLocal
+from src.app.infra.async_repositories import AsyncUserRepo, AsyncAccountRepo, AsyncPredictionRepo
+from src.app.infra.principal_cache import principals
+from src.app.domain.user import Principal
+from src.app.services.auth_service import AsyncAuthService
+from src.app.services.account_service import AsyncAccountService
+from src.app.services.prediction_service import AsyncPredictionService
 
 import os
 
 SECRET = os.getenv('SECRET')
 ALGO   = os.getenv('ALGO')
 oauth2  = OAuth2PasswordBearer(tokenUrl="/auth/login")
+oauth2_optional = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 
+# sync-сессия (threadpool); API использует get_async_db
 def get_db():
     db = SessionLocal()
     try:
@@ -29,33 +34,90 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except:
+            await db.rollback()
+            raise
+
 # JWT хелперы
 def create_token(user_id: int) -> str:
     payload = {
         "sub": str(user_id),
+        "jti": uuid.uuid4().hex,
         "exp": datetime.now(UTC) + timedelta(hours=12)
     }
     return jwt.encode(payload, SECRET, ALGO)
 
 
-def get_current_user(
-    token: str = Depends(oauth2),
-    db: Session = Depends(get_db)
-):
+def _decode_token(token: str) -> tuple[int, str | None]:
     try:
-        user_id = int(jwt.decode(token, SECRET, algorithms=[ALGO])["sub"])
+        claims = jwt.decode(token, SECRET, algorithms=[ALGO])
+        return int(claims["sub"]), claims.get("jti")
     except (JWTError, KeyError, ValueError):
         raise HTTPException(401, "Invalid token")
-    repo = UserRepo(db)
+
+
+async def _load_user(db: AsyncSession, user_id: int):
     try:
-        return repo.get(user_id)
+        return await AsyncUserRepo(db).get(user_id)
     except ValueError:
         raise HTTPException(404, "User not found")
 
 
+async def get_current_user(
+    token: str = Depends(oauth2),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_id, _ = _decode_token(token)
+    return await _load_user(db, user_id)
+
+
+async def get_principal(
+    token: str = Depends(oauth2),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    Идентичность без обращения к БД, если (user_id, jti) токена уже в кэше.
+    Токены без jti (выданные до его появления) не кэшируются.
+    """
+    user_id, jti = _decode_token(token)
+    if jti is not None:
+        principal = principals.get(user_id, jti)
+        if principal is not None:
+            return principal
+
+    principal = Principal.of(await _load_user(db, user_id))
+    if jti is not None:
+        principals.put(jti, principal)
+    return principal
+
+
+async def get_stream_principal(
+    request: Request,
+    token: str | None = Depends(oauth2_optional),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    Для потоков событий: EventSource в браузере не умеет ставить заголовок
+    Authorization, поэтому кроме Bearer принимается cookie access_token Web UI.
+    """
+    token = token or request.cookies.get("access_token")
+    if not token:
+        raise HTTPException(401, "Not authenticated")
+    return await get_principal(token, db)
+
+
 # сервис-фабрики
-def get_auth_service(db: Session = Depends(get_db)) -> AuthService:
-    return AuthService(UserRepo(db), AccountRepo(db), create_token)
+def get_auth_service(db: AsyncSession = Depends(get_async_db)) -> AsyncAuthService:
+    return AsyncAuthService(AsyncUserRepo(db), create_token)
+
+def get_account_service(db: AsyncSession = Depends(get_async_db)) -> AsyncAccountService:
+    return AsyncAccountService(AsyncAccountRepo(db))
 
-def get_account_service(db: Session = Depends(get_db)) -> AccountService:
-    return AccountService(AccountRepo(db))
\ No newline at end of file
+def get_prediction_service(db: AsyncSession = Depends(get_async_db)) -> AsyncPredictionService:
+    return AsyncPredictionService(AsyncAccountRepo(db), AsyncPredictionRepo(db))
\ No newline at end of file
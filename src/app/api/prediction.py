@@ -1,61 +1,375 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from src.app.api.schemas import PredictionIn, PredictionOut, PredictionShort
-from src.app.api.deps import get_current_user, get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
+from src.app.api.schemas import PredictionIn, PredictionBatchIn, PredictionOut, PredictionShort, PredictionSliceOut, EstimateOut
+from src.app.api.responses import ORJSONResponse
+from src.app.api.deps import get_principal, get_stream_principal, get_async_db, get_prediction_service
+from src.app.domain.user import Principal
 from src.app.infra.mq import enqueue_predict
-from src.app.infra.repositories import AccountRepo, PredictionRepo
-from src.app.services.prediction_service import PredictionService
-import os
+from src.app.infra import blobs, codec, ingest, job_events, scheduling
+from src.app.domain.enums import JobStatus
+from src.app.domain.prediction import JOB_FIELDS, PredictionJob, PredictionSlice
+from src.app.services.prediction_service import AsyncPredictionService, series_rows
+from src.app.services.admission import AdmissionController, Ticket, admission
+import asyncio, math, os
 
 
 router = APIRouter(prefix="/predict", tags=["Prediction"])
-COST_PER_ROW = int(os.getenv("COST_PER_ROW"))
+# пакетная джоба: рядов в запросе и шагов прогноза на ряд — не больше
+PREDICT_BATCH_MAX_SERIES = int(os.getenv("PREDICT_BATCH_MAX_SERIES", "1000"))
+PREDICT_MAX_HORIZON = int(os.getenv("PREDICT_MAX_HORIZON", "100000"))
+
+
+def _rejected(exc: Exception) -> HTTPException:
+    if isinstance(exc, AdmissionController.RateLimited):
+        return HTTPException(status.HTTP_429_TOO_MANY_REQUESTS, str(exc),
+                             headers={"Retry-After": str(max(math.ceil(exc.retry_after), 1))})
+    if isinstance(exc, AdmissionController.NotEnoughCredits):
+        return HTTPException(status.HTTP_402_PAYMENT_REQUIRED, "Not enough credits")
+    return HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(exc).strip("'"))
+
+
+async def _reserve(svc: AsyncPredictionService, db, user: Principal, model_name: str, n_rows: int):
+    # допуск до записи в БД: цена по модели, лимиты пользователя, баланс по кэшу
+    try:
+        ticket = await admission.admit(user.user_id, user.account_id, model_name, n_rows,
+                                       lambda: svc.available_balance(user.account_id))
+    except (AdmissionController.RateLimited, AdmissionController.NotEnoughCredits,
+            AdmissionController.UnknownModel) as exc:
+        raise _rejected(exc)
+
+    # PENDING-запись + холд на оценочную стоимость (проверка средств — в том же UPDATE)
+    try:
+        pending = await svc.create_reserved_job(
+            owner_id=user.user_id,
+            account_id=user.account_id,
+            model_name=model_name,
+            est_cost=ticket.cost,
+        )
+        # фиксируем до публикации, чтобы воркер гарантированно увидел джобу и холд
+        await db.commit()
+    except AsyncPredictionService.NotEnoughCredits:
+        admission.release(ticket)
+        raise HTTPException(status.HTTP_402_PAYMENT_REQUIRED, "Not enough credits")
+    except BaseException:
+        admission.release(ticket)
+        raise
+    admission.bind(ticket, pending.id)
+    return pending, ticket
+
+
+async def _abandon(svc: AsyncPredictionService, db, ticket: Ticket, data_ref: str | None) -> None:
+    admission.release(ticket)
+    await svc.abandon_job(ticket.job_id, "enqueue_failed")
+    await db.commit()
+    if data_ref is not None:
+        await run_in_threadpool(blobs.delete, data_ref)
+
+
+async def _enqueue(message: dict, ticket: Ticket) -> None:
+    # очередь — по размеру джобы, приоритет падает с числом джоб пользователя, уже ждущих в ней;
+    # по числу строк воркер делит большую джобу на части
+    message["rows"] = ticket.n_rows
+    await enqueue_predict(message, n_rows=ticket.n_rows,
+                          priority=scheduling.priority(admission.queued(ticket.user_id) - 1))
+
+
+def _message(pending, user: Principal, model_name: str, series_id: str | None = None) -> dict:
+    message = {
+        "job_id":     pending.id,
+        "user_id":    user.user_id,
+        "account_id": user.account_id,
+        "model":      model_name,
+    }
+    if series_id is not None:
+        message["series_id"] = series_id
+    return message
 
 
 @router.post("/", response_model=PredictionShort, status_code=status.HTTP_202_ACCEPTED)
 async def predict(
     payload: PredictionIn,
-    user = Depends(get_current_user),
-    db   = Depends(get_db),
+    request: Request,
+    user: Principal = Depends(get_principal),
+    db   = Depends(get_async_db),
+    svc: AsyncPredictionService = Depends(get_prediction_service),
 ):
-    # Предварительная оценка и проверка средств
-    est_cost = len(payload.data) * COST_PER_ROW
-    balance = AccountRepo(db).load(user.account.id).balance
-    if balance < est_cost:
-        raise HTTPException(status.HTTP_402_PAYMENT_REQUIRED, "Not enough credits")
+    pending, ticket = await _reserve(svc, db, user, payload.model_name, len(payload.data))
 
-    # Создаём pending-запись
-    pred_repo = PredictionRepo(db)
-    pending = pred_repo.create_pending(owner_id=user.id, model_name=payload.model_name)
+    # крупный датасет — в blob store, в сообщении только ссылка (claim-check)
+    message = _message(pending, user, payload.model_name, payload.series_id)
+    data_ref = None
+    size = int(request.headers.get("content-length") or 0)
+    try:
+        if blobs.CLAIM_CHECK_MIN_BYTES and size >= blobs.CLAIM_CHECK_MIN_BYTES:
+            data_ref = await run_in_threadpool(blobs.put_rows, payload.data)
+            message["data_ref"] = data_ref
+        else:
+            message["data"] = payload.data
+        await _enqueue(message, ticket)
+    except Exception:
+        await _abandon(svc, db, ticket, data_ref)
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Queue is unavailable")
 
-    # Отправляем задачу в очередь
-    await enqueue_predict({
-        "job_id":     pending.id,
-        "user_id":    user.id,
-        "account_id": user.account.id,
-        "model":      payload.model_name,
-        "data":       payload.data,
-    })
+    return pending
+
+
+@router.post("/batch", response_model=PredictionShort, status_code=status.HTTP_202_ACCEPTED)
+async def predict_batch(
+    payload: PredictionBatchIn,
+    request: Request,
+    user: Principal = Depends(get_principal),
+    db   = Depends(get_async_db),
+    svc: AsyncPredictionService = Depends(get_prediction_service),
+):
+    """
+    Несколько именованных рядов одной джобой: у каждого свой horizon (по умолчанию —
+    число его валидных строк). Одна запись джобы, один холд и одно списание на весь
+    запрос; результат — в поле series по именам рядов.
+    """
+    names = [s.name for s in payload.series]
+    if not names or len(names) > PREDICT_BATCH_MAX_SERIES:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            f"Expected 1..{PREDICT_BATCH_MAX_SERIES} series")
+    if len(set(names)) != len(names):
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, "Series names must be unique")
+    if any(s.horizon is not None and s.horizon > PREDICT_MAX_HORIZON for s in payload.series):
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, f"horizon must be <= {PREDICT_MAX_HORIZON}")
+
+    # ряд оплачивается по длине истории или горизонту, что больше: прогноз на 100k шагов — не 2 строки
+    n_rows = sum(series_rows(len(s.data), s.horizon) for s in payload.series)
+    pending, ticket = await _reserve(svc, db, user, payload.model_name, n_rows)
+
+    message = _message(pending, user, payload.model_name)
+    series = [s.model_dump() for s in payload.series]
+    data_ref = None
+    size = int(request.headers.get("content-length") or 0)
+    try:
+        if blobs.CLAIM_CHECK_MIN_BYTES and size >= blobs.CLAIM_CHECK_MIN_BYTES:
+            data_ref = await run_in_threadpool(blobs.put_rows, series)
+            message.update(data_ref=data_ref, data_format="series")
+        else:
+            message["series"] = series
+        await _enqueue(message, ticket)
+    except Exception:
+        await _abandon(svc, db, ticket, data_ref)
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Queue is unavailable")
 
     return pending
 
 
+def _count_arrow_rows(data_ref: str) -> int:
+    with blobs.open_file(data_ref) as f:
+        return ingest.count_arrow_rows(f)
+
+
+@router.post("/bulk", response_model=PredictionShort, status_code=status.HTTP_202_ACCEPTED)
+async def predict_bulk(
+    request: Request,
+    model_name: str = Query(..., min_length=1),
+    series_id: str | None = Query(None, min_length=1, max_length=128),
+    user: Principal = Depends(get_principal),
+    db   = Depends(get_async_db),
+    svc: AsyncPredictionService = Depends(get_prediction_service),
+):
+    """
+    Датасет телом запроса, формат — по Content-Type: application/x-ndjson (строка
+    датасета на строку; по умолчанию), text/csv (с заголовком) или
+    application/vnd.apache.arrow.stream (Arrow IPC). Тело не собирается в памяти и не
+    проходит через Pydantic: по мере чтения пишется в blob store, CSV и Arrow воркер
+    валидирует сразу колонками.
+    """
+    fmt = ingest.bulk_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            f"Supported types: {', '.join(ingest.BULK_FORMATS)}")
+    # очередь пользователя полна — отказ до приёма тела
+    try:
+        admission.check_queue(user.user_id)
+    except AdmissionController.RateLimited as exc:
+        raise _rejected(exc)
+    counter = ingest.LineCounter()
+
+    async def body():
+        async for chunk in request.stream():
+            yield counter.feed(chunk) if fmt != "arrow" else chunk
+
+    try:
+        data_ref = await blobs.put_async(body(), suffix=fmt)
+    except ClientDisconnect:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Upload interrupted")
+
+    # строки для оценки стоимости: NDJSON/CSV — по переводам строк, Arrow — по пачкам потока
+    if fmt == "arrow":
+        try:
+            n_rows = await run_in_threadpool(_count_arrow_rows, data_ref)
+        except ingest.IngestError as exc:
+            await run_in_threadpool(blobs.delete, data_ref)
+            raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(exc))
+    else:
+        n_rows = counter.close() - (fmt == "csv")
+    if n_rows <= 0:
+        await run_in_threadpool(blobs.delete, data_ref)
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, "Empty dataset")
+    try:
+        pending, ticket = await _reserve(svc, db, user, model_name, n_rows)
+    except Exception:
+        await run_in_threadpool(blobs.delete, data_ref)
+        raise
+
+    try:
+        await _enqueue({**_message(pending, user, model_name, series_id), "data_ref": data_ref, "data_format": fmt}, ticket)
+    except Exception:
+        await _abandon(svc, db, ticket, data_ref)
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Queue is unavailable")
+
+    return pending
+
+
+@router.get("/estimate", response_model=EstimateOut)
+async def estimate(
+    model_name: str = Query(..., min_length=1),
+    rows: int = Query(..., ge=0),
+    user: Principal = Depends(get_principal),
+    svc: AsyncPredictionService = Depends(get_prediction_service),
+):
+    """
+    Стоимость запроса на rows строк (цена строки — по модели) и хватит ли на неё
+    доступного баланса. Джоба не создаётся; фактическое списание — по валидным строкам.
+    """
+    try:
+        est = admission.estimate(model_name, rows)
+    except AdmissionController.UnknownModel as exc:
+        raise _rejected(exc)
+    available = await admission.available(user.account_id, lambda: svc.available_balance(user.account_id))
+    return EstimateOut(model_name=est.model_name, rows=est.n_rows, price_per_row=est.price_per_row,
+                       cost=est.cost, available=available, enough_credits=available >= est.cost,
+                       queued_jobs=admission.queued(user.user_id))
+
+
 @router.get("/history", response_model=list[PredictionShort])
-def history(
-    user = Depends(get_current_user),
-    db   = Depends(get_db),
+async def history(
+    limit: int = Query(50, ge=1, le=500),
+    before_id: int | None = Query(None, ge=1),
+    job_status: JobStatus | None = Query(None, alias="status"),
+    model: str | None = Query(None),
+    user: Principal = Depends(get_principal),
+    svc: AsyncPredictionService = Depends(get_prediction_service),
 ):
-    svc = PredictionService(AccountRepo(db), PredictionRepo(db))
-    return svc.history(user.id)
+    return await svc.history(user.user_id, limit=limit, before_id=before_id, status=job_status, model_name=model)
+
+
+# Server-Sent Events: без буферизации в nginx и кэшей
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {codec.dumps(data).decode()}\n\n"
+
+
+async def _event_stream(sub: job_events.Subscription, first: dict | None = None):
+    """
+    События джоб подписчика. Поток одной джобы (sub.job_id) закрывается после
+    её события; общий — живёт, пока клиент подключён. Пинг-комментарии держат
+    соединение; подписчик, отключённый хабом за переполнение, получает reset.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        if first is not None:
+            yield _sse("job", first)
+            return
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), job_events.JOB_EVENTS_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                event = None
+            if event is not None:
+                yield _sse("job", event)
+                if sub.job_id is not None:
+                    return
+            if sub.overflow and sub.queue.empty():
+                yield _sse("reset", {})
+                return
+            if event is None:
+                yield ": ping\n\n"
+    finally:
+        job_events.hub.unsubscribe(sub)
+
 
+def _event_response(sub: job_events.Subscription, first: dict | None = None) -> StreamingResponse:
+    # background — на случай, если клиент ушёл до первого байта и генератор не стартовал
+    return StreamingResponse(
+        _event_stream(sub, first), media_type="text/event-stream", headers=_SSE_HEADERS,
+        background=BackgroundTask(job_events.hub.unsubscribe, sub),
+    )
 
-@router.get("/{job_id:int}", response_model=PredictionOut)
-def get_job(
+
+@router.get("/events")
+async def events(user: Principal = Depends(get_stream_principal)):
+    """Поток событий о завершении всех джоб пользователя (text/event-stream)."""
+    return _event_response(job_events.hub.subscribe(user.user_id))
+
+
+@router.get("/{job_id:int}/events")
+async def job_events_stream(
     job_id: int,
-    user = Depends(get_current_user),
-    db   = Depends(get_db),
+    user: Principal = Depends(get_stream_principal),
+    svc: AsyncPredictionService = Depends(get_prediction_service),
 ):
-    repo = PredictionRepo(db)
-    job = repo.get(job_id)
-    if job is None or job.owner_id != user.id:
+    """Одно событие — когда джоба завершится (сразу, если уже завершена), затем поток закрывается."""
+    # подписка до чтения статуса: событие между чтением и подпиской не потеряется
+    sub = job_events.hub.subscribe(user.user_id, job_id)
+    try:
+        job = await svc.get_summary(job_id)
+    except BaseException:
+        job_events.hub.unsubscribe(sub)
+        raise
+    if job is None or job.owner_id != user.user_id:
+        job_events.hub.unsubscribe(sub)
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Job not found")
-    return job
\ No newline at end of file
+    first = job_events.event_of(job) if job.status != JobStatus.PENDING else None
+    return _event_response(sub, first)
+
+
+def _job_fields(fields: str | None) -> tuple[str, ...]:
+    if fields is None:
+        return JOB_FIELDS
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in names if f not in JOB_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(JOB_FIELDS)}",
+        )
+    return names
+
+
+def _job_response(job: PredictionJob | PredictionSlice) -> ORJSONResponse:
+    # ответ собирается без валидации схемой: на 100k строк это основная цена запроса
+    if isinstance(job, PredictionSlice):
+        return ORJSONResponse(PredictionSliceOut.fast_dump(job))
+    return ORJSONResponse(PredictionOut.fast_dump(job, predictions=job.payload.predictions_dump()))
+
+
+@router.get("/{job_id:int}", response_model=PredictionOut | PredictionSliceOut)
+async def get_job(
+    job_id: int,
+    offset: int | None = Query(None, ge=0),
+    limit: int | None = Query(None, ge=1, le=100_000),
+    fields: str | None = Query(None, description="через запятую: valid_input, predictions, invalid_rows"),
+    user: Principal = Depends(get_principal),
+    svc: AsyncPredictionService = Depends(get_prediction_service),
+):
+    # без параметров — вся джоба, как раньше; со срезом — счётчики строк и
+    # запрошенные поля в диапазоне [offset, offset + limit)
+    if offset is None and limit is None and fields is None:
+        job = await svc.get_job(job_id)
+    else:
+        job = await svc.get_job_slice(job_id, offset=offset or 0, limit=limit, fields=_job_fields(fields))
+    if job is None or job.owner_id != user.user_id:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Job not found")
+    # распаковка payload и сборка JSON большой джобы — в потоке, не на event loop
+    return await run_in_threadpool(_job_response, job)
+
@@ -0,0 +1,12 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from src.app.infra import codec
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON-ответ через orjson (infra/codec.py): NumPy-массивы — без конвертации в списки."""
+
+    def render(self, content: Any) -> bytes:
+        return codec.dumps(content)
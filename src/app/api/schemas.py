@@ -1,6 +1,6 @@
-from pydantic import BaseModel, conint, ConfigDict
+from pydantic import BaseModel, conint, constr, ConfigDict
 from datetime import datetime
-from typing import List, Any, Tuple
+from typing import Dict, List, Any, Tuple
 from src.app.domain.enums import TxType, JobStatus
 
 class UserCreate(BaseModel):
@@ -13,6 +13,17 @@ class Token(BaseModel):
 
 class Balance(BaseModel):
     balance: int
+    reserved: int = 0
+
+class EstimateOut(BaseModel):
+    model_name: str
+    rows: int
+    price_per_row: int
+    cost: int
+    # доступный баланс (balance - reserved) может отставать на ADMISSION_BALANCE_TTL_S
+    available: int
+    enough_credits: bool
+    queued_jobs: int
 
 class TopUp(BaseModel):
     amount: conint(gt=0)
@@ -21,8 +32,40 @@ class TopUp(BaseModel):
 class PredictionIn(BaseModel):
     model_name: str
     data: List[dict]
+    # ряд клиента: инкрементальные модели дообучаются только на новых точках истории
+    series_id: constr(min_length=1, max_length=128) | None = None
+
+class SeriesIn(BaseModel):
+    name: constr(min_length=1, max_length=128)
+    data: List[dict]
+    # шагов прогноза; по умолчанию — число валидных строк ряда, как у одиночной джобы
+    horizon: conint(gt=0) | None = None
 
-class PredictionOut(BaseModel):
+class PredictionBatchIn(BaseModel):
+    model_name: str
+    series: List[SeriesIn]
+
+class SeriesResultOut(BaseModel):
+    horizon: int
+    predictions: List[float] | None = None
+    n_valid: int
+    n_invalid: int
+    invalid_rows: List[Tuple[int, Any]] = []
+    error: str | None = None
+
+class FastOut(BaseModel):
+    """
+    Схема ответа, который отдаётся и без валидации: fast_dump берёт у доменного
+    объекта поля схемы как есть (списки, NumPy-массивы), JSON собирает orjson.
+    """
+    model_config = ConfigDict(from_attributes=True)
+
+    @classmethod
+    def fast_dump(cls, obj: Any, **overrides: Any) -> Dict[str, Any]:
+        return {name: overrides[name] if name in overrides else getattr(obj, name, field.default)
+                for name, field in cls.model_fields.items()}
+
+class PredictionOut(FastOut):
     id: int
     model_name: str
     predictions: List[Any]
@@ -32,9 +75,24 @@ class PredictionOut(BaseModel):
     created_at: datetime
     status: JobStatus
     error: str | None = None
+    # пакетная джоба: результаты по именам рядов
+    series: Dict[str, SeriesResultOut] | None = None
 
-    class Config:
-        orm_mode = True
+class PredictionSliceOut(FastOut):
+    """Джоба со срезом данных: n_valid/n_invalid — полные счётчики, поля — только запрошенные."""
+    id: int
+    model_name: str
+    cost: int
+    created_at: datetime
+    status: JobStatus
+    error: str | None = None
+    n_valid: int
+    n_invalid: int
+    offset: int
+    limit: int | None = None
+    predictions: List[Any] | None = None
+    valid_input: List[Any] | None = None
+    invalid_rows: List[Tuple[int, Any]] | None = None
 
 class PredictionShort(BaseModel):
     id: int
@@ -46,12 +104,12 @@ class PredictionShort(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 class TransactionOut(BaseModel):
+    id: int | None = None
     amount: int
     tx_type: TxType
     reason: str
     balance_after: int
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
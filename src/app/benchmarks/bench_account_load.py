@@ -0,0 +1,75 @@
+"""
+Латентность AccountRepo.load (материализованный баланс) против
+load_with_history (replay журнала) в зависимости от длины истории.
+
+    python -m src.app.benchmarks.bench_account_load
+
+По умолчанию — SQLite в памяти; BENCH_DATABASE_URL задаёт другую БД.
+"""
+import os, time
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from src.app.domain.enums import TxType
+from src.app.infra.models import Base, ORMUser, ORMAccount, ORMTransaction
+from src.app.infra.repositories import AccountRepo
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite://")
+HISTORY_SIZES = (10, 100, 1_000, 10_000, 50_000)
+REPEATS = 20
+
+
+def _seed(db, n_tx: int) -> int:
+    user = ORMUser(email=f"bench_{n_tx}_{time.time_ns()}@bench", password="x")
+    db.add(user)
+    db.flush()
+    acc = ORMAccount(owner_id=user.id, balance=n_tx, version=n_tx)
+    db.add(acc)
+    db.flush()
+
+    t0 = datetime.now(UTC) - timedelta(days=1)
+    db.execute(insert(ORMTransaction), [
+        {"account_id": acc.id, "amount": 1, "tx_type": TxType.DEPOSIT,
+         "reason": "bench", "balance_after": i + 1, "created_at": t0 + timedelta(milliseconds=i)}
+        for i in range(n_tx)
+    ])
+    db.commit()
+    return acc.id
+
+
+def _timeit(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1e3
+
+
+def main() -> None:
+    engine = create_engine(BENCH_DATABASE_URL)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    print(f"{'history':>8} | {'load, ms':>9} | {'replay, ms':>10}")
+    print("-" * 34)
+    for n in HISTORY_SIZES:
+        with Session() as db:
+            acc_id = _seed(db, n)
+
+        def fast():
+            with Session() as db:
+                assert AccountRepo(db).load(acc_id).balance == n
+
+        def replay():
+            with Session() as db:
+                assert AccountRepo(db).load_with_history(acc_id).balance == n
+
+        print(f"{n:>8} | {_timeit(fast, REPEATS):>9.3f} | "
+              f"{_timeit(replay, max(1, REPEATS // 10)):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Нагрузочное сравнение sync- и async-пути к БД в FastAPI: один и тот же запрос
+(пользователь + страница истории джоб) через def-роут с sync-сессией
+(threadpool) и через async def-роут с AsyncSession (asyncpg).
+
+    python -m src.app.benchmarks.bench_api_db
+
+BENCH_DATABASE_URL — БД для замера (по умолчанию SQLite-файл во временном
+каталоге; реалистичные цифры — на Postgres). Размер пула — DB_POOL_SIZE /
+DB_MAX_OVERFLOW, как у приложения.
+"""
+import asyncio, logging, os, statistics, tempfile, time
+from datetime import datetime, timedelta, UTC
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from src.app.domain.enums import JobStatus
+from src.app.infra.db import _async_url, _pool_kwargs
+from src.app.infra.models import Base, ORMUser, ORMAccount, ORMPredictionJob
+from src.app.infra.repositories import UserRepo, PredictionRepo
+from src.app.infra.async_repositories import AsyncUserRepo, AsyncPredictionRepo
+
+BENCH_DATABASE_URL = os.getenv(
+    "BENCH_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_api_db.sqlite')}"
+)
+CONCURRENCY = tuple(int(c) for c in os.getenv("BENCH_CONCURRENCY", "1,10,50,200").split(","))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "2000"))
+N_JOBS = 500
+PAGE = 20
+
+
+def _seed(Session) -> int:
+    with Session() as db:
+        user = ORMUser(email=f"bench_{time.time_ns()}@bench", password="x")
+        db.add(user)
+        db.flush()
+        db.add(ORMAccount(owner_id=user.id, balance=0))
+        t0 = datetime.now(UTC) - timedelta(days=1)
+        db.execute(insert(ORMPredictionJob), [
+            {"owner_id": user.id, "model_name": "Demo", "valid_input": [], "predictions": [],
+             "invalid_rows": [], "cost": 1, "status": JobStatus.OK, "created_at": t0 + timedelta(seconds=i)}
+            for i in range(N_JOBS)
+        ])
+        db.commit()
+        return user.id
+
+
+def _app(Session, AsyncSession, user_id: int) -> FastAPI:
+    app = FastAPI()
+
+    def sync_db():
+        with Session() as db:
+            yield db
+
+    async def async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    @app.get("/sync")
+    def sync_route(db=Depends(sync_db)):
+        user = UserRepo(db).get(user_id)
+        return {"balance": user.account.balance,
+                "jobs": len(PredictionRepo(db).list_summaries(user_id, limit=PAGE))}
+
+    @app.get("/async")
+    async def async_route(db=Depends(async_db)):
+        user = await AsyncUserRepo(db).get(user_id)
+        return {"balance": user.account.balance,
+                "jobs": len(await AsyncPredictionRepo(db).list_summaries(user_id, limit=PAGE))}
+
+    return app
+
+
+async def _load(client: httpx.AsyncClient, path: str, concurrency: int) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+    remaining = REQUESTS
+
+    async def user() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            t = time.perf_counter()
+            r = await client.get(path)
+            latencies.append(time.perf_counter() - t)
+            r.raise_for_status()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return time.perf_counter() - t0, latencies
+
+
+async def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    engine = create_engine(BENCH_DATABASE_URL, **_pool_kwargs(BENCH_DATABASE_URL))
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    async_url = _async_url(BENCH_DATABASE_URL)
+    async_engine = create_async_engine(async_url, **_pool_kwargs(async_url))
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    app = _app(Session, AsyncSession, _seed(Session))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/sync", "/async"):  # прогрев пулов
+            await _load(client, path, 4)
+
+        print(f"{'conc':>5} | {'path':>6} | {'rps':>8} | {'p50, ms':>8} | {'p95, ms':>8}")
+        print("-" * 48)
+        for conc in CONCURRENCY:
+            for path in ("/sync", "/async"):
+                elapsed, lat = await _load(client, path, conc)
+                lat.sort()
+                p95 = lat[int(len(lat) * 0.95) - 1]
+                print(f"{conc:>5} | {path:>6} | {len(lat) / elapsed:>8.0f} | "
+                      f"{statistics.median(lat) * 1e3:>8.2f} | {p95 * 1e3:>8.2f}")
+
+    await async_engine.dispose()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
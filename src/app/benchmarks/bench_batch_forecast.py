@@ -0,0 +1,112 @@
+"""
+Пакетный прогноз (POST /predict/batch) против джобы на каждый ряд: K рядов по N
+точек проходят путь воркера — PENDING-джоба с холдом, compute, apply (claim,
+списание против холда, mark_ok) — либо K раз, либо одной джобой. Замеряется
+пропускная способность (рядов в секунду) и сколько SQL-запросов и строк БД
+пишет каждый путь. HTTP и RabbitMQ не участвуют: их цена — ещё K запросов и
+K сообщений у пути «ряд на джобу».
+
+    python -m src.app.benchmarks.bench_batch_forecast
+
+BENCH_DATABASE_URL — БД (по умолчанию SQLite-файл во временном каталоге);
+BENCH_BATCH_SERIES — числа рядов через запятую; BENCH_BATCH_ROWS — точек в ряду;
+BENCH_BATCH_HORIZON — горизонт пакетного прогноза.
+"""
+import logging, os, tempfile, time
+
+import numpy as np
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.app.infra.models import Base, ORMUser, ORMAccount
+from src.app.infra.repositories import AccountRepo, PredictionRepo
+from src.app.services.prediction_service import PredictionService, JobRequest, COST_PER_ROW
+
+BENCH_DATABASE_URL = os.getenv(
+    "BENCH_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_batch_forecast.sqlite')}"
+)
+BENCH_SERIES = tuple(int(x) for x in os.getenv("BENCH_BATCH_SERIES", "10,100,500").split(","))
+BENCH_ROWS = int(os.getenv("BENCH_BATCH_ROWS", "120"))
+BENCH_HORIZON = int(os.getenv("BENCH_BATCH_HORIZON", "10"))
+MODELS = ("Demo", "LinearTrend")
+
+
+class _Writes:
+    """Счётчик пишущих запросов и затронутых ими строк."""
+
+    def __init__(self, engine) -> None:
+        self.statements = 0
+        self.rows = 0
+        event.listen(engine, "after_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if statement.lstrip().split(None, 1)[0].upper() in ("INSERT", "UPDATE", "DELETE"):
+            self.statements += 1
+            self.rows += max(cursor.rowcount, 0)
+
+    def reset(self) -> None:
+        self.statements = self.rows = 0
+
+
+def _series(k: int) -> list[dict]:
+    rng = np.random.default_rng(k)
+    stamps = np.datetime_as_string((np.arange(BENCH_ROWS) * 60 + 1_700_000_000).astype("datetime64[s]")).tolist()
+    out = []
+    for i in range(k):
+        prices = (100 + np.cumsum(rng.normal(0, 1, BENCH_ROWS))).tolist()
+        out.append({"name": f"SYM{i}", "data": [{"timestamp": t, "price": p} for t, p in zip(stamps, prices)],
+                    "horizon": BENCH_HORIZON})
+    return out
+
+
+def _job(Session, owner_id: int, account_id: int, model: str, n_rows: int, **req) -> None:
+    with Session() as db:
+        svc = PredictionService(AccountRepo(db), PredictionRepo(db))
+        job = svc.create_reserved_job(owner_id=owner_id, account_id=account_id, model_name=model,
+                                      est_cost=n_rows * COST_PER_ROW)
+        db.commit()
+        outcome = svc.compute(JobRequest(job.id, account_id, model, **req))
+        svc.apply(outcome)
+        db.commit()
+        assert outcome.ok, outcome.error
+
+
+def main() -> None:
+    logging.disable(logging.INFO)
+    engine = create_engine(BENCH_DATABASE_URL)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        user = ORMUser(email=f"bench_{time.time_ns()}@bench", password="x")
+        db.add(user)
+        db.flush()
+        account = ORMAccount(owner_id=user.id, balance=10**12)
+        db.add(account)
+        db.commit()
+        owner_id, account_id = user.id, account.id
+    writes = _Writes(engine)
+
+    print(f"{'model':>12} | {'series':>6} | {'path':>9} | {'jobs':>5} | {'time, s':>8} | {'series/s':>9} | "
+          f"{'statements':>10} | {'rows written':>12}")
+    print("-" * 94)
+    for model in MODELS:
+        for k in BENCH_SERIES:
+            series = _series(k)
+            for path in ("per-job", "batch"):
+                writes.reset()
+                t = time.perf_counter()
+                if path == "per-job":
+                    for s in series:
+                        _job(Session, owner_id, account_id, model, len(s["data"]), raw_rows=s["data"])
+                else:
+                    _job(Session, owner_id, account_id, model, k * BENCH_ROWS, raw_rows=[], series=series)
+                elapsed = time.perf_counter() - t
+                jobs = k if path == "per-job" else 1
+                print(f"{model:>12} | {k:>6} | {path:>9} | {jobs:>5} | {elapsed:>8.3f} | {k / elapsed:>9.0f} | "
+                      f"{writes.statements:>10} | {writes.rows:>12}")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Пропускная способность приёма датасета (строк/с) по форматам тела запроса:
+JSON-список через PredictionIn (POST /predict/) против NDJSON, CSV и Arrow IPC
+(POST /predict/bulk). Разбор — путь воркера от байт payload до входа валидатора
+(строки или колонки), проверка — Validator на этом входе.
+
+    python -m src.app.benchmarks.bench_bulk_ingest
+
+BENCH_INGEST_SIZES — размеры датасетов через запятую.
+"""
+import csv, io, json, logging, os, time
+
+import numpy as np
+import pyarrow as pa
+
+from src.app.api.schemas import PredictionIn
+from src.app.domain.validation import Validator
+from src.app.infra import blobs, ingest
+
+BENCH_SIZES = tuple(int(x) for x in os.getenv("BENCH_INGEST_SIZES", "10000,100000,1000000").split(","))
+
+
+def _dataset(n: int) -> tuple[list, list]:
+    rng = np.random.default_rng(n)
+    secs = rng.permutation(n) * 60 + 1_700_000_000
+    stamps = np.datetime_as_string(secs.astype("datetime64[s]")).tolist()
+    prices = np.round(rng.uniform(10, 1000, n), 2).tolist()
+    return stamps, prices
+
+
+def _payloads(stamps: list, prices: list) -> dict[str, bytes]:
+    rows = [{"timestamp": t, "price": p} for t, p in zip(stamps, prices)]
+    out = {
+        "json": json.dumps({"model_name": "Demo", "data": rows}).encode(),
+        "ndjson": b"".join(blobs.encode_ndjson(rows)),
+    }
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(("timestamp", "price"))
+    writer.writerows(zip(stamps, prices))
+    out["csv"] = buf.getvalue().encode()
+
+    table = pa.table({"timestamp": pa.array(stamps), "price": pa.array(prices, pa.float64())})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as w:
+        w.write_table(table, max_chunksize=ingest.INGEST_BATCH_ROWS)
+    out["arrow"] = sink.getvalue()
+    return out
+
+
+def _parse(fmt: str, body: bytes):
+    if fmt == "json":
+        return PredictionIn.model_validate_json(body).data
+    if fmt == "ndjson":
+        return list(blobs.decode_ndjson([body]))
+    return ingest.read_columns(io.BufferedReader(io.BytesIO(body)), fmt)
+
+
+def _validate(fmt: str, data):
+    if fmt in ("csv", "arrow"):
+        return Validator.validate_columns(data)
+    return Validator.validate(data)
+
+
+def _timeit(fn):
+    t = time.perf_counter()
+    res = fn()
+    return time.perf_counter() - t, res
+
+
+def main() -> None:
+    logging.disable(logging.INFO)
+    print(f"{'rows':>9} | {'format':>6} | {'MB':>6} | {'parse, rows/s':>13} | "
+          f"{'validate, rows/s':>16} | {'total, rows/s':>13}")
+    print("-" * 80)
+    for n in BENCH_SIZES:
+        payloads = _payloads(*_dataset(n))
+        ref = None
+        for fmt, body in payloads.items():
+            t_parse, data = _timeit(lambda: _parse(fmt, body))
+            t_valid, res = _timeit(lambda: _validate(fmt, data))
+            if ref is None:
+                ref = res
+            assert res.valid_rows == ref.valid_rows, fmt
+            print(f"{n:>9} | {fmt:>6} | {len(body) / 2**20:>6.1f} | {n / t_parse:>13,.0f} | "
+                  f"{n / t_valid:>16,.0f} | {n / (t_parse + t_valid):>13,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Большая NDJSON-джоба целиком и частями (WORKER_CHUNK_ROWS): время compute в
+воркере и пиковая память. Целиком — один процесс пула читает payload в список
+dict-строк, валидирует и считает модель; частями — процессы пула читают и
+валидируют свои диапазоны строк, воркер собирает только колонки (время, цена),
+статистики модели по частям ряда считаются снова в пуле и сливаются.
+
+Каждая конфигурация — в отдельном процессе (чистый ru_maxrss): пик RSS процесса
+воркера и самого крупного процесса пула. Прогнозы сравниваются с расчётом
+целиком (относительное расхождение — порядка ошибки округления).
+
+    python -m src.app.benchmarks.bench_chunked_jobs
+
+BENCH_CHUNK_ROWS — строк в джобе; BENCH_CHUNK_PROCESSES — числа процессов пула
+через запятую; BENCH_CHUNK_MODEL — модель. Размер части — WORKER_CHUNK_ROWS.
+"""
+import asyncio, json, logging, os, resource, subprocess, sys, tempfile, time
+
+import numpy as np
+
+BENCH_ROWS = int(os.getenv("BENCH_CHUNK_ROWS", "1000000"))
+BENCH_PROCESSES = tuple(int(x) for x in os.getenv("BENCH_CHUNK_PROCESSES", "1,2,4").split(","))
+BENCH_MODEL = os.getenv("BENCH_CHUNK_MODEL", "Demo")
+
+
+def _rows(n: int) -> list[dict]:
+    rng = np.random.default_rng(n)
+    # время вперемешку: сортировка по времени — часть работы
+    stamps = np.datetime_as_string((rng.permutation(n) * 60 + 1_700_000_000).astype("datetime64[s]")).tolist()
+    prices = np.round(100 + np.cumsum(rng.normal(0, 1, n)), 4).tolist()
+    rows = [{"timestamp": t, "price": p} for t, p in zip(stamps, prices)]
+    for i in rng.choice(n, max(n // 1000, 1), replace=False):
+        rows[i] = {**rows[i], "price": "n/a"}
+    return rows
+
+
+def _peak_mb(who: int) -> float:
+    # ru_maxrss в Linux — КиБ
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def run(data_ref: str, processes: int, out: str) -> None:
+    """Одна конфигурация (WORKER_CHUNK_ROWS — из окружения процесса)."""
+    from src.app.infra import job_payload
+    from src.app.services.prediction_service import JobRequest
+    from src.app.worker.executor import WorkerExecutor, WORKER_CHUNK_ROWS
+
+    logging.disable(logging.INFO)
+    executor = WorkerExecutor(processes=processes)
+    req = JobRequest(1, 1, BENCH_MODEL, [], data_ref=data_ref, n_rows=BENCH_ROWS)
+    t = time.perf_counter()
+    outcome = asyncio.run(executor.compute(req))
+    elapsed = time.perf_counter() - t
+    # пик — до чтения прогнозов для сравнения
+    parent_mb = _peak_mb(resource.RUSAGE_SELF)
+    executor.shutdown()
+    assert outcome.ok, outcome.error
+    payload = job_payload.load(outcome.payload.storage_format, outcome.payload.data, outcome.payload.invalid, [], [], [])
+    np.save(out, np.asarray(payload.predictions(), dtype=np.float64))
+    print(json.dumps({
+        "chunk": WORKER_CHUNK_ROWS, "time": elapsed, "rows": outcome.n_rows,
+        "parent_mb": parent_mb, "child_mb": _peak_mb(resource.RUSAGE_CHILDREN),
+    }))
+
+
+def _child(*args: str, **env: str) -> str:
+    proc = subprocess.run([sys.executable, "-m", __spec__.name, *args], env={**os.environ, **env},
+                          capture_output=True, text=True)
+    if proc.returncode:
+        sys.exit(proc.stderr)
+    return proc.stdout
+
+
+def main() -> None:
+    logging.disable(logging.INFO)
+    # payload — во временном каталоге; процессы конфигураций получают его через окружение
+    tmp = tempfile.mkdtemp(prefix="bench_chunked_")
+    os.environ.update(BLOB_STORE="file", BLOB_DIR=tmp)
+    from src.app.infra import blobs
+
+    # payload пишется в отдельном процессе: Linux наследует ru_maxrss через fork/exec
+    data_ref = _child("--put").strip().splitlines()[-1]
+    chunk = int(os.getenv("WORKER_CHUNK_ROWS", "250000"))
+    configs = [("whole", 0, 1)] + [("chunked", chunk, p) for p in BENCH_PROCESSES]
+
+    print(f"{BENCH_ROWS} rows, model {BENCH_MODEL}, chunk {chunk} rows")
+    print()
+    print(f"{'path':>8} | {'processes':>9} | {'time, s':>8} | {'speedup':>8} | {'worker peak, MB':>15} | "
+          f"{'pool peak, MB':>13} | {'max rel diff':>12}")
+    print("-" * 96)
+    base = ref = None
+    for i, (name, chunk_rows, processes) in enumerate(configs):
+        out = os.path.join(tmp, f"preds_{i}.npy")
+        res = json.loads(_child("--run", data_ref, str(processes), out, WORKER_CHUNK_ROWS=str(chunk_rows))
+                         .strip().splitlines()[-1])
+        preds = np.load(out)
+        base = base or res["time"]
+        ref = preds if ref is None else ref
+        diff = float(np.max(np.abs(preds - ref) / np.maximum(np.abs(ref), 1e-12)))
+        print(f"{name:>8} | {processes:>9} | {res['time']:>8.2f} | {base / res['time']:>7.1f}x | "
+              f"{res['parent_mb']:>15.0f} | {res['child_mb']:>13.0f} | {diff:>12.1e}")
+    blobs.delete(data_ref)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        run(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+    elif len(sys.argv) > 1 and sys.argv[1] == "--put":
+        from src.app.infra import blobs
+        print(blobs.put_rows(_rows(BENCH_ROWS)))
+    else:
+        main()
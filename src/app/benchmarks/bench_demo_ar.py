@@ -0,0 +1,116 @@
+"""
+DemoAR: прежняя реализация (списки, три преобразования в массивы, прогноз на n
+шагов циклом nxt = a + b * prev) против прогноза рекурсии в замкнутой форме —
+по dict-строкам (predict), по колонке цен валидатора (predict_prices) и пачкой
+рядов одной длины (predict_many). Горизонт равен длине истории, как у джобы.
+Проверяется и совпадение с циклом при b ≈ 1, b = 1 и b < 0.
+
+    python -m src.app.benchmarks.bench_demo_ar
+
+BENCH_DEMO_AR_SIZES — горизонты (= длины истории) через запятую;
+BENCH_DEMO_AR_SERIES — число рядов в пачке.
+"""
+import os, statistics, time
+
+import numpy as np
+
+from src.app.infra.ml.demo_ar import DemoAR, ar_forecast
+
+BENCH_SIZES = tuple(int(x) for x in os.getenv("BENCH_DEMO_AR_SIZES", "1000,10000,100000,1000000").split(","))
+BENCH_SERIES = int(os.getenv("BENCH_DEMO_AR_SERIES", "1000"))
+REPEAT = 5
+# относительное расхождение с циклом, которое считаем совпадением
+RTOL = 1e-9
+
+
+def _legacy_predict(rows: list[dict]) -> list[float]:
+    """DemoAR.predict до перехода на замкнутую форму."""
+    n = len(rows)
+    if n == 0:
+        return []
+    y_hist = [float(r["price"]) for r in rows if "price" in r]
+    if len(y_hist) == 0:
+        return []
+    if len(y_hist) == 1:
+        return [y_hist[-1]] * n
+    y1, y2 = y_hist[:-1], y_hist[1:]
+    mx, my = float(np.mean(y1)), float(np.mean(y2))
+    denom = float(np.sum((np.array(y1) - mx) ** 2))
+    if denom == 0.0:
+        return [y_hist[-1]] * n
+    b = float(np.sum((np.array(y1) - mx) * (np.array(y2) - my)) / denom)
+    a = my - b * mx
+    preds: list[float] = []
+    prev = y_hist[-1]
+    for _ in range(n):
+        nxt = a + b * prev
+        preds.append(float(nxt))
+        prev = nxt
+    return preds
+
+
+def _loop(a: float, b: float, last: float, horizon: int) -> np.ndarray:
+    out, prev = [], last
+    for _ in range(horizon):
+        prev = a + b * prev
+        out.append(prev)
+    return np.asarray(out)
+
+
+def _rel_diff(got, ref) -> float:
+    got, ref = np.asarray(got), np.asarray(ref)
+    return float(np.max(np.abs(got - ref) / np.maximum(np.abs(ref), 1e-300)))
+
+
+def _median(fn, repeat: int = REPEAT) -> float:
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def main() -> None:
+    model = DemoAR()
+    rng = np.random.default_rng(0)
+
+    print("recurrence vs loop, horizon 100000:")
+    for a, b in ((1.0, 0.5), (0.05, 0.9995), (1e-3, 1 - 1e-12), (2.0, 1.0), (1e-3, 1 + 1e-9), (3.0, -0.7), (3.0, -1.0)):
+        diff = _rel_diff(ar_forecast(a, b, 100.0, 100_000), _loop(a, b, 100.0, 100_000))
+        print(f"  a={a:<6} b={b!r:<20} max rel diff {diff:.1e}")
+        assert diff < RTOL
+
+    print()
+    print(f"{'horizon':>8} | {'loop, ms':>9} | {'rows, ms':>9} | {'prices, ms':>10} | {'speedup':>8} | {'max rel diff':>12}")
+    print("-" * 73)
+    for n in BENCH_SIZES:
+        # стационарный AR(1) вокруг 100: b заметно меньше 1
+        prices = np.empty(n)
+        prices[0] = 100.0
+        noise = rng.normal(0, 1, n)
+        for i in range(1, n):
+            prices[i] = 100 + 0.9 * (prices[i - 1] - 100) + noise[i]
+        rows = [{"timestamp": str(i), "price": p} for i, p in enumerate(prices.tolist())]
+
+        t_legacy = _median(lambda: _legacy_predict(rows))
+        t_rows = _median(lambda: model.predict(rows))
+        t_prices = _median(lambda: model.predict_prices(prices))
+        diff = _rel_diff(model.predict_prices(prices), _legacy_predict(rows))
+        assert diff < RTOL
+        print(f"{n:>8} | {t_legacy * 1e3:>9.2f} | {t_rows * 1e3:>9.2f} | {t_prices * 1e3:>10.2f} | "
+              f"{t_legacy / t_prices:>7.0f}x | {diff:>12.1e}")
+
+    print()
+    print(f"{'series':>8} | {'len':>6} | {'loop, ms':>9} | {'batch, ms':>9} | {'speedup':>8}")
+    print("-" * 53)
+    for n in (10, 100, 1000):
+        Y = 100 + np.cumsum(rng.normal(0, 1, (BENCH_SERIES, n)), axis=1)
+        t_loop = _median(lambda: [model.predict_prices(y) for y in Y])
+        t_batch = _median(lambda: model.predict_many(Y))
+        np.testing.assert_allclose(model.predict_many(Y), [model.predict_prices(y) for y in Y], rtol=RTOL, atol=1e-9)
+        print(f"{BENCH_SERIES:>8} | {n:>6} | {t_loop * 1e3:>9.2f} | {t_batch * 1e3:>9.2f} | {t_loop / t_batch:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
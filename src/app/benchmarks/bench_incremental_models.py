@@ -0,0 +1,68 @@
+"""
+Инкрементальный режим моделей (series_id): полное обучение predict() против
+advance() — продолжения сохранённого состояния ряда, когда к истории досылается
+одна новая точка. predict — обучение вместе с прогнозом на len(rows) шагов (как
+джоба без series_id), refit — статистики ряда с нуля, append — только новая точка;
+прогноз из состояния линеен по длине выдачи и в append не входит. refit и append
+получают готовую колонку цен, как от валидатора в воркере; append включает проверку
+хэша учтённого префикса цен. В конце — расхождение прогнозов инкрементального
+режима и predict().
+
+    python -m src.app.benchmarks.bench_incremental_models
+
+BENCH_INCREMENTAL_SIZES — длины истории через запятую.
+"""
+import os, statistics, time
+
+import numpy as np
+
+from src.app.infra.ml.demo_ar import DemoAR
+from src.app.infra.ml.lintrend import LinearTrend
+
+BENCH_SIZES = tuple(int(x) for x in os.getenv("BENCH_INCREMENTAL_SIZES", "1000,10000,100000,1000000").split(","))
+REPEAT = 5
+# горизонт для проверки совпадения прогнозов (полный len(rows) не влияет на обучение)
+CHECK_HORIZON = 100
+
+
+def _rows(n: int) -> list[dict]:
+    rng = np.random.default_rng(n)
+    secs = np.arange(n) * 60 + 1_700_000_000
+    stamps = np.datetime_as_string(secs.astype("datetime64[s]")).tolist()
+    prices = (100 + np.cumsum(rng.normal(0, 1, n))).tolist()
+    return [{"timestamp": t, "price": p} for t, p in zip(stamps, prices)]
+
+
+def _median(fn) -> float:
+    times = []
+    for _ in range(REPEAT):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def main() -> None:
+    print(f"{'model':>12} | {'rows':>8} | {'predict, ms':>11} | {'refit, ms':>10} | {'append, ms':>10} | "
+          f"{'speedup':>8} | {'max rel diff':>12}")
+    print("-" * 90)
+    for model in (DemoAR(), LinearTrend()):
+        for n in BENCH_SIZES:
+            rows = _rows(n + 1)
+            history, appended = rows[:-1], rows
+            prices = np.array([r["price"] for r in rows], dtype=np.float64)
+            state = model.advance(None, history, prices[:-1])
+
+            t_predict = _median(lambda: model.predict(appended))
+            t_refit = _median(lambda: model.advance(None, appended, prices))
+            t_append = _median(lambda: model.advance(state, appended, prices))
+
+            full = np.asarray(model.predict(appended)[:CHECK_HORIZON])
+            inc = np.asarray(model.forecast(model.advance(state, appended, prices), CHECK_HORIZON))
+            diff = float(np.max(np.abs(inc - full) / np.maximum(np.abs(full), 1e-12)))
+            print(f"{model.name:>12} | {n:>8} | {t_predict * 1e3:>11.2f} | {t_refit * 1e3:>10.2f} | {t_append * 1e3:>10.3f} | "
+                  f"{t_refit / t_append:>7.0f}x | {diff:>12.1e}")
+
+
+if __name__ == "__main__":
+    main()
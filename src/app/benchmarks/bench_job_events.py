@@ -0,0 +1,135 @@
+"""
+Раздача событий о завершении джоб по SSE (GET /api/predict/events) тысячам
+простаивающих подписчиков. Сервер (uvicorn) — в отдельном процессе; событие
+брокера имитирует служебный маршрут, который вызывает hub.dispatch для каждого
+пользователя, как подписчик RabbitMQ в процессе API. Замеряется память сервера на
+подписчика, его CPU в простое (только пинги) и задержка доставки всем подписчикам.
+
+    python -m src.app.benchmarks.bench_job_events
+
+BENCH_EVENT_SUBSCRIBERS — числа подписчиков через запятую; BENCH_EVENT_IDLE_S —
+длительность простоя для замера CPU. Нужен лимит открытых файлов > числа подписчиков.
+"""
+import asyncio, logging, multiprocessing, os, resource, socket, statistics, time
+
+BENCH_SUBSCRIBERS = tuple(int(x) for x in os.getenv("BENCH_EVENT_SUBSCRIBERS", "1000,5000").split(","))
+BENCH_IDLE_S = float(os.getenv("BENCH_EVENT_IDLE_S", "5"))
+# так часто опрашивал бы GET /predict/{id} каждый из этих клиентов без событий
+POLL_INTERVAL_S = 2
+
+
+def _raise_nofile() -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def _serve(sock: socket.socket) -> None:
+    import uvicorn
+    from fastapi import FastAPI, Request
+
+    from src.app.api import prediction
+    from src.app.api.deps import get_stream_principal
+    from src.app.domain.enums import Role
+    from src.app.domain.user import Principal
+    from src.app.infra import job_events
+
+    _raise_nofile()
+    logging.disable(logging.WARNING)
+    app = FastAPI()
+    app.include_router(prediction.router, prefix="/api")
+
+    def principal(request: Request) -> Principal:
+        uid = int(request.headers["x-bench-user"])
+        return Principal(user_id=uid, role=Role.CLIENT, account_id=uid)
+
+    @app.post("/bench/dispatch")
+    async def dispatch(users: int) -> dict:
+        delivered = sum(job_events.hub.dispatch({"job_id": uid, "owner_id": uid, "status": "OK"})
+                        for uid in range(users))
+        return {"delivered": delivered, "subscribers": len(job_events.hub)}
+
+    app.dependency_overrides[get_stream_principal] = principal
+    uvicorn.Server(uvicorn.Config(app, log_level="warning")).run(sockets=[sock])
+
+
+def _proc_stats(pid: int) -> tuple[float, float]:
+    """(RSS, МБ; CPU процесса, с)."""
+    with open(f"/proc/{pid}/statm") as f:
+        rss = int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return rss, cpu
+
+
+async def _subscriber(port: int, uid: int, n: int, ready: asyncio.Event, started: list, got: dict) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /api/predict/events HTTP/1.1\r\nHost: bench\r\nX-Bench-User: {uid}\r\n\r\n".encode())
+    await writer.drain()
+    buf = b""
+    while b"retry:" not in buf:
+        chunk = await reader.read(4096)
+        if not chunk:
+            raise ConnectionError(f"subscriber {uid}: stream closed before start")
+        buf += chunk
+    started.append(uid)
+    if len(started) == n:
+        ready.set()
+    while b"event: job" not in buf:
+        chunk = await reader.read(4096)
+        if not chunk:
+            return
+        buf += chunk
+    got[uid] = time.perf_counter()
+    writer.close()
+
+
+async def _run(port: int, pid: int, n: int) -> None:
+    import httpx
+
+    rss0, _ = _proc_stats(pid)
+    ready = asyncio.Event()
+    started, got = [], {}
+    tasks = [asyncio.create_task(_subscriber(port, uid, n, ready, started, got)) for uid in range(n)]
+    t = time.perf_counter()
+    await asyncio.wait_for(ready.wait(), 120)
+    t_connect = time.perf_counter() - t
+
+    rss1, cpu0 = _proc_stats(pid)
+    await asyncio.sleep(BENCH_IDLE_S)
+    _, cpu1 = _proc_stats(pid)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as http:
+        t0 = time.perf_counter()
+        r = await http.post("/bench/dispatch", params={"users": n})
+        await asyncio.wait_for(asyncio.gather(*tasks), 120)
+    lat = sorted((ts - t0) * 1e3 for ts in got.values())
+    q = statistics.quantiles(lat, n=100)
+    print(f"{n:>7} | {t_connect:>10.2f} | {(rss1 - rss0) * 1024 / n:>10.1f} | "
+          f"{(cpu1 - cpu0) / BENCH_IDLE_S * 100:>8.2f} | {len(got):>9} | {q[49]:>8.1f} | {q[98]:>8.1f} | "
+          f"{lat[-1]:>8.1f} | {n / POLL_INTERVAL_S:>9,.0f}")
+    assert r.json()["delivered"] == n and len(got) == n
+
+
+def main() -> None:
+    logging.disable(logging.INFO)
+    _raise_nofile()
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    server = multiprocessing.get_context("spawn").Process(target=_serve, args=(sock,), daemon=True)
+    server.start()
+    time.sleep(3)
+    print(f"{'subs':>7} | {'connect, s':>10} | {'KB / sub':>10} | {'idle CPU':>8} | {'delivered':>9} | "
+          f"{'p50, ms':>8} | {'p99, ms':>8} | {'max, ms':>8} | {'poll, rps':>9}")
+    print("-" * 100)
+    try:
+        for n in BENCH_SUBSCRIBERS:
+            asyncio.run(_run(port, server.pid, n))
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Хранение данных джобы: JSON-колонки против payload (Arrow IPC + zstd, bytea).
+Размер строки в БД, время упаковки (в воркере, вне транзакции), записи (mark_ok)
+и чтения: get() с подсчётом строк (ленивый payload не распаковывает поля), get()
+с полной выдачей, как у GET /predict/{id}, и get_slice() — первые SLICE_ROWS прогнозов
+из середины джобы, как у карточки джобы (GET /predict/{id}?offset=&limit=&fields=).
+
+    python -m src.app.benchmarks.bench_job_storage
+
+BENCH_DATABASE_URL — БД для замера (по умолчанию SQLite-файл во временном каталоге;
+реалистичные цифры — на Postgres). BENCH_STORAGE_SIZES — размеры джоб через запятую.
+"""
+import json, logging, os, statistics, tempfile, time
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from src.app.domain.validation import Validator
+from src.app.infra import job_payload
+from src.app.infra.models import Base, ORMUser, ORMPredictionJob
+from src.app.infra.repositories import PredictionRepo
+
+BENCH_DATABASE_URL = os.getenv(
+    "BENCH_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_job_storage.sqlite')}"
+)
+BENCH_SIZES = tuple(int(x) for x in os.getenv("BENCH_STORAGE_SIZES", "1000,100000,1000000").split(","))
+REPEAT = 5
+SLICE_ROWS = 50
+
+
+def _result(n: int):
+    rng = np.random.default_rng(n)
+    secs = np.arange(n) * 60 + 1_700_000_000
+    stamps = np.datetime_as_string(secs.astype("datetime64[s]")).tolist()
+    prices = np.round(rng.uniform(10, 1000, n), 2).tolist()
+    raw = [{"timestamp": t, "price": p} for t, p in zip(stamps, prices)]
+    for i in rng.choice(n, max(n // 100, 1), replace=False):
+        raw[i] = {**raw[i], "price": "n/a"}
+    res = Validator.validate(raw)
+    preds = (np.asarray([r["price"] for r in res.valid_rows]) * 1.01).tolist()
+    return res, preds
+
+
+def _median(fn) -> float:
+    times = []
+    for _ in range(REPEAT):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def main() -> None:
+    logging.disable(logging.INFO)
+    engine = create_engine(BENCH_DATABASE_URL)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        user = ORMUser(email=f"bench_{time.time_ns()}@bench", password="x")
+        db.add(user)
+        db.commit()
+        owner_id = user.id
+
+    print(f"{'rows':>8} | {'format':>10} | {'size, MB':>8} | {'encode, ms':>10} | {'write, ms':>9} | "
+          f"{'get+count, ms':>13} | {'get+all, ms':>11} | {'slice, ms':>9}")
+    print("-" * 101)
+    for n in BENCH_SIZES:
+        res, preds = _result(n)
+        for fmt in (job_payload.JSON, job_payload.ARROW_ZSTD):
+            payload, t_encode = None, 0.0
+            if fmt == job_payload.ARROW_ZSTD:
+                t = time.perf_counter()
+                payload = job_payload.encode(res.valid_rows, preds, res.invalid_rows, prices=res.prices,
+                                             wall_us=res.ts_wall_us, tz_offset_us=res.tz_offset_us)
+                t_encode = time.perf_counter() - t
+
+            with Session() as db:
+                repo = PredictionRepo(db)
+                job_id = repo.create_pending(owner_id=owner_id, model_name="Demo").id
+                db.commit()
+                t = time.perf_counter()
+                repo.mark_ok(job_id, predictions=preds, cost=n, valid_input=res.valid_rows,
+                             invalid_rows=res.invalid_rows, payload=payload)
+                db.commit()
+                t_write = time.perf_counter() - t
+
+                J = ORMPredictionJob
+                size = db.execute(select(
+                    func.coalesce(func.length(J.payload), 0) + func.coalesce(func.length(J.invalid_payload), 0)
+                ).where(J.id == job_id)).scalar_one()
+                if fmt == job_payload.JSON:
+                    job = repo.get(job_id)
+                    size = len(json.dumps([job.valid_input, job.predictions, job.invalid_rows]))
+
+            def get(full: bool) -> None:
+                with Session() as db:
+                    job = PredictionRepo(db).get(job_id)
+                    if full:
+                        job.valid_input, job.predictions, job.invalid_rows
+                    else:
+                        job.n_valid(), job.n_invalid()
+
+            def get_slice() -> None:
+                with Session() as db:
+                    PredictionRepo(db).get_slice(job_id, offset=n // 2, limit=SLICE_ROWS, fields=("predictions",))
+
+            t_count = _median(lambda: get(False))
+            t_all = _median(lambda: get(True))
+            t_slice = _median(get_slice)
+            print(f"{n:>8} | {fmt:>10} | {size / 2**20:>8.2f} | {t_encode * 1e3:>10.1f} | {t_write * 1e3:>9.1f} | "
+                  f"{t_count * 1e3:>13.1f} | {t_all * 1e3:>11.1f} | {t_slice * 1e3:>9.1f}")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Сериализация ответа GET /predict/{id} и сообщений очереди. Ответ джобы (Arrow
+payload из БД, чтение входит в замер) собирается тремя путями: как раньше —
+валидация PredictionOut, model_dump(mode="json") и stdlib json в JSONResponse;
+валидация и model_dump_json() Pydantic; без валидации — PredictionOut.fast_dump
+с прогнозами массивом NumPy и ORJSONResponse. Тела ответов сравниваются после
+разбора. Отдельно — json против orjson (infra/codec.py) на сообщении джобы.
+
+    python -m src.app.benchmarks.bench_json_response
+
+BENCH_DATABASE_URL — БД (по умолчанию SQLite-файл во временном каталоге);
+BENCH_JSON_SIZES — размеры джоб через запятую.
+"""
+import json, logging, os, statistics, tempfile, time
+
+import numpy as np
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app.api.responses import ORJSONResponse
+from src.app.api.schemas import PredictionOut
+from src.app.domain.validation import Validator
+from src.app.infra import codec, job_payload
+from src.app.infra.models import Base, ORMUser
+from src.app.infra.repositories import PredictionRepo
+
+BENCH_DATABASE_URL = os.getenv(
+    "BENCH_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_json_response.sqlite')}"
+)
+BENCH_SIZES = tuple(int(x) for x in os.getenv("BENCH_JSON_SIZES", "1000,100000").split(","))
+REPEAT = 5
+
+
+def _raw(n: int) -> list[dict]:
+    rng = np.random.default_rng(n)
+    secs = np.arange(n) * 60 + 1_700_000_000
+    stamps = np.datetime_as_string(secs.astype("datetime64[s]")).tolist()
+    prices = np.round(rng.uniform(10, 1000, n), 2).tolist()
+    raw = [{"timestamp": t, "price": p} for t, p in zip(stamps, prices)]
+    for i in rng.choice(n, max(n // 100, 1), replace=False):
+        raw[i] = {**raw[i], "price": "n/a"}
+    return raw
+
+
+def _median(fn) -> float:
+    times = []
+    for _ in range(REPEAT):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def _pydantic_json(job) -> bytes:
+    return JSONResponse(PredictionOut.model_validate(job).model_dump(mode="json")).body
+
+
+def _pydantic_dump_json(job) -> bytes:
+    return PredictionOut.model_validate(job).model_dump_json().encode()
+
+
+def _fast_orjson(job) -> bytes:
+    return ORJSONResponse(PredictionOut.fast_dump(job, predictions=job.payload.predictions_dump())).body
+
+
+PATHS = (("pydantic+json", _pydantic_json), ("dump_json", _pydantic_dump_json), ("fast+orjson", _fast_orjson))
+
+
+def main() -> None:
+    logging.disable(logging.INFO)
+    engine = create_engine(BENCH_DATABASE_URL)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        user = ORMUser(email=f"bench_{time.time_ns()}@bench", password="x")
+        db.add(user)
+        db.commit()
+        owner_id = user.id
+
+    print(f"{'rows':>8} | {'path':>13} | {'time, ms':>9} | {'speedup':>8} | {'body, MB':>8}")
+    print("-" * 58)
+    for n in BENCH_SIZES:
+        res = Validator.validate(_raw(n))
+        preds = (np.asarray([r["price"] for r in res.valid_rows]) * 1.01).tolist()
+        payload = job_payload.encode(res.valid_rows, preds, res.invalid_rows, prices=res.prices,
+                                     wall_us=res.ts_wall_us, tz_offset_us=res.tz_offset_us)
+        with Session() as db:
+            repo = PredictionRepo(db)
+            job_id = repo.create_pending(owner_id=owner_id, model_name="Demo").id
+            repo.mark_ok(job_id, predictions=preds, cost=n, valid_input=res.valid_rows,
+                         invalid_rows=res.invalid_rows, payload=payload)
+            db.commit()
+
+        def respond(render) -> bytes:
+            with Session() as db:
+                return render(PredictionRepo(db).get(job_id))
+
+        bodies = [respond(render) for _, render in PATHS]
+        ref = json.loads(bodies[0])
+        for body in bodies[1:]:
+            assert codec.loads(body) == ref
+        base = None
+        for (name, render), body in zip(PATHS, bodies):
+            t = _median(lambda: respond(render))
+            base = base or t
+            print(f"{n:>8} | {name:>13} | {t * 1e3:>9.1f} | {base / t:>7.1f}x | {len(body) / 2**20:>8.2f}")
+
+    print()
+    print(f"{'message rows':>12} | {'json dumps+loads, ms':>20} | {'orjson dumps+loads, ms':>22} | {'speedup':>8}")
+    print("-" * 72)
+    for n in BENCH_SIZES:
+        message = {"job_id": 1, "account_id": 1, "user_id": 1, "model_name": "Demo", "raw_rows": _raw(n)}
+        t_json = _median(lambda: json.loads(json.dumps(message).encode()))
+        t_orjson = _median(lambda: codec.loads(codec.dumps(message)))
+        assert codec.loads(codec.dumps(message)) == message
+        print(f"{n:>12} | {t_json * 1e3:>20.2f} | {t_orjson * 1e3:>22.2f} | {t_json / t_orjson:>7.1f}x")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
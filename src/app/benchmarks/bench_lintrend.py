@@ -0,0 +1,98 @@
+"""
+LinearTrend: прежняя реализация (перебор ключей строки, LinearRegression.fit на
+каждый вызов) против OLS в замкнутой форме на NumPy — по dict-строкам (predict),
+по колонке цен валидатора (predict_prices) и пачкой рядов одной длины
+(predict_many, (k, n) -> (k, n)). Отдельно — время импорта sklearn, которое
+раньше платил каждый процесс воркера.
+
+    python -m src.app.benchmarks.bench_lintrend
+
+BENCH_LINTREND_SIZES — длины рядов через запятую; BENCH_LINTREND_SERIES — число
+рядов в пачке.
+"""
+import os, statistics, subprocess, sys, time
+
+import numpy as np
+
+from src.app.infra.ml.lintrend import LinearTrend
+
+BENCH_SIZES = tuple(int(x) for x in os.getenv("BENCH_LINTREND_SIZES", "10,100,1000,10000,100000,1000000").split(","))
+BENCH_SERIES = int(os.getenv("BENCH_LINTREND_SERIES", "1000"))
+REPEAT = 7
+
+
+def _legacy_predict(rows: list[dict]) -> list[float]:
+    """LinearTrend.predict до перехода на замкнутую форму."""
+    from sklearn.linear_model import LinearRegression
+
+    y: list[float] = []
+    for r in rows:
+        for key in ("price", "value", "target", "close", "y"):
+            v = r.get(key)
+            if isinstance(v, (int, float)):
+                y.append(float(v))
+                break
+        else:
+            nums = [float(v) for v in r.values() if isinstance(v, (int, float))]
+            if nums:
+                y.append(nums[0])
+    n = len(y)
+    if n == 0:
+        return []
+    reg = LinearRegression()
+    reg.fit(np.arange(n).reshape(-1, 1), np.array(y, dtype=float))
+    return [float(v) for v in reg.predict(np.arange(n, n + len(rows)).reshape(-1, 1))]
+
+
+def _median(fn, repeat: int = REPEAT) -> float:
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def _import_time(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout)
+
+
+def main() -> None:
+    model = LinearTrend()
+    rng = np.random.default_rng(0)
+    print(f"import sklearn.linear_model: {_import_time('sklearn.linear_model') * 1e3:.0f} ms, "
+          f"src.app.infra.ml.lintrend: {_import_time('src.app.infra.ml.lintrend') * 1e3:.0f} ms")
+    print()
+    print(f"{'rows':>8} | {'sklearn, ms':>11} | {'rows, ms':>9} | {'prices, ms':>10} | {'speedup':>8} | {'max rel diff':>12}")
+    print("-" * 74)
+    for n in BENCH_SIZES:
+        prices = 100 + np.cumsum(rng.normal(0, 1, n))
+        rows = [{"timestamp": str(i), "price": p} for i, p in enumerate(prices.tolist())]
+
+        t_legacy = _median(lambda: _legacy_predict(rows), 3 if n >= 100_000 else REPEAT)
+        t_rows = _median(lambda: model.predict(rows))
+        t_prices = _median(lambda: model.predict_prices(prices))
+
+        ref = np.asarray(_legacy_predict(rows))
+        got = np.asarray(model.predict_prices(prices))
+        assert model.predict(rows) == got.tolist()
+        diff = float(np.max(np.abs(got - ref) / np.abs(ref)))
+        print(f"{n:>8} | {t_legacy * 1e3:>11.3f} | {t_rows * 1e3:>9.3f} | {t_prices * 1e3:>10.3f} | "
+              f"{t_legacy / t_prices:>7.0f}x | {diff:>12.1e}")
+
+    print()
+    print(f"{'series':>8} | {'len':>6} | {'loop, ms':>9} | {'batch, ms':>9} | {'speedup':>8}")
+    print("-" * 53)
+    for n in (10, 100, 1000):
+        Y = 100 + np.cumsum(rng.normal(0, 1, (BENCH_SERIES, n)), axis=1)
+        t_loop = _median(lambda: [model.predict_prices(y) for y in Y])
+        t_batch = _median(lambda: model.predict_many(Y))
+        np.testing.assert_allclose(model.predict_many(Y), [model.predict_prices(y) for y in Y], rtol=1e-12, atol=1e-9)
+        print(f"{BENCH_SERIES:>8} | {n:>6} | {t_loop * 1e3:>9.2f} | {t_batch * 1e3:>9.2f} | "
+              f"{t_loop / t_batch:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
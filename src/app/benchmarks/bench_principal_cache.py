@@ -0,0 +1,71 @@
+"""
+RPS аутентифицированных ручек API с кэшем пользователей (PrincipalCache) и без него:
+/account/balance и /models/. Запросы идут в приложение в том же процессе
+(httpx.ASGITransport), без сети и брокера.
+
+    python -m src.app.benchmarks.bench_principal_cache
+
+Нужны переменные окружения приложения (DATABASE_URL, SECRET, ALGO, COST_PER_ROW);
+таблицы создаются, пользователь регистрируется через API.
+"""
+import asyncio, logging, os, statistics, time
+
+import httpx
+
+from src.app.infra.db import engine
+from src.app.infra.models import Base
+from src.app.infra.principal_cache import principals, PRINCIPAL_CACHE_TTL
+from src.app.main import app
+
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "20"))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "2000"))
+PATHS = ("/api/account/balance", "/api/models/")
+
+
+async def _load(client: httpx.AsyncClient, path: str, headers: dict) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+    remaining = REQUESTS
+
+    async def user() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            t = time.perf_counter()
+            r = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - t)
+            r.raise_for_status()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(CONCURRENCY)))
+    return time.perf_counter() - t0, latencies
+
+
+async def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    Base.metadata.create_all(bind=engine)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        creds = {"email": f"bench_{time.time_ns()}@bench", "password": "bench"}
+        r = await client.post("/api/auth/register", json=creds)
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        ttl = principals.ttl or 60.0
+        print(f"{'path':>22} | {'cache':>5} | {'rps':>8} | {'p50, ms':>8} | {'p95, ms':>8}")
+        print("-" * 64)
+        for path in PATHS:
+            for enabled in (False, True):
+                principals.clear()
+                principals.ttl = ttl if enabled else 0
+                await _load(client, path, headers)  # прогрев
+                elapsed, lat = await _load(client, path, headers)
+                lat.sort()
+                p95 = lat[int(len(lat) * 0.95) - 1]
+                print(f"{path:>22} | {'on' if enabled else 'off':>5} | {len(lat) / elapsed:>8.0f} | "
+                      f"{statistics.median(lat) * 1e3:>8.2f} | {p95 * 1e3:>8.2f}")
+        principals.ttl = PRINCIPAL_CACHE_TTL
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
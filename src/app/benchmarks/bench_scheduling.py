@@ -0,0 +1,138 @@
+"""
+Симуляция очереди джоб при смешанной нагрузке: ожидание в очереди (от постановки
+до начала инференса) по размеру джобы, p50/p99. Политики:
+
+    fifo        — одна очередь, как раньше;
+    size        — очереди мелких и крупных джоб (scheduling.job_class), prefetch
+                  воркера делится по WORKER_QUEUE_WEIGHTS;
+    size+fair   — то же и приоритет сообщения по числу ждущих джоб пользователя
+                  (scheduling.priority), как у API.
+
+Модель воркера: брокер отдаёт сообщения очереди, пока у неё не исчерпан prefetch;
+отданные джобы ждут свободный процесс инференса в порядке получения. Нагрузка:
+пользователи бота с короткими рядами (Пуассон), несколько клиентов со средними
+датасетами, один клиент выгружает пачку файлов по 1M строк, один бот-клиент
+шлёт залп мелких джоб (по 5k строк). Время инференса линейно по строкам.
+
+    python -m src.app.benchmarks.bench_scheduling
+
+BENCH_SCHED_PROCESSES — процессов инференса; BENCH_SCHED_SECONDS — длительность
+нагрузки; BENCH_SCHED_ROWS_PER_S — строк в секунду на процесс.
+"""
+import heapq, itertools, os
+from collections import defaultdict, deque
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.app.infra import scheduling
+
+BENCH_PROCESSES = int(os.getenv("BENCH_SCHED_PROCESSES", "4"))
+BENCH_SECONDS = float(os.getenv("BENCH_SCHED_SECONDS", "600"))
+BENCH_ROWS_PER_S = float(os.getenv("BENCH_SCHED_ROWS_PER_S", "200000"))
+# накладные расходы джобы (БД, сообщение), с
+JOB_OVERHEAD_S = 0.02
+PREFETCH = 2 * BENCH_PROCESSES
+BUCKETS = ((1_000, "<=1k"), (scheduling.SCHEDULER_LARGE_JOB_ROWS, f"<={scheduling.SCHEDULER_LARGE_JOB_ROWS // 1000}k"),
+           (float("inf"), "large"))
+
+
+@dataclass(slots=True)
+class Job:
+    user: int
+    rows: int
+    submitted: float
+    started: float = 0.0
+    queue: str = scheduling.SMALL
+    priority: int = 0
+
+
+def _workload(seed: int = 0) -> list[Job]:
+    rng = np.random.default_rng(seed)
+    jobs = []
+    # 50 пользователей бота: джоба раз в ~20 с, 50–500 строк
+    for user in range(50):
+        t = rng.exponential(20)
+        while t < BENCH_SECONDS:
+            jobs.append(Job(user, int(rng.integers(50, 500)), t))
+            t += rng.exponential(20)
+    # 10 клиентов со средними датасетами: раз в ~30 с, 2k–30k строк
+    for user in range(50, 60):
+        t = rng.exponential(30)
+        while t < BENCH_SECONDS:
+            jobs.append(Job(user, int(rng.integers(2_000, 30_000)), t))
+            t += rng.exponential(30)
+    # выгрузка 40 файлов по 1M строк за первые 10 с
+    jobs += [Job(100, 1_000_000, 60 + i * 0.25) for i in range(40)]
+    # залп 1500 джоб по 5k строк от одного клиента за 15 с
+    jobs += [Job(101, 5_000, 300 + i * 0.01) for i in range(1500)]
+    return sorted(jobs, key=lambda j: j.submitted)
+
+
+def _service_time(job: Job) -> float:
+    return JOB_OVERHEAD_S + job.rows / BENCH_ROWS_PER_S
+
+
+def simulate(jobs: list[Job], policy: str) -> list[Job]:
+    if policy == "fifo":
+        prefetch = {scheduling.SMALL: PREFETCH}
+    else:
+        prefetch = scheduling.prefetch_split(PREFETCH, scheduling.parse_weights(scheduling.WORKER_QUEUE_WEIGHTS))
+    fair = policy == "size+fair"
+    seq = itertools.count()
+    broker = {name: [] for name in prefetch}          # куча (-priority, seq, job)
+    delivered = dict.fromkeys(prefetch, 0)
+    local: deque[Job] = deque()                        # получено воркером, ждёт процесс
+    waiting = defaultdict(int)                         # ждущие джобы пользователя (как admission.queued)
+    free = BENCH_PROCESSES
+    events = [(j.submitted, next(seq), "submit", j) for j in jobs]
+    heapq.heapify(events)
+
+    def deliver(now: float) -> None:
+        nonlocal free
+        for name, heap in broker.items():
+            while heap and delivered[name] < prefetch[name]:
+                delivered[name] += 1
+                local.append(heapq.heappop(heap)[2])
+        while free and local:
+            job = local.popleft()
+            free -= 1
+            job.started = now
+            waiting[job.user] -= 1
+            heapq.heappush(events, (now + _service_time(job), next(seq), "done", job))
+
+    while events:
+        now, _, kind, job = heapq.heappop(events)
+        if kind == "submit":
+            job.queue = scheduling.SMALL if policy == "fifo" else scheduling.job_class(job.rows)
+            job.priority = (scheduling.priority(waiting[job.user]) or 0) if fair else 0
+            waiting[job.user] += 1
+            heapq.heappush(broker[job.queue], (-job.priority, next(seq), job))
+        else:
+            free += 1
+            delivered[job.queue] -= 1
+        deliver(now)
+    return jobs
+
+
+def main() -> None:
+    jobs = _workload()
+    print(f"{len(jobs)} jobs, {BENCH_PROCESSES} processes, {BENCH_ROWS_PER_S:.0f} rows/s per process, "
+          f"large > {scheduling.SCHEDULER_LARGE_JOB_ROWS} rows, weights {scheduling.WORKER_QUEUE_WEIGHTS}")
+    print()
+    print(f"{'policy':>10} | {'rows':>6} | {'jobs':>5} | {'p50 wait, s':>11} | {'p99 wait, s':>11} | {'max, s':>8}")
+    print("-" * 68)
+    for policy in ("fifo", "size", "size+fair"):
+        done = simulate([Job(j.user, j.rows, j.submitted) for j in jobs], policy)
+        lower = 0
+        for upper, label in BUCKETS:
+            waits = np.array([j.started - j.submitted for j in done if lower < j.rows <= upper])
+            lower = upper
+            if len(waits) == 0:
+                continue
+            print(f"{policy:>10} | {label:>6} | {len(waits):>5} | {np.percentile(waits, 50):>11.2f} | "
+                  f"{np.percentile(waits, 99):>11.2f} | {waits.max():>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
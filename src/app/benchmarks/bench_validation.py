@@ -0,0 +1,59 @@
+"""
+Пропускная способность Validator: построчный validate_rows против
+колоночного validate_columnar (и validate_columns для готовых колонок).
+
+    python -m src.app.benchmarks.bench_validation
+
+BENCH_VALIDATION_SIZES — размеры батчей через запятую.
+"""
+import logging, os, time
+
+import numpy as np
+
+from src.app.domain.validation import Validator
+
+BENCH_SIZES = tuple(int(x) for x in os.getenv("BENCH_VALIDATION_SIZES", "10000,100000,1000000").split(","))
+INVALID_SHARE = 0.01
+
+
+def _rows(n: int, kind: str) -> list:
+    rng = np.random.default_rng(n)
+    secs = rng.permutation(n) * 60 + 1_700_000_000
+    prices = np.round(rng.uniform(10, 1000, n), 2)
+    if kind == "epoch":
+        rows = [{"ts": float(s), "close": float(p)} for s, p in zip(secs, prices)]
+    else:
+        stamps = np.datetime_as_string(secs.astype("datetime64[s]"))
+        rows = [{"timestamp": str(t), "price": f"{p:.2f}"} for t, p in zip(stamps, prices)]
+    for i in rng.choice(n, int(n * INVALID_SHARE), replace=False):
+        rows[i] = {**rows[i], **({"ts": "oops"} if kind == "epoch" else {"price": "n/a"})}
+    return rows
+
+
+def _timeit(fn) -> float:
+    t = time.perf_counter()
+    fn()
+    return time.perf_counter() - t
+
+
+def main() -> None:
+    logging.disable(logging.INFO)
+    print(f"{'rows':>9} | {'input':>6} | {'rows, s':>8} | {'columnar, s':>11} | {'speedup':>7}")
+    print("-" * 55)
+    for n in BENCH_SIZES:
+        for kind in ("iso", "epoch"):
+            rows = _rows(n, kind)
+            ref = Validator.validate_rows(rows)
+            res = Validator.validate_columnar(rows)
+            assert res.valid_rows == ref.valid_rows and res.invalid_rows == ref.invalid_rows
+
+            t_rows = _timeit(lambda: Validator.validate_rows(rows))
+            t_col = _timeit(lambda: Validator.validate_columnar(rows))
+            print(f"{n:>9} | {kind:>6} | {t_rows:>8.3f} | {t_col:>11.3f} | {t_rows / t_col:>6.1f}x")
+
+        cols = {"ts": np.arange(n, dtype=np.float64) * 60 + 1_700_000_000, "close": np.ones(n)}
+        print(f"{n:>9} | {'arrays':>6} | {'':>8} | {_timeit(lambda: Validator.validate_columns(cols)):>11.3f} |")
+
+
+if __name__ == "__main__":
+    main()
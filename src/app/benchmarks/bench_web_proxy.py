@@ -0,0 +1,121 @@
+"""
+Латентность страниц Web UI (/predict, /ph, /ph/partial) в зависимости от того,
+как Web UI ходит в API:
+
+    percall   — новый httpx.AsyncClient на каждый вызов (прежнее поведение)
+    http      — общий клиент с пулом keep-alive соединений (WEB_API_MODE=http)
+    inprocess — ASGI-вызов в то же приложение, без сети (WEB_API_MODE=inprocess)
+
+    python -m src.app.benchmarks.bench_web_proxy
+
+Приложение (API + Web UI, без брокера) поднимается uvicorn'ом на 127.0.0.1 в
+отдельном потоке; нужны переменные окружения приложения (DATABASE_URL, SECRET,
+ALGO, COST_PER_ROW).
+"""
+import asyncio, logging, os, socket, statistics, threading, time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from src.app.api import router as api_router
+from src.app.web import router as web_router
+from src.app.web import api_client
+from src.app.infra.db import engine
+from src.app.infra.models import Base
+
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "10"))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "500"))
+PAGES = ("/predict", "/ph", "/ph/partial")
+MODES = ("percall", "http", "inprocess")
+
+
+class _PerCallClient:
+    """Прежний _api: клиент (и TCP-соединение) на каждый запрос."""
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        async with httpx.AsyncClient(base_url=api_client.API_BASE) as cli:
+            return await cli.request(method, path, **kwargs)
+
+
+def _bench_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api")
+    app.include_router(web_router)
+
+    @app.on_event("startup")
+    async def _start():
+        await api_client.start(app)
+
+    @app.on_event("shutdown")
+    async def _stop():
+        await api_client.stop()
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve(mode: str, port: int) -> tuple[uvicorn.Server, threading.Thread]:
+    api_client.WEB_API_MODE = "http" if mode == "percall" else mode
+    server = uvicorn.Server(uvicorn.Config(_bench_app(), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread
+
+
+async def _load(client: httpx.AsyncClient, path: str) -> list[float]:
+    latencies: list[float] = []
+    remaining = REQUESTS
+
+    async def user() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            t = time.perf_counter()
+            r = await client.get(path)
+            latencies.append(time.perf_counter() - t)
+            r.raise_for_status()
+
+    await asyncio.gather(*(user() for _ in range(CONCURRENCY)))
+    return sorted(latencies)
+
+
+async def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    Base.metadata.create_all(bind=engine)
+    port = _free_port()
+    api_client.API_BASE = f"http://127.0.0.1:{port}/api"
+    shared_client = api_client.client
+
+    print(f"{'page':>12} | {'mode':>9} | {'p50, ms':>8} | {'p95, ms':>8}")
+    print("-" * 48)
+    token = None
+    for mode in MODES:
+        api_client.client = (lambda: _PerCallClient()) if mode == "percall" else shared_client
+        server, thread = _serve(mode, port)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+                if token is None:
+                    creds = {"email": f"bench_{time.time_ns()}@bench", "password": "bench"}
+                    token = (await client.post("/api/auth/register", json=creds)).json()["access_token"]
+                client.cookies.set("access_token", token)
+                for page in PAGES:
+                    await _load(client, page)  # прогрев
+                    lat = await _load(client, page)
+                    p95 = lat[int(len(lat) * 0.95) - 1]
+                    print(f"{page:>12} | {mode:>9} | {statistics.median(lat) * 1e3:>8.2f} | {p95 * 1e3:>8.2f}")
+        finally:
+            server.should_exit = True
+            await asyncio.to_thread(thread.join)
+    api_client.client = shared_client
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
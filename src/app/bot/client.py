@@ -1,7 +1,9 @@
-import os, httpx
-from typing import Any, Dict, List
+import asyncio, json, os, httpx
+from typing import Any, Dict, List, Optional
 
 API_BASE = os.getenv("API_BASE")
+# поток событий пингуется раз в ~15 с; дольше тишина — соединение считаем потерянным
+EVENTS_READ_TIMEOUT = 60.0
 
 class ApiError(Exception):
     def __init__(self, status: int, detail: str = ""):
@@ -14,9 +16,12 @@ class ApiClient:
         self._token: str | None = None
         self._http = httpx.AsyncClient(base_url=API_BASE, timeout=15.0)
 
+    def _auth(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self._token}"} if self._token else {}
+
     async def _request(self, method: str, url: str, **kw) -> Any:
         if self._token:
-            kw.setdefault("headers", {})["Authorization"] = f"Bearer {self._token}"
+            kw.setdefault("headers", {}).update(self._auth())
         try:
             resp = await self._http.request(method, url, **kw)
             resp.raise_for_status()
@@ -58,8 +63,53 @@ class ApiClient:
         return await self._request("POST", "/predict/",
                                    json={"model_name": model, "data": rows})
 
-    async def pred_history(self) -> List[Dict]:
-        return await self._request("GET", "/predict/history")
+    async def pred_history(self, limit: int = 20, before_id: Optional[int] = None) -> List[Dict]:
+        params: Dict[str, Any] = {"limit": limit}
+        if before_id:
+            params["before_id"] = before_id
+        return await self._request("GET", "/predict/history", params=params)
+
+    async def pred_job(self, job_id: int, *, offset: int = 0, limit: Optional[int] = None,
+                       fields: Optional[List[str]] = None) -> Dict:
+        """Джоба; с limit/fields — срез данных и счётчики n_valid/n_invalid."""
+        params: Dict[str, Any] = {}
+        if offset:
+            params["offset"] = offset
+        if limit:
+            params["limit"] = limit
+        if fields is not None:
+            params["fields"] = ",".join(fields)
+        return await self._request("GET", f"/predict/{job_id}", params=params or None)
+
+    async def wait_job(self, job_id: int, timeout: float) -> Optional[Dict]:
+        """
+        Ждать завершения джобы по SSE-потоку /predict/{id}/events (вместо опроса).
+        Событие {job_id, status, ...}; None — не дождались за timeout секунд.
+        Оборванный поток переоткрывается.
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                while True:
+                    try:
+                        if (event := await self._read_job_event(job_id)) is not None:
+                            return event
+                    except httpx.TransportError:
+                        pass
+                    await asyncio.sleep(3)
+        except TimeoutError:
+            return None
 
-    async def pred_job(self, job_id: int) -> Dict:
-        return await self._request("GET", f"/predict/{job_id}")
\ No newline at end of file
+    async def _read_job_event(self, job_id: int) -> Optional[Dict]:
+        timeout = httpx.Timeout(15.0, read=EVENTS_READ_TIMEOUT)
+        async with self._http.stream("GET", f"/predict/{job_id}/events",
+                                     headers=self._auth(), timeout=timeout) as resp:
+            if resp.status_code != 200:
+                await resp.aread()
+                raise ApiError(resp.status_code, resp.text)
+            event = None
+            async for line in resp.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:") and event == "job":
+                    return json.loads(line[len("data:"):])
+        return None
@@ -28,6 +28,14 @@ def pred_source_kb() -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text="⬅️ Back", callback_data="menu:predict")],
     ])
 
+def history_kb(older: int | None) -> InlineKeyboardMarkup:
+    kb = []
+    if older:
+        kb.append([InlineKeyboardButton(text="⬅️ Older", callback_data=f"ph:{older}")])
+    kb.append([InlineKeyboardButton(text="⬅️ Back", callback_data="menu:home")])
+    return InlineKeyboardMarkup(inline_keyboard=kb)
+
+
 def job_actions_kb(job_id: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="🔄 Refresh status", callback_data=f"job:{job_id}")],
@@ -8,10 +8,12 @@ from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 
 from client import ApiClient, ApiError
-from keyboards import main_menu, models_kb, pred_source_kb, job_actions_kb
+from keyboards import main_menu, models_kb, pred_source_kb, job_actions_kb, history_kb
 from parsers import parse_document
 
 TOKEN = os.getenv("TG_BOT_TOKEN")
+# сколько ждать завершения джобы, чтобы прислать результат самим (с)
+BOT_JOB_WATCH_TIMEOUT = float(os.getenv("BOT_JOB_WATCH_TIMEOUT", "3600"))
 bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 dp  = Dispatcher()
 
@@ -202,6 +204,7 @@ async def handle_json(msg: types.Message, state: FSMContext):
         reply_markup=job_actions_kb(jid)
     )
     await state.clear()
+    _watch_job(msg, jid)
 
 @dp.callback_query(F.data == "pred:file")
 async def want_file(cb: types.CallbackQuery, state: FSMContext):
@@ -236,21 +239,53 @@ async def handle_file(msg: types.Message, state: FSMContext):
         reply_markup=job_actions_kb(jid)
     )
     await state.clear()
+    _watch_job(msg, jid)
 
 
-@dp.callback_query(F.data == "menu:ph")
-async def cb_history(cb: types.CallbackQuery):
-    jobs = await safe_call(cb, api_for(cb.from_user.id).pred_history())
-    if not jobs:
-        return
+# ожидание завершения джоб: результат приходит сообщением, без повторного /job
+_watchers: set[asyncio.Task] = set()
+
+def _watch_job(msg: types.Message, job_id: int) -> None:
+    task = asyncio.create_task(_notify_when_done(msg, job_id))
+    _watchers.add(task)  # ссылка, чтобы задачу не собрал GC
+    task.add_done_callback(_watchers.discard)
+
+async def _notify_when_done(msg: types.Message, job_id: int):
+    try:
+        event = await api_for(msg.chat.id).wait_job(job_id, BOT_JOB_WATCH_TIMEOUT)
+    except ApiError:
+        return  # токен истёк / джобы нет — пользователь всегда может спросить /job
+    if event is not None:
+        await _send_job_view(msg, job_id)
+
+
+PH_PAGE_SIZE = 20
+# сколько прогнозов показывать в карточке джобы
+JOB_PREVIEW_ROWS = 20
+
+def _history_view(jobs: list[dict]) -> tuple[str, types.InlineKeyboardMarkup]:
     lines = [
+        f"{html.escape(str(j.get('id', '')))} • "
         f"{html.escape(j.get('created_at','')[:16])} • "
         f"{html.escape(j.get('model_name',''))} • "
+        f"{html.escape(str(j.get('status', '')))} • "
         f"{html.escape(str(j.get('cost', 0)))}"
         for j in jobs
     ]
-    await cb.message.edit_text(f"<pre><code>{'\n'.join(lines) or '—'}</code></pre>",
-                               reply_markup=main_menu(True))
+    older = jobs[-1]["id"] if len(jobs) == PH_PAGE_SIZE else None
+    body = "\n".join(lines) or "—"
+    return f"<pre><code>{body}</code></pre>", history_kb(older)
+
+@dp.callback_query(F.data == "menu:ph")
+@dp.callback_query(F.data.startswith("ph:"))
+async def cb_history(cb: types.CallbackQuery):
+    # "ph:<id>" — следующая (более старая) страница
+    before_id = int(cb.data.split(":", 1)[1]) if cb.data.startswith("ph:") else None
+    jobs = await safe_call(cb, api_for(cb.from_user.id).pred_history(PH_PAGE_SIZE, before_id))
+    if jobs is None:
+        return
+    text, kb = _history_view(jobs)
+    await cb.message.edit_text(text, reply_markup=kb)
     await cb.answer()
 
 @dp.message(F.text.startswith("/job"))
@@ -268,7 +303,8 @@ async def job_cb(cb: types.CallbackQuery):
     await cb.answer()
 
 async def _send_job_view(target: types.Message, job_id: int):
-    job = await safe_call(target, api_for(target.chat.id).pred_job(job_id))
+    job = await safe_call(target, api_for(target.chat.id).pred_job(
+        job_id, limit=JOB_PREVIEW_ROWS, fields=["predictions"]))
     if not job:
         return
     status = html.escape(job.get("status", "UNKNOWN"))
@@ -281,12 +317,13 @@ async def _send_job_view(target: types.Message, job_id: int):
 
     if status == "OK":
         preds = job.get("predictions", []) or []
+        total = job.get("n_valid", len(preds))
         cost  = job.get("cost", 0)
         lines.append(f"💸 Cost: <b>{html.escape(str(cost))}</b>")
-        lines.append(f"✅ Rows: <b>{len(preds)}</b>")
+        lines.append(f"✅ Rows: <b>{total}</b>")
         if preds:
-            preview_json = html.escape(json.dumps(preds[:20], ensure_ascii=False, indent=2))
-            more = " …" if len(preds) > 20 else ""
+            preview_json = html.escape(json.dumps(preds, ensure_ascii=False, indent=2))
+            more = " …" if total > len(preds) else ""
             lines.append(f"<pre><code>{preview_json}{more}</code></pre>")
     elif status == "ERROR":
         err = html.escape(job.get("error", "unknown"))
@@ -310,15 +347,10 @@ async def tx(msg: types.Message):
 
 @dp.message(F.text == "/ph")
 async def pred_history(msg: types.Message):
-    jobs = await safe_call(msg, api_for(msg.from_user.id).pred_history())
+    jobs = await safe_call(msg, api_for(msg.from_user.id).pred_history(PH_PAGE_SIZE))
     if not jobs: return
-    lines = [
-        f"{html.escape(j.get('created_at','')[:16])} • "
-        f"{html.escape(j.get('model_name',''))} • "
-        f"{html.escape(str(j.get('cost', 0)))}"
-        for j in jobs
-    ]
-    await msg.answer(f"<pre><code>{'\n'.join(lines)}</code></pre>")
+    text, kb = _history_view(jobs)
+    await msg.answer(text, reply_markup=kb)
 
 async def main():
     await dp.start_polling(
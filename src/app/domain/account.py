@@ -14,6 +14,7 @@ class Transaction:
     balance_after: int
     created_at: datetime = field(default_factory=lambda: datetime.now(UTC))
     _persisted: bool = False                 # признак «уже в БД»
+    id: int | None = None
 
     # небольшие хелперы
     def is_deposit(self) -> bool:
@@ -31,12 +32,16 @@ class Transaction:
             "balance_after": self.balance_after,
             "created_at": self.created_at.isoformat(),
             "_persisted": self._persisted,
+            "id": self.id,
         }
 
 
 class InsufficientFunds(Exception):
     ...
 
+class StaleAccount(Exception):
+    """Счёт изменён параллельно — версия в БД ушла вперёд."""
+
 class Account:
     """Кошелёк в условных кредитах."""
 
@@ -45,10 +50,14 @@ class Account:
         owner_id: int,
         id_: int | None = None,
         balance: int = 0,
+        version: int = 0,
+        reserved: int = 0,
     ) -> None:
         self.id: int | None = id_
         self.owner_id = owner_id
         self.__balance: int = balance
+        self.__reserved: int = reserved          # сумма активных холдов
+        self.__version: int = version            # номер последней сохранённой версии
         self.__history: List[Transaction] = []
 
     # фабрики
@@ -59,6 +68,8 @@ class Account:
             id_=data.get("id"),
             owner_id=data["owner_id"],
             balance=data.get("balance", 0),
+            version=data.get("version", 0),
+            reserved=data.get("reserved", 0),
         )
 
         for tx_dto in data.get("history", []):
@@ -72,6 +83,8 @@ class Account:
             "id": self.id,
             "owner_id": self.owner_id,
             "balance": self.__balance,
+            "version": self.__version,
+            "reserved": self.__reserved,
             "history": [tx.as_dict() for tx in self.__history],
         }
 
@@ -79,8 +92,22 @@ class Account:
     def balance(self) -> int:
         return self.__balance
 
+    @property
+    def reserved(self) -> int:
+        return self.__reserved
+
+    @property
+    def available(self) -> int:
+        """Баланс за вычетом холдов под ещё не обработанные джобы."""
+        return self.__balance - self.__reserved
+
+    @property
+    def version(self) -> int:
+        return self.__version
+
     @property
     def history(self) -> Sequence[Transaction]:
+        """Только загруженные/новые транзакции (не обязательно вся история)."""
         return tuple(self.__history)
 
     # бизнес-методы
@@ -103,4 +130,10 @@ class Account:
 
     def pending_transactions(self) -> List[Transaction]:
         """Вернуть транзакции, которые ещё не сохранены в БД."""
-        return [tx for tx in self.__history if not tx._persisted]
\ No newline at end of file
+        return [tx for tx in self.__history if not tx._persisted]
+
+    def mark_saved(self, version: int) -> None:
+        """Зафиксировать успешное сохранение с новой версией."""
+        for tx in self.__history:
+            tx._persisted = True
+        self.__version = version
\ No newline at end of file
@@ -11,4 +11,9 @@ class TxType(StrEnum):
 class JobStatus(StrEnum):
     OK = "OK"
     ERROR = "ERROR"
-    PENDING = "PENDING"
\ No newline at end of file
+    PENDING = "PENDING"
+
+class HoldStatus(StrEnum):
+    ACTIVE = "ACTIVE"
+    COMMITTED = "COMMITTED"
+    RELEASED = "RELEASED"
\ No newline at end of file
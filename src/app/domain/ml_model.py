@@ -1,5 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import hashlib, pickle, sys
+
+import numpy as np
+
+from src.app.domain.stats import PairStats
+
 
 class MLModel(ABC):
     """
@@ -8,6 +15,8 @@ class MLModel(ABC):
 
     name: str
     price_per_row: int = 1
+    # версия весов/кода; при смене кэш реестра перезагружает экземпляр
+    version: str = "1"
 
     @abstractmethod
     def predict(self, rows: Sequence[Dict[str, Any]]) -> List[float]:
@@ -16,6 +25,140 @@ class MLModel(ABC):
         """
         ...
 
+    def predict_prices(self, prices: np.ndarray) -> Optional[List[float]]:
+        """
+        Предсказание по колонке цен валидатора (float64, по времени) без dict-строк;
+        результат тот же, что у predict. None — модели нужны строки целиком.
+        """
+        return None
+
+    def predict_many(self, prices: np.ndarray, horizon: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Пачка рядов одной длины (k, n) -> прогнозы (k, horizon); horizon по умолчанию n.
+        None — модель прогнозирует только один ряд на len(rows) шагов (predict).
+        """
+        return None
+
+    def size_bytes(self) -> int:
+        """
+        Оценка памяти экземпляра для бюджета кэша моделей
+        """
+        return sys.getsizeof(self)
+
+
+Point = Tuple[str, float]  # (timestamp, price) точки ряда
+
+
+@dataclass(slots=True)
+class SeriesState:
+    """
+    Состояние ряда инкрементальной модели: сколько точек учтено, первая и последняя
+    точки, sha256 цен учтённого префикса (по ним проверяется, что новая история
+    продолжает этот ряд) и достаточные статистики модели.
+    """
+    version: str
+    n: int = 0
+    first: Optional[Point] = None
+    last: Optional[Point] = None
+    stats: Dict[str, Any] = field(default_factory=dict)
+    prefix_hash: Optional[str] = None
+
+    @property
+    def last_y(self) -> Optional[float]:
+        return None if self.last is None else self.last[1]
+
+    def continued_by(self, rows: Sequence[Dict[str, Any]], version: str, prices: Optional[np.ndarray] = None) -> bool:
+        """rows — эта же история (версия модели та же, первые n цен не менялись), возможно, с новыми в конце."""
+        return self._prefix_matches(rows, _prices(rows, prices), version) is not None
+
+    def _prefix_matches(self, rows: Sequence[Dict[str, Any]], prices: np.ndarray, version: str) -> Optional[Any]:
+        """Хэш первых n цен, если они совпадают с учтёнными; иначе None."""
+        if not (
+            self.version == version
+            and self.prefix_hash is not None
+            and 0 < self.n <= len(rows)
+            and _point(rows[0]) == self.first
+            and _point(rows[self.n - 1]) == self.last
+        ):
+            return None
+        h = _prefix_hasher(prices[:self.n])
+        return h if h.hexdigest() == self.prefix_hash else None
+
+
+def _point(row: Dict[str, Any]) -> Point:
+    return row["timestamp"], float(row["price"])
+
+
+def _prices(rows: Sequence[Dict[str, Any]], prices: Optional[np.ndarray]) -> np.ndarray:
+    """Колонка цен rows (float64); готовая колонка валидатора берётся как есть."""
+    if prices is not None and len(prices) == len(rows):
+        return np.ascontiguousarray(prices, dtype=np.float64)
+    return np.fromiter((float(r["price"]) for r in rows), dtype=np.float64, count=len(rows))
+
+
+def _prefix_hasher(prices: np.ndarray, h: Optional[Any] = None):
+    """
+    sha256 цен ряда (байты float64): статистики моделей зависят только от цен по
+    порядку. Продолжение того же объекта новыми ценами = хэш всей истории.
+    """
+    h = h or hashlib.sha256()
+    h.update(memoryview(prices))
+    return h
+
+
+class IncrementalModel(MLModel):
+    """
+    Модель, которая держит достаточные статистики ряда (series_id клиента):
+    досланные в конец истории точки учитываются за O(новых точек), прогноз
+    строится из состояния без повторного обучения. predict — полное обучение,
+    результат тот же.
+    """
+
+    @abstractmethod
+    def update(self, state: SeriesState, ys: np.ndarray) -> Dict[str, Any]:
+        """Статистики ряда state после добавления в конец цен ys."""
+        ...
+
+    @abstractmethod
+    def forecast(self, state: SeriesState, horizon: int) -> List[float]:
+        """horizon прогнозов вперёд от последней точки ряда."""
+        ...
+
+    def merge(self, left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Статистики ряда из статистик двух соседних частей (right продолжает left):
+        части длинного ряда считаются независимо. По умолчанию — статистики PairStats.
+        """
+        return PairStats.from_dict(left).merge(PairStats.from_dict(right)).to_dict()
+
+    def advance(
+        self, state: Optional[SeriesState], rows: Sequence[Dict[str, Any]], prices: Optional[np.ndarray] = None,
+    ) -> SeriesState:
+        """
+        Состояние ряда по истории rows (валидные строки, по времени; prices — их
+        колонка цен, если уже есть). Если rows продолжают ряд state (учтённый
+        префикс цен совпадает по хэшу), статистики обновляются только новыми
+        точками, иначе — по всем с нуля. Проверка префикса — один проход sha256
+        по 8 байтам на точку: она линейна по длине истории, за O(новых точек)
+        обновляются только статистики.
+        """
+        ys = _prices(rows, prices)
+        h = None if state is None else state._prefix_matches(rows, ys, self.version)
+        if h is None:
+            # новый ряд или правка уже учтённых цен: состояние — с нуля
+            state = SeriesState(version=self.version)
+        new = ys[state.n:]
+        if not len(new):
+            return state
+        return SeriesState(
+            version=self.version,
+            n=len(rows),
+            first=state.first or _point(rows[0]),
+            last=_point(rows[-1]),
+            stats=self.update(state, new),
+            prefix_hash=_prefix_hasher(new, h).hexdigest(),
+        )
+
 
 class SklearnModel(MLModel):
     """
@@ -34,4 +177,10 @@ class SklearnModel(MLModel):
             X.append([float(v) for _, v in numeric_items])
 
         preds = self._estimator.predict(X)
-        return [float(p) for p in preds]
\ No newline at end of file
+        return [float(p) for p in preds]
+
+    def size_bytes(self) -> int:
+        try:
+            return len(pickle.dumps(self._estimator, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return sys.getsizeof(self._estimator)
@@ -1,27 +1,102 @@
+from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Sequence, Any, Tuple
+from typing import Sequence, Any, Dict, Tuple, Optional
 from datetime import datetime, UTC
 from src.app.domain.enums import JobStatus
 
 
+class JobPayload(ABC):
+    """
+    Входные данные и результат джобы. Хранилище может держать их в компактном
+    виде — тогда поля декодируются при первом обращении, а не при загрузке джобы.
+    """
+
+    @abstractmethod
+    def valid_input(self) -> Sequence[Any]: ...
+
+    @abstractmethod
+    def predictions(self) -> Sequence[Any]: ...
+
+    @abstractmethod
+    def invalid_rows(self) -> Sequence[Tuple[int, Any]]: ...
+
+    def predictions_dump(self) -> Sequence[Any]:
+        """Прогнозы для ответа API; колоночное хранилище отдаёт массив NumPy (без списка Python)."""
+        return self.predictions()
+
+    def n_valid(self) -> int:
+        return len(self.valid_input())
+
+    def n_invalid(self) -> int:
+        return len(self.invalid_rows())
+
+    # срезы [offset, offset + limit); limit=None — до конца. Хранилище с пачками
+    # переопределяет их и распаковывает только нужные пачки
+    def valid_slice(self, offset: int, limit: Optional[int]) -> Sequence[Any]:
+        return _cut(self.valid_input(), offset, limit)
+
+    def predictions_slice(self, offset: int, limit: Optional[int]) -> Sequence[Any]:
+        return _cut(self.predictions(), offset, limit)
+
+    def invalid_slice(self, offset: int, limit: Optional[int]) -> Sequence[Tuple[int, Any]]:
+        return _cut(self.invalid_rows(), offset, limit)
+
+
+def _cut(seq: Sequence[Any], offset: int, limit: Optional[int]) -> Sequence[Any]:
+    return list(seq[offset:] if limit is None else seq[offset:offset + limit])
+
+
+# поля данных джобы, которые можно запросить срезом
+JOB_FIELDS = ("valid_input", "predictions", "invalid_rows")
+
+
+@dataclass(slots=True)
+class InlinePayload(JobPayload):
+    """Уже разобранные списки (JSON-колонки, только что посчитанная джоба)."""
+    valid: Sequence[Any] = ()
+    preds: Sequence[Any] = ()
+    invalid: Sequence[Tuple[int, Any]] = ()
+
+    def valid_input(self) -> Sequence[Any]:
+        return self.valid
+
+    def predictions(self) -> Sequence[Any]:
+        return self.preds
+
+    def invalid_rows(self) -> Sequence[Tuple[int, Any]]:
+        return self.invalid
+
+
 @dataclass
 class PredictionJob:
     owner_id: int
     model_name: str
-    valid_input: Sequence[Any]
-    predictions: Sequence[Any]
-    invalid_rows: Sequence[Tuple[int, Any]]
+    payload: JobPayload
     cost: int
     created_at: datetime = field(default_factory=lambda: datetime.now(UTC))
     id: int | None = None
     status: JobStatus = JobStatus.OK
     error: str | None = None
+    # пакетная джоба по нескольким рядам: {имя ряда: результат} (payload пуст)
+    series: Optional[Dict[str, Any]] = None
+
+    @property
+    def valid_input(self) -> Sequence[Any]:
+        return self.payload.valid_input()
+
+    @property
+    def predictions(self) -> Sequence[Any]:
+        return self.payload.predictions()
+
+    @property
+    def invalid_rows(self) -> Sequence[Tuple[int, Any]]:
+        return self.payload.invalid_rows()
 
     def n_valid(self) -> int:
-        return len(self.valid_input)
+        return self.payload.n_valid()
 
     def n_invalid(self) -> int:
-        return len(self.invalid_rows)
+        return self.payload.n_invalid()
 
     def summary(self) -> dict:
         return {
@@ -34,4 +109,50 @@ class PredictionJob:
         }
 
     def get_invalid_rows_for_user(self) -> list:
-        return [row for idx, row in self.invalid_rows]
\ No newline at end of file
+        return [row for idx, row in self.invalid_rows]
+
+    def slice(self, offset: int = 0, limit: Optional[int] = None,
+              fields: Sequence[str] = JOB_FIELDS) -> "PredictionSlice":
+        """
+        Часть данных джобы: выбранные поля, строки [offset, offset + limit).
+        valid_input и predictions режутся по одним позициям, invalid_rows — по своим.
+        """
+        p = self.payload
+        return PredictionSlice(
+            id=self.id, owner_id=self.owner_id, model_name=self.model_name, cost=self.cost,
+            created_at=self.created_at, status=self.status, error=self.error,
+            n_valid=p.n_valid(), n_invalid=p.n_invalid(), offset=offset, limit=limit,
+            valid_input=p.valid_slice(offset, limit) if "valid_input" in fields else None,
+            predictions=p.predictions_slice(offset, limit) if "predictions" in fields else None,
+            invalid_rows=p.invalid_slice(offset, limit) if "invalid_rows" in fields else None,
+        )
+
+
+@dataclass(slots=True)
+class PredictionSlice:
+    """Джоба со срезом данных: счётчики строк и только запрошенные поля (None — не запрошено)."""
+    id: int
+    owner_id: int
+    model_name: str
+    cost: int
+    created_at: datetime
+    status: JobStatus
+    error: str | None
+    n_valid: int
+    n_invalid: int
+    offset: int
+    limit: Optional[int]
+    valid_input: Optional[Sequence[Any]] = None
+    predictions: Optional[Sequence[Any]] = None
+    invalid_rows: Optional[Sequence[Tuple[int, Any]]] = None
+
+
+@dataclass(slots=True)
+class PredictionSummary:
+    """Строка истории джоб: только короткие поля, без входных данных и прогнозов."""
+    id: int
+    owner_id: int
+    model_name: str
+    cost: int
+    created_at: datetime
+    status: JobStatus
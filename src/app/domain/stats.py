@@ -0,0 +1,55 @@
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+@dataclass(slots=True)
+class PairStats:
+    """
+    Достаточные статистики OLS y ~ a + b * x: число пар, средние и центрированные
+    суммы Sxx, Sxy. Части ряда считаются независимо и сливаются (формулы Чана) —
+    без потери точности, которой страдают «сырые» суммы x², xy на длинных рядах.
+    """
+    n: int = 0
+    mx: float = 0.0
+    my: float = 0.0
+    sxx: float = 0.0
+    sxy: float = 0.0
+
+    @classmethod
+    def of(cls, x: Any, y: Any) -> "PairStats":
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if len(x) == 0:
+            return cls()
+        mx, my = float(np.mean(x)), float(np.mean(y))
+        dx = x - mx
+        return cls(len(x), mx, my, float(dx @ dx), float(dx @ (y - my)))
+
+    def merge(self, other: "PairStats") -> "PairStats":
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            return other
+        n = self.n + other.n
+        dx, dy = other.mx - self.mx, other.my - self.my
+        w = self.n * other.n / n
+        return PairStats(
+            n,
+            self.mx + dx * other.n / n,
+            self.my + dy * other.n / n,
+            self.sxx + other.sxx + dx * dx * w,
+            self.sxy + other.sxy + dx * dy * w,
+        )
+
+    def slope(self) -> Optional[float]:
+        """b = Sxy / Sxx; None — x не меняется (наклон не определён)."""
+        return None if self.sxx == 0.0 else self.sxy / self.sxx
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "PairStats":
+        return cls(**data) if data else cls()
@@ -1,4 +1,5 @@
 from abc import ABC
+from dataclasses import dataclass
 from datetime import datetime, UTC
 from src.app.domain.enums import Role, TxType
 from src.app.domain.account import Account
@@ -59,6 +60,19 @@ class Admin(User):
         user._change_balance(amount, reason, TxType.DEPOSIT)
 
 
+# === Principal ===
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Кто делает запрос: идентичность без баланса (баланс меняет воркер — читать из БД)."""
+    user_id: int
+    role: Role
+    account_id: int
+
+    @classmethod
+    def of(cls, user: User) -> "Principal":
+        return cls(user_id=user.id, role=user.role, account_id=user.account.id)
+
+
 if __name__ == '__main__':
     # Пользователь регистрируется
     raw_password = "password123"
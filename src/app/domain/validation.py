@@ -1,14 +1,43 @@
 from typing import Sequence, Tuple, Any, Dict, List, Optional
 from dataclasses import dataclass
-from datetime import datetime, UTC
+from datetime import datetime, timedelta, UTC
+from itertools import repeat
+from operator import itemgetter
 import logging, math, re
 
+import numpy as np
+
 logging.basicConfig(level=logging.INFO)
 
+# смещение «наивного» времени (без tz) в колонке tz_offset_us
+NAIVE = np.iinfo(np.int64).min
+
+_EPOCH = datetime(1970, 1, 1)
+_ONE_US = timedelta(microseconds=1)
+_US = 1_000_000
+
+# epoch-секунды вне окна (с запасом в сутки от 0001/9999) разбираются построчно
+_EPOCH_MIN = -62135596800.0 + 86400
+_EPOCH_MAX = 253402300799.0 - 86400
+
+# вид значения ячейки для векторного разбора
+_NUM, _STR, _NONE, _OTHER = 0, 1, 2, 3
+_TIME_KINDS = {float: _NUM, int: _NUM, bool: _NUM, np.float64: _NUM, str: _STR, type(None): _NONE}
+_PRICE_KINDS = {float: _NUM, int: _NUM, np.float64: _NUM, str: _STR, type(None): _NONE}
+
+# ошибки строк в колоночном движке
+_OK, _BAD_TIME, _BAD_PRICE = 0, 1, 2
+_MAX_FAST_STR = 32
+
+
 @dataclass()
 class ValidationResult:
     valid_rows: List[Dict[str, Any]]
     invalid_rows: List[Tuple[int, Dict[str, Any]]]
+    # колонки valid_rows (в том же порядке), заполняет колоночный движок
+    prices: Optional[np.ndarray] = None           # float64
+    ts_wall_us: Optional[np.ndarray] = None       # int64, «настенное» время в мкс от 1970-01-01
+    tz_offset_us: Optional[np.ndarray] = None     # int64, смещение tz в мкс или NAIVE
 
 
 class Validator:
@@ -19,6 +48,8 @@ class Validator:
     # допустимые имена цены (без учёта регистра)
     PRICE_KEYS = {"price", "value", "target", "close", "y"}
     _THOUSANDS_RE = re.compile(r"[ _]")
+    # с какого размера батча включается колоночный движок
+    COLUMNAR_MIN_ROWS = 1024
 
     @staticmethod
     def _parse_dt(v: Any) -> Optional[datetime]:
@@ -68,41 +99,492 @@ class Validator:
                 return None
         return None
 
+    @classmethod
+    def _check_row(cls, row: Any) -> Tuple[Optional[Dict[str, Any]], Optional[datetime], Optional[float]]:
+        """Построчная проверка: (ошибка для invalid_rows | None, время, цена)."""
+        if not isinstance(row, dict):
+            return {"_error": "not_a_dict", "value": row}, None, None
+
+        # ищем ключи времени/цены
+        time_key  = next((k for k in row.keys() if k.lower() in cls.TIME_KEYS), None)
+        price_key = next((k for k in row.keys() if k.lower() in cls.PRICE_KEYS), None)
+
+        if time_key is None:
+            return {"_error": "missing_time", **row}, None, None
+        if price_key is None:
+            return {"_error": "missing_price", **row}, None, None
+
+        dt = cls._parse_dt(row.get(time_key))
+        if dt is None:
+            return {"_error": "bad_time", **row}, None, None
+
+        price = cls._maybe_float(row.get(price_key))
+        if price is None:
+            return {"_error": "bad_price", **row}, None, None
+
+        return None, dt, price
+
+    @classmethod
+    def time_parts(cls, values: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(ok, wall_us, tz_offset_us) для колонки значений времени — как в колоночном движке."""
+        ok, wall, off, _ = _time_column(cls, values)
+        return ok, wall, off
+
     @classmethod
     def validate(cls, raw: Sequence[Dict[str, Any]]) -> ValidationResult:
+        if len(raw) >= cls.COLUMNAR_MIN_ROWS:
+            return cls.validate_columnar(raw)
+        return cls.validate_rows(raw)
+
+    @classmethod
+    def validate_rows(cls, raw: Sequence[Dict[str, Any]]) -> ValidationResult:
+        """Эталонный построчный путь."""
         valid_rows: List[Dict[str, Any]] = []
         invalid_rows: List[Tuple[int, Dict[str, Any]]] = []
 
         for idx, row in enumerate(raw):
-            if not isinstance(row, dict):
-                invalid_rows.append((idx, {"_error": "not_a_dict", "value": row}))
+            error, dt, price = cls._check_row(row)
+            if error is not None:
+                invalid_rows.append((idx, error))
                 continue
+            valid_rows.append({"timestamp": dt.isoformat(), "price": float(price)})
 
-            # ищем ключи времени/цены
-            time_key  = next((k for k in row.keys() if k.lower() in cls.TIME_KEYS), None)
-            price_key = next((k for k in row.keys() if k.lower() in cls.PRICE_KEYS), None)
+        # сортировка по времени
+        valid_rows.sort(key=lambda r: r["timestamp"])
 
-            if time_key is None:
-                invalid_rows.append((idx, {"_error": "missing_time", **row}))
-                continue
-            if price_key is None:
-                invalid_rows.append((idx, {"_error": "missing_price", **row}))
-                continue
+        logging.info("Validator: %d valid, %d invalid", len(valid_rows), len(invalid_rows))
+        return ValidationResult(valid_rows=valid_rows, invalid_rows=invalid_rows)
 
-            dt = cls._parse_dt(row.get(time_key))
-            if dt is None:
-                invalid_rows.append((idx, {"_error": "bad_time", **row}))
-                continue
+    # колоночный движок
+    @classmethod
+    def validate_columnar(cls, raw: Sequence[Dict[str, Any]]) -> ValidationResult:
+        """
+        Тот же результат, что validate_rows, но колонки времени/цены ищутся один раз
+        на батч, разбор и сортировка — векторные (NumPy). Строки другой «формы»
+        (иной набор ключей, не dict) проверяются построчно тем же _check_row.
+        """
+        rows = raw if isinstance(raw, list) else list(raw)
+        first = next((r for r in rows if type(r) is dict), None)
+        if first is None or not all(type(k) is str for k in first):
+            return cls.validate_rows(rows)
+
+        time_cands = [k for k in first if k.lower() in cls.TIME_KEYS]
+        price_cands = [k for k in first if k.lower() in cls.PRICE_KEYS]
+        # при нескольких кандидатах выбор ключа зависит от порядка ключей
+        if len(time_cands) > 1 or len(price_cands) > 1:
+            shape = tuple(first)
+            same = [type(r) is dict and tuple(r) == shape for r in rows]
+        else:
+            keys = first.keys()
+            same = [type(r) is dict and r.keys() == keys for r in rows]
+        same = np.fromiter(same, dtype=bool, count=len(rows))
+        main_idx = np.flatnonzero(same)
+        main_rows = [rows[i] for i in main_idx.tolist()] if len(main_idx) < len(rows) else rows
+
+        time_key = time_cands[0] if time_cands else None
+        price_key = price_cands[0] if price_cands else None
+        if time_key is None or price_key is None:
+            code = "missing_time" if time_key is None else "missing_price"
+            return cls._columnar_shape_error(rows, main_idx, same, code)
+
+        return cls._validate_main(
+            rows, same, main_idx,
+            list(map(itemgetter(time_key), main_rows)),
+            list(map(itemgetter(price_key), main_rows)),
+        )
+
+    @classmethod
+    def validate_columns(cls, columns: Dict[str, Sequence[Any]]) -> ValidationResult:
+        """
+        Колоночный вход (dict колонок одинаковой длины) — эквивалент списка строк
+        {k: columns[k][i]}. Колонки могут быть списками или массивами NumPy
+        (float64/int64; datetime64 трактуется как наивное время).
+        """
+        names = list(columns)
+        n = len(columns[names[0]]) if names else 0
+        time_key = next((k for k in names if k.lower() in cls.TIME_KEYS), None)
+        price_key = next((k for k in names if k.lower() in cls.PRICE_KEYS), None)
+
+        if time_key is None or price_key is None:
+            code = "missing_time" if time_key is None else "missing_price"
+            invalid_rows = [(i, {"_error": code, **{k: _py(columns[k][i]) for k in names}}) for i in range(n)]
+            logging.info("Validator: %d valid, %d invalid", 0, len(invalid_rows))
+            return ValidationResult(valid_rows=[], invalid_rows=invalid_rows)
 
-            price = cls._maybe_float(row.get(price_key))
-            if price is None:
-                invalid_rows.append((idx, {"_error": "bad_price", **row}))
+        all_idx = np.arange(n)
+        return cls._validate_main(
+            None, np.ones(n, dtype=bool), all_idx,
+            columns[time_key], columns[price_key],
+            row_at=lambda i: {k: _py(columns[k][i]) for k in names},
+        )
+
+    @classmethod
+    def _columnar_shape_error(cls, rows, main_idx, same, code) -> ValidationResult:
+        main = set(main_idx.tolist())
+        valid: List[Tuple[int, datetime, float]] = []
+        invalid_rows: List[Tuple[int, Dict[str, Any]]] = []
+        for idx, row in enumerate(rows):
+            if idx in main:
+                invalid_rows.append((idx, {"_error": code, **row}))
                 continue
+            error, dt, price = cls._check_row(row)
+            if error is not None:
+                invalid_rows.append((idx, error))
+            else:
+                valid.append((idx, dt, price))
 
-            valid_rows.append({"timestamp": dt.isoformat(), "price": float(price)})
+        cols = _slow_columns(valid)
+        return cls._assemble(cols, invalid_rows)
 
-        # сортировка по времени
-        valid_rows.sort(key=lambda r: r["timestamp"])
+    @classmethod
+    def _validate_main(cls, rows, same, main_idx, time_vals, price_vals, row_at=None) -> ValidationResult:
+        t_ok, wall, off, iso_slow = _time_column(cls, time_vals)
+        p_ok, price = _price_column(cls, price_vals)
+
+        errors = np.where(~t_ok, _BAD_TIME, np.where(~p_ok, _BAD_PRICE, _OK)).astype(np.int8)
+        ok = errors == _OK
+        row_at = row_at or rows.__getitem__
+
+        # ошибки основной формы + построчная проверка прочих строк
+        invalid_rows: List[Tuple[int, Dict[str, Any]]] = []
+        slow_valid: List[Tuple[int, datetime, float]] = []
+        bad_pos = np.flatnonzero(~ok)
+        bad_main = dict(zip(main_idx[bad_pos].tolist(), errors[bad_pos].tolist()))
+        n_total = len(same)
+        if len(bad_main) or len(main_idx) < n_total:
+            others = np.flatnonzero(~same).tolist()
+            for idx in sorted(bad_main.keys() | set(others)):
+                code = bad_main.get(idx)
+                if code is not None:
+                    name = "bad_time" if code == _BAD_TIME else "bad_price"
+                    invalid_rows.append((idx, {"_error": name, **row_at(idx)}))
+                    continue
+                error, dt, p = cls._check_row(rows[idx])
+                if error is not None:
+                    invalid_rows.append((idx, error))
+                else:
+                    slow_valid.append((idx, dt, p))
+
+        pos = np.flatnonzero(ok)
+        cols = (
+            main_idx[pos],
+            wall[pos],
+            off[pos],
+            _iso_strings(wall[pos], off[pos], [iso_slow.get(i) for i in pos.tolist()] if iso_slow else None),
+            price[pos],
+        )
+        if slow_valid:
+            cols = _merge_columns(cols, _slow_columns(slow_valid))
+        return cls._assemble(cols, invalid_rows)
+
+    @staticmethod
+    def _assemble(cols, invalid_rows) -> ValidationResult:
+        _, wall, off, iso, price = cols
+        if len(wall) and (off == off[0]).all():
+            # одинаковый tz-суффикс: порядок ISO-строк совпадает с порядком времени
+            order = np.argsort(wall, kind="stable")
+        else:
+            order = np.argsort(np.array(iso, dtype=str), kind="stable")
 
+        iso_sorted = [iso[i] for i in order.tolist()]
+        price_sorted = price[order]
+        valid_rows = [
+            {"timestamp": t, "price": p}
+            for t, p in zip(iso_sorted, price_sorted.tolist())
+        ]
         logging.info("Validator: %d valid, %d invalid", len(valid_rows), len(invalid_rows))
-        return ValidationResult(valid_rows=valid_rows, invalid_rows=invalid_rows)
\ No newline at end of file
+        return ValidationResult(
+            valid_rows=valid_rows,
+            invalid_rows=invalid_rows,
+            prices=price_sorted,
+            ts_wall_us=wall[order],
+            tz_offset_us=off[order],
+        )
+
+
+# векторные помощники колоночного движка
+
+def _py(v: Any) -> Any:
+    """Скаляр NumPy -> значение Python (для invalid_rows, которые уходят в JSON)."""
+    if isinstance(v, np.datetime64):
+        return None if np.isnat(v) else str(np.datetime_as_string(v))
+    if isinstance(v, np.floating) and not np.isfinite(v):
+        return None  # null колонки Arrow/CSV; NaN не пишется в JSON Postgres
+    if isinstance(v, np.generic):
+        return v.item()
+    return v
+
+
+def _take(values: Sequence[Any], pos: np.ndarray) -> List[Any]:
+    if isinstance(values, np.ndarray):
+        return values[pos]
+    if len(pos) == len(values):
+        return values if isinstance(values, list) else list(values)
+    return [values[i] for i in pos.tolist()]
+
+
+def _kinds(values: Sequence[Any], table: Dict[type, int]) -> np.ndarray:
+    return np.fromiter(map(table.get, map(type, values), repeat(_OTHER)), dtype=np.int8, count=len(values))
+
+
+def _dt_parts(dt: datetime) -> Tuple[int, int]:
+    off = dt.utcoffset()
+    wall = (dt.replace(tzinfo=None) - _EPOCH) // _ONE_US
+    return wall, (NAIVE if off is None else off // _ONE_US)
+
+
+def _epoch_to_us(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Как datetime.fromtimestamp: дробная часть округляется до мкс half-even."""
+    ok = np.isfinite(x) & (x >= _EPOCH_MIN) & (x <= _EPOCH_MAX)
+    x = np.where(ok, x, 0.0)
+    ip = np.trunc(x)
+    frac = np.round((x - ip) * 1e6)
+    return ok, ip.astype(np.int64) * _US + frac.astype(np.int64)
+
+
+def _civil_days(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """Дни от 1970-01-01 для пролептического григорианского календаря."""
+    y = y - (m <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * ((m + 9) % 12) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+_DIM = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+
+
+_CHUNK = 65_536
+
+
+def _iso_fast(strs: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Разбор канонических ISO-строк: YYYY-MM-DD, YYYY-MM-DD[T ]HH:MM:SS[.ffffff]
+    с необязательным «Z»/«+00:00». Прочее — ok=False (уходит в построчный разбор).
+    """
+    parts = [_iso_fast_chunk(strs[i:i + _CHUNK]) for i in range(0, len(strs), _CHUNK)]
+    return tuple(np.concatenate(p) for p in zip(*parts))
+
+
+def _iso_fast_chunk(strs: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n = len(strs)
+    lens = np.fromiter(map(len, strs), dtype=np.int64, count=n)
+    fits = lens <= _MAX_FAST_STR
+    arr = np.array([s if f else "" for s, f in zip(strs, fits.tolist())], dtype=f"U{_MAX_FAST_STR}")
+    # U-строки NumPy теряют хвостовые NUL — такие строки не считаем каноническими
+    fits &= np.strings.str_len(arr) == lens
+    c = arr.view(np.uint32).reshape(n, _MAX_FAST_STR).astype(np.int64)
+
+    def digits(a: int, b: int) -> Tuple[np.ndarray, np.ndarray]:
+        seg = c[:, a:b] - 48
+        ok = ((seg >= 0) & (seg <= 9)).all(axis=1)
+        val = np.zeros(n, dtype=np.int64)
+        for j in range(b - a):
+            val = val * 10 + seg[:, j]
+        return ok, val
+
+    def ch(i: int, s: str) -> np.ndarray:
+        return c[:, i] == ord(s)
+
+    def utc_suffix(at: int) -> np.ndarray:
+        z = (lens == at + 1) & ch(at, "Z")
+        utc = lens == at + 6
+        for j, s in enumerate("+00:00"):
+            utc &= ch(at + j, s)
+        return z | utc
+
+    ok_y, year = digits(0, 4)
+    ok_m, month = digits(5, 7)
+    ok_d, day = digits(8, 10)
+    ok_hh, hour = digits(11, 13)
+    ok_mm, minute = digits(14, 16)
+    ok_ss, second = digits(17, 19)
+    ok_us, micro = digits(20, 26)
+
+    date_ok = ok_y & ok_m & ok_d & ch(4, "-") & ch(7, "-")
+    time_ok = date_ok & (ch(10, "T") | ch(10, " ")) & ok_hh & ok_mm & ok_ss & ch(13, ":") & ch(16, ":")
+    frac_ok = time_ok & ch(19, ".") & ok_us
+
+    aware19, aware26 = utc_suffix(19), utc_suffix(26)
+    is_date = date_ok & (lens == 10)
+    is_dt = time_ok & ((lens == 19) | aware19)
+    is_frac = frac_ok & ((lens == 26) | aware26)
+
+    with_time = is_dt | is_frac
+    hour = np.where(with_time, hour, 0)
+    minute = np.where(with_time, minute, 0)
+    second = np.where(with_time, second, 0)
+    micro = np.where(is_frac, micro, 0)
+
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    dim = _DIM[np.clip(month, 0, 12)] + ((month == 2) & leap)
+    ranges = (
+        (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= dim)
+        & (hour <= 23) & (minute <= 59) & (second <= 59)
+    )
+    ok = fits & (is_date | is_dt | is_frac) & ranges
+    wall = (
+        _civil_days(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+    ) * _US + micro
+    aware = (is_dt & aware19) | (is_frac & aware26)
+    off = np.where(aware, 0, NAIVE)
+    return ok, np.where(ok, wall, 0), off
+
+
+_PRICE_CHUNK = 4096
+_PRICE_LEAF = 16
+
+
+def _price_fast(strs: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Цена из строк. Если float(s) принимает строку, результат совпадает с _maybe_float
+    (внутренних пробелов и запятых нет, «_» float допускает сам), поэтому разбор идёт
+    через map(float) кусками. Кусок с ошибкой делится пополам до мелких листьев,
+    листья с ошибкой — ok=False и уходят в построчный разбор.
+    """
+    n = len(strs)
+    ok = np.ones(n, dtype=bool)
+    price = np.zeros(n, dtype=np.float64)
+
+    def fill(lo: int, hi: int) -> None:
+        try:
+            price[lo:hi] = np.fromiter(map(float, strs[lo:hi]), dtype=np.float64, count=hi - lo)
+        except ValueError:
+            if hi - lo <= _PRICE_LEAF:
+                ok[lo:hi] = False
+            else:
+                mid = (lo + hi) // 2
+                fill(lo, mid)
+                fill(mid, hi)
+
+    for i in range(0, n, _PRICE_CHUNK):
+        fill(i, min(i + _PRICE_CHUNK, n))
+    return ok, price
+
+
+def _time_column(cls, values) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[int, str]]:
+    """(ok, wall_us, tz_offset_us, {позиция: ISO} для построчно разобранных)."""
+    n = len(values)
+    ok = np.zeros(n, dtype=bool)
+    wall = np.zeros(n, dtype=np.int64)
+    off = np.full(n, NAIVE, dtype=np.int64)
+    iso_slow: Dict[int, str] = {}
+
+    if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+        us = values.astype("datetime64[us]")
+        ok = ~np.isnat(us)
+        return ok, np.where(ok, us.view(np.int64), 0), off, iso_slow
+
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iuf":
+        kinds = np.full(n, _NUM, dtype=np.int8)
+    else:
+        kinds = _kinds(values, _TIME_KINDS)
+    slow: List[int] = np.flatnonzero(kinds == _OTHER).tolist()
+
+    pos = np.flatnonzero(kinds == _NUM)
+    if len(pos):
+        try:
+            x = np.asarray(_take(values, pos), dtype=np.float64)
+        except (OverflowError, TypeError, ValueError):
+            slow.extend(pos.tolist())
+        else:
+            e_ok, e_us = _epoch_to_us(x)
+            ok[pos], wall[pos], off[pos] = e_ok, e_us, 0
+            # за пределами окна — построчно (там fromtimestamp может и не упасть)
+            slow.extend(pos[~e_ok & np.isfinite(x)].tolist())
+
+    pos = np.flatnonzero(kinds == _STR)
+    if len(pos):
+        s_ok, s_wall, s_off = _iso_fast(_take(values, pos))
+        ok[pos], wall[pos], off[pos] = s_ok, s_wall, s_off
+        slow.extend(pos[~s_ok].tolist())
+
+    for i in slow:
+        dt = cls._parse_dt(values[i])
+        if dt is None:
+            ok[i] = False
+            continue
+        ok[i] = True
+        wall[i], off[i] = _dt_parts(dt)
+        iso_slow[i] = dt.isoformat()
+    return ok, wall, off, iso_slow
+
+
+def _price_column(cls, values) -> Tuple[np.ndarray, np.ndarray]:
+    n = len(values)
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iuf":
+        price = values.astype(np.float64)
+        return np.isfinite(price), price
+
+    ok = np.zeros(n, dtype=bool)
+    price = np.zeros(n, dtype=np.float64)
+    kinds = _kinds(values, _PRICE_KINDS)
+    slow: List[int] = np.flatnonzero(kinds == _OTHER).tolist()
+
+    pos = np.flatnonzero(kinds == _NUM)
+    if len(pos):
+        try:
+            x = np.asarray(_take(values, pos), dtype=np.float64)
+        except (OverflowError, TypeError, ValueError):
+            slow.extend(pos.tolist())
+        else:
+            price[pos] = x
+            ok[pos] = np.isfinite(x)
+
+    pos = np.flatnonzero(kinds == _STR)
+    if len(pos):
+        s_ok, x = _price_fast(_take(values, pos))
+        price[pos] = x
+        ok[pos] = s_ok & np.isfinite(x)
+        slow.extend(pos[~s_ok].tolist())
+
+    for i in slow:
+        p = cls._maybe_float(values[i])
+        ok[i] = p is not None
+        price[i] = p if p is not None else 0.0
+    return ok, price
+
+
+def _iso_strings(wall: np.ndarray, off: np.ndarray, slow: Optional[List[Optional[str]]]) -> List[str]:
+    """ISO-строки как у datetime.isoformat(); строки с нестандартной tz — из построчного разбора."""
+    n = len(wall)
+    out = np.empty(n, dtype=object)
+    dt = wall.astype("datetime64[us]")
+    whole = wall % _US == 0
+    naive = off == NAIVE
+    for mask, unit in ((whole, "s"), (~whole, "us")):
+        for tz_mask, tail in ((naive, ""), (off == 0, "+00:00")):
+            m = mask & tz_mask
+            if m.any():
+                out[m] = np.strings.add(np.datetime_as_string(dt[m], unit=unit), tail)
+    iso = out.tolist()
+    if slow:
+        for i, s in enumerate(slow):
+            if s is not None:
+                iso[i] = s
+    return iso
+
+
+def _slow_columns(valid: List[Tuple[int, datetime, float]]):
+    idx = np.fromiter((v[0] for v in valid), dtype=np.int64, count=len(valid))
+    parts = [_dt_parts(v[1]) for v in valid]
+    wall = np.fromiter((p[0] for p in parts), dtype=np.int64, count=len(valid))
+    off = np.fromiter((p[1] for p in parts), dtype=np.int64, count=len(valid))
+    iso = [v[1].isoformat() for v in valid]
+    price = np.fromiter((v[2] for v in valid), dtype=np.float64, count=len(valid))
+    return idx, wall, off, iso, price
+
+
+def _merge_columns(a, b):
+    """Слить две группы валидных строк обратно в порядок исходных индексов."""
+    idx = np.concatenate([a[0], b[0]])
+    order = np.argsort(idx, kind="stable")
+    iso = a[3] + b[3]
+    return (
+        idx[order],
+        np.concatenate([a[1], b[1]])[order],
+        np.concatenate([a[2], b[2]])[order],
+        [iso[i] for i in order.tolist()],
+        np.concatenate([a[4], b[4]])[order],
+    )
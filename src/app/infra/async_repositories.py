@@ -0,0 +1,102 @@
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.app.infra.repositories import UserRepo, AccountRepo, PredictionRepo
+from src.app.domain.user import Client
+from src.app.domain.account import Account, Transaction
+from src.app.domain.prediction import PredictionJob, PredictionSummary, PredictionSlice, JOB_FIELDS
+from src.app.domain.enums import TxType, JobStatus
+
+# Async-репозитории для API. Запросы и ORM <-> Domain сопоставление — те же, что
+# в sync-репозиториях: код выполняется через AsyncSession.run_sync (greenlet),
+# I/O идёт через asyncpg на event loop, без потоков threadpool.
+
+
+class _AsyncRepo:
+    _sync_repo: Callable[[Session], Any]
+
+    def __init__(self, session: AsyncSession) -> None:
+        self._s = session
+
+    @property
+    def session(self) -> AsyncSession:
+        return self._s
+
+    async def _run(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        return await self._s.run_sync(lambda s: getattr(self._sync_repo(s), method)(*args, **kwargs))
+
+
+class AsyncUserRepo(_AsyncRepo):
+    _sync_repo = UserRepo
+
+    async def get(self, user_id: int) -> Client:
+        return await self._run("get", user_id)
+
+    async def get_by_email(self, email: str) -> Optional[Client]:
+        return await self._run("get_by_email", email)
+
+    async def add(self, dom_user: Client) -> Client:
+        return await self._run("add", dom_user)
+
+
+class AsyncAccountRepo(_AsyncRepo):
+    _sync_repo = AccountRepo
+
+    async def load(self, account_id: int) -> Account:
+        return await self._run("load", account_id)
+
+    async def transactions(self, account_id: int, *, limit: int = 50, before_id: int | None = None) -> List[Transaction]:
+        return await self._run("transactions", account_id, limit=limit, before_id=before_id)
+
+    async def deposit(self, account_id: int, amount: int, reason: str) -> int:
+        return await self._run("deposit", account_id, amount, reason)
+
+    async def charge(self, account_id: int, cost: int, reason: str, tx_type: TxType = TxType.PREDICTION_CHARGE) -> int:
+        return await self._run("charge", account_id, cost, reason, tx_type)
+
+    async def reserve(self, account_id: int, job_id: int, amount: int) -> None:
+        await self._run("reserve", account_id, job_id, amount)
+
+    async def release_hold(self, job_id: int) -> None:
+        await self._run("release_hold", job_id)
+
+
+class AsyncPredictionRepo(_AsyncRepo):
+    _sync_repo = PredictionRepo
+
+    async def create_pending(self, *, owner_id: int, model_name: str) -> PredictionJob:
+        return await self._run("create_pending", owner_id=owner_id, model_name=model_name)
+
+    async def get(self, job_id: int) -> Optional[PredictionJob]:
+        return await self._run("get", job_id)
+
+    async def get_slice(
+        self,
+        job_id: int,
+        *,
+        offset: int = 0,
+        limit: int | None = None,
+        fields: tuple[str, ...] = JOB_FIELDS,
+    ) -> Optional[PredictionSlice]:
+        return await self._run("get_slice", job_id, offset=offset, limit=limit, fields=fields)
+
+    async def summaries(self, job_ids: List[int]) -> List[PredictionSummary]:
+        return await self._run("summaries", job_ids)
+
+    async def list_summaries(
+        self,
+        user_id: int,
+        *,
+        limit: int = 50,
+        before_id: int | None = None,
+        status: JobStatus | None = None,
+        model_name: str | None = None,
+    ) -> List[PredictionSummary]:
+        return await self._run(
+            "list_summaries", user_id, limit=limit, before_id=before_id, status=status, model_name=model_name,
+        )
+
+    async def mark_error(self, job_id: int, error: str) -> None:
+        await self._run("mark_error", job_id, error)
@@ -0,0 +1,324 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterable, BinaryIO, Dict, Iterable, Iterator, Optional
+import asyncio, io, json, os, uuid
+
+from sqlalchemy import text
+
+from src.app.infra import codec
+from src.app.infra.ingest import IngestError
+
+# где хранить payload джоб: file (общий том) | pg (large objects Postgres)
+BLOB_STORE = os.getenv("BLOB_STORE", "file")
+BLOB_DIR = os.getenv("BLOB_DIR", "/data/blobs")
+# payload меньше порога (байт) едет в сообщении целиком; 0 — всегда inline
+CLAIM_CHECK_MIN_BYTES = int(os.getenv("CLAIM_CHECK_MIN_BYTES", str(256 * 1024)))
+
+CHUNK_SIZE = 64 * 1024
+# сколько кусков потока put_async держит в памяти, пока хранилище пишет
+STREAM_QUEUE_CHUNKS = 16
+
+
+class BlobNotFound(Exception): ...
+
+
+class BlobStore(ABC):
+    """
+    Хранилище payload'ов джоб (claim-check): API пишет строки один раз,
+    в сообщении очереди едет только ссылка вида "<scheme>:<key>".
+    """
+
+    scheme: str
+
+    @abstractmethod
+    def put(self, chunks: Iterable[bytes], suffix: str = "ndjson") -> str:
+        """Записать поток байт, вернуть ссылку; suffix — формат содержимого (для файлов)."""
+        ...
+
+    @abstractmethod
+    def open(self, ref: str) -> Iterator[bytes]:
+        """Прочитать содержимое кусками."""
+        ...
+
+    @abstractmethod
+    def delete(self, ref: str) -> None:
+        ...
+
+    def _key(self, ref: str) -> str:
+        scheme, _, key = ref.partition(":")
+        if scheme != self.scheme or not key:
+            raise ValueError(f"Not a {self.scheme} blob ref: {ref}")
+        return key
+
+
+class FileBlobStore(BlobStore):
+    """Файлы в каталоге, общем для API и воркеров (docker volume)."""
+
+    scheme = "file"
+
+    def __init__(self, root: str = BLOB_DIR) -> None:
+        self.root = root
+
+    def _path(self, ref: str) -> str:
+        key = self._key(ref)
+        if os.sep in key or key.startswith("."):
+            raise ValueError(f"Bad blob key: {key}")
+        return os.path.join(self.root, key)
+
+    def put(self, chunks: Iterable[bytes], suffix: str = "ndjson") -> str:
+        os.makedirs(self.root, exist_ok=True)
+        key = f"{uuid.uuid4().hex}.{suffix}"
+        tmp = os.path.join(self.root, f".{key}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            # атомарно: воркер не увидит недописанный файл
+            os.replace(tmp, os.path.join(self.root, key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return f"{self.scheme}:{key}"
+
+    def open(self, ref: str) -> Iterator[bytes]:
+        try:
+            f = open(self._path(ref), "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(ref)
+        with f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+
+    def delete(self, ref: str) -> None:
+        try:
+            os.remove(self._path(ref))
+        except FileNotFoundError:
+            pass
+
+
+class PgBlobStore(BlobStore):
+    """Large objects Postgres (lo_*): не нужен общий том, данные — в той же БД."""
+
+    scheme = "pg"
+
+    def __init__(self, engine=None) -> None:
+        self._engine = engine
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from src.app.infra.db import engine
+            self._engine = engine
+        return self._engine
+
+    def put(self, chunks: Iterable[bytes], suffix: str = "ndjson") -> str:
+        with self.engine.begin() as conn:
+            oid = conn.execute(text("SELECT lo_create(0)")).scalar_one()
+            offset = 0
+            for chunk in chunks:
+                conn.execute(text("SELECT lo_put(:oid, :off, :data)"), {"oid": oid, "off": offset, "data": chunk})
+                offset += len(chunk)
+        return f"{self.scheme}:{oid}"
+
+    def open(self, ref: str) -> Iterator[bytes]:
+        oid = int(self._key(ref))
+        with self.engine.connect() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM pg_largeobject_metadata WHERE oid = :oid"), {"oid": oid}
+            ).scalar_one_or_none()
+            if exists is None:
+                raise BlobNotFound(ref)
+            offset = 0
+            while True:
+                chunk = conn.execute(
+                    text("SELECT lo_get(:oid, :off, :n)"), {"oid": oid, "off": offset, "n": CHUNK_SIZE}
+                ).scalar_one()
+                if not chunk:
+                    return
+                yield bytes(chunk)
+                offset += len(chunk)
+
+    def delete(self, ref: str) -> None:
+        oid = int(self._key(ref))
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("SELECT lo_unlink(oid) FROM pg_largeobject_metadata WHERE oid = :oid"), {"oid": oid}
+            )
+
+
+_STORES: Dict[str, BlobStore] = {}
+
+
+def store_for(scheme: str) -> BlobStore:
+    if scheme not in _STORES:
+        if scheme == FileBlobStore.scheme:
+            _STORES[scheme] = FileBlobStore()
+        elif scheme == PgBlobStore.scheme:
+            _STORES[scheme] = PgBlobStore()
+        else:
+            raise ValueError(f"Unknown blob store: {scheme}")
+    return _STORES[scheme]
+
+
+def default_store() -> BlobStore:
+    return store_for(BLOB_STORE)
+
+
+def resolve(ref: str) -> BlobStore:
+    """Хранилище по ссылке (воркер читает то, что записал API, независимо от своей настройки)."""
+    return store_for(ref.partition(":")[0])
+
+
+# формат payload: NDJSON, одна строка датасета на строку файла
+
+def encode_ndjson(rows: Iterable[Any]) -> Iterator[bytes]:
+    buf: list[bytes] = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+        buf.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield b"".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b"".join(buf)
+
+
+def _decode_lines(lines: list[bytes], first_line: int) -> list[Any]:
+    """Строки NDJSON подряд (first_line — номер первой в потоке, с 1); пустые пропускаются."""
+    # каждая строка разбирается отдельно: склейка в один массив приняла бы и строки
+    # вроде "[1" + "2]" или {"a":1},{"b":2} и сдвинула бы номера строк
+    out = []
+    for no, line in enumerate(lines, first_line):
+        if not line.strip():
+            continue
+        try:
+            out.append(codec.loads(line))
+        except ValueError:
+            # orjson не принимает NaN/Infinity, которые пишет json.dumps
+            try:
+                out.append(json.loads(line))
+            except ValueError as exc:
+                raise IngestError(f"NDJSON line {no}: {exc}") from exc
+    return out
+
+
+def decode_ndjson(chunks: Iterable[bytes], start: int = 0, stop: Optional[int] = None) -> Iterator[Any]:
+    """
+    Строки NDJSON; start/stop — диапазон по номерам непустых строк (как считает
+    ingest.LineCounter), остальные не разбираются. Строка, которая не является
+    одним JSON-значением, — ingest.IngestError с номером строки.
+    """
+    tail = b""
+    seen = 0       # непустых строк в предыдущих кусках
+    line_no = 1    # номер первой строки куска
+    ranged = bool(start) or stop is not None
+    for chunk in chunks:
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        first = line_no
+        line_no += len(lines)
+        if ranged:
+            filled = [i for i, line in enumerate(lines) if line.strip()]
+            lo, hi = max(start - seen, 0), len(filled) if stop is None else max(stop - seen, 0)
+            seen += len(filled)
+            picked = filled[lo:hi]
+            first += picked[0] if picked else 0
+            lines = lines[picked[0]:picked[-1] + 1] if picked else []
+        yield from _decode_lines(lines, first)
+        if stop is not None and seen >= stop:
+            return
+    if seen >= start:
+        yield from _decode_lines([tail], line_no)
+
+
+def put_rows(rows: Iterable[Any], store: Optional[BlobStore] = None) -> str:
+    return (store or default_store()).put(encode_ndjson(rows))
+
+
+_END = object()
+
+
+class _Aborted(Exception): ...
+
+
+async def put_async(
+    chunks: AsyncIterable[bytes], store: Optional[BlobStore] = None, suffix: str = "ndjson",
+) -> str:
+    """
+    Записать асинхронный поток байт (тело запроса) в хранилище. put() хранилища
+    работает в потоке и забирает куски из ограниченной очереди — в памяти не
+    больше STREAM_QUEUE_CHUNKS кусков. Ошибка источника — недописанный blob удаляется.
+    """
+    store = store or default_store()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+
+    def pull() -> Iterator[bytes]:
+        while True:
+            item = asyncio.run_coroutine_threadsafe(queue.get(), loop).result()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise _Aborted() from item
+            yield item
+
+    writer = asyncio.ensure_future(asyncio.to_thread(store.put, pull(), suffix))
+
+    async def send(item: Any) -> None:
+        put = asyncio.ensure_future(queue.put(item))
+        await asyncio.wait({put, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():  # хранилище упало и больше не читает
+            put.cancel()
+            await writer
+
+    try:
+        async for chunk in chunks:
+            if chunk:
+                await send(chunk)
+    except BaseException as exc:
+        if not writer.done():
+            await send(exc)
+        try:
+            await writer
+        except _Aborted:
+            pass
+        raise
+    await send(_END)
+    return await writer
+
+
+def read_rows(ref: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Any]:
+    return decode_ndjson(resolve(ref).open(ref), start, stop)
+
+
+class _ChunkReader(io.RawIOBase):
+    """Файловый объект поверх потока кусков (для читателей, которым нужен file-like)."""
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        self._chunks = chunks
+        self._buf = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buf:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buf = memoryview(chunk)
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
+def open_file(ref: str) -> BinaryIO:
+    """Содержимое blob'а как бинарный файл (только последовательное чтение)."""
+    return io.BufferedReader(_ChunkReader(iter(resolve(ref).open(ref))), CHUNK_SIZE)
+
+
+def delete(ref: str) -> None:
+    resolve(ref).delete(ref)
@@ -0,0 +1,22 @@
+"""
+JSON на orjson для ответов API и сообщений очереди. NumPy-массивы (прогнозы из
+Arrow-payload) сериализуются напрямую, без сборки списков Python; aware-datetime
+в UTC пишется с суффиксом Z, как у Pydantic.
+"""
+from typing import Any
+
+import orjson
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+# тип сообщений очереди: без json/text FastStream не разбирает тело сам и
+# отдаёт подписчику байты — их разбирает loads
+MESSAGE_CONTENT_TYPE = "application/octet-stream"
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, option=_OPTIONS)
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    return orjson.loads(data)
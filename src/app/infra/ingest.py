@@ -0,0 +1,358 @@
+"""
+Потоковый разбор загружаемых датасетов: файл читается кусками, строки отдаются
+по одной — в памяти не бывает ни всего файла, ни всего списка строк.
+"""
+import codecs, csv, io, json
+from datetime import date, datetime, time
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional
+
+READ_CHUNK = 64 * 1024
+# строки Parquet/XLSX читаются пачками такого размера
+INGEST_BATCH_ROWS = 4096
+# одна строка датасета (JSON-объект) не может быть больше (символов)
+MAX_ITEM_CHARS = 1024 * 1024
+
+
+class IngestError(ValueError):
+    """Файл не удаётся разобрать (формат, структура)."""
+
+
+Row = Dict[str, Any]
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    ext = (filename or "").lower().rsplit(".", 1)[-1] if "." in (filename or "") else ""
+    ctype = (content_type or "").lower()
+    if ext == "csv" or "csv" in ctype:
+        return "csv"
+    if ext in ("json", "ndjson", "jsonl") or "json" in ctype:
+        return "json"
+    if ext in ("parquet", "pq") or "parquet" in ctype:
+        return "parquet"
+    if ext == "xlsx" or "spreadsheetml" in ctype:
+        return "xlsx"
+    return None
+
+
+def iter_rows(fileobj: BinaryIO, fmt: str) -> Iterator[Row]:
+    """Строки датасета из бинарного файла в формате fmt (см. detect_format)."""
+    if fmt == "csv":
+        return iter_csv(fileobj)
+    if fmt == "json":
+        return iter_json(fileobj)
+    if fmt == "parquet":
+        return iter_parquet(fileobj)
+    if fmt == "xlsx":
+        return iter_xlsx(fileobj)
+    raise IngestError(f"Unsupported file type: {fmt}")
+
+
+# CSV
+
+def iter_csv(fileobj: BinaryIO) -> Iterator[Row]:
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        reader = csv.DictReader(text)
+        if not reader.fieldnames:
+            raise IngestError("Invalid file: CSV header is missing")
+        yield from reader
+    finally:
+        text.detach()  # не закрывать файл загрузки вместе с обёрткой
+
+
+# JSON: массив объектов, NDJSON или {колонка: [значения]}
+
+def _text_chunks(fileobj: BinaryIO) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="strict")
+    try:
+        while chunk := fileobj.read(READ_CHUNK):
+            if text := decoder.decode(chunk):
+                yield text
+        if tail := decoder.decode(b"", final=True):
+            yield tail
+    except UnicodeDecodeError as exc:
+        raise IngestError("Invalid file: not UTF-8") from exc
+
+
+class _JsonScanner:
+    """Буфер над потоком текста: raw_decode очередного значения с подкачкой."""
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, chunks: Iterator[str]) -> None:
+        self._chunks = chunks
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _more(self) -> bool:
+        if self.eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> Optional[str]:
+        """Следующий непробельный символ (не потребляя его); None — конец потока."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return None
+
+    def take(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise IngestError("Invalid file: not a valid JSON. Fix quotes/format")
+        self.pos += 1
+
+    def value(self) -> Any:
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if len(self.buf) - self.pos > MAX_ITEM_CHARS or not self._more():
+                    raise IngestError("Invalid file: not a valid JSON. Fix quotes/format")
+                continue
+            # число на границе куска могло обрезаться — объекты/массивы так не обрезаются
+            if end == len(self.buf) and not isinstance(obj, (dict, list)) and self._more():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_json(fileobj: BinaryIO) -> Iterator[Row]:
+    sc = _JsonScanner(_text_chunks(fileobj))
+    first = sc.peek()
+    if first is None:
+        return
+
+    if first == "[":
+        sc.take("[")
+        if sc.peek() == "]":
+            return
+        while True:
+            if sc.peek() != "{":
+                raise IngestError("Invalid file: unsupported JSON structure")
+            yield sc.value()
+            if sc.peek() == "]":
+                break
+            sc.take(",")
+        sc.take("]")
+        if sc.peek() is not None:
+            raise IngestError("Invalid file: not a valid JSON. Fix quotes/format")
+        return
+
+    if first != "{":
+        raise IngestError("Invalid file: unsupported JSON structure")
+
+    obj = sc.value()
+    if sc.peek() is None:
+        # один объект: {колонка: [значения]} (грузится целиком) или одна строка
+        yield from _columns_to_rows(obj)
+        return
+
+    # NDJSON: объект на строку
+    yield obj
+    while (ch := sc.peek()) is not None:
+        if ch != "{":
+            raise IngestError("Invalid file: unsupported JSON structure")
+        yield sc.value()
+
+
+def _columns_to_rows(data: Dict[str, Any]) -> Iterator[Row]:
+    if data and all(isinstance(v, list) for v in data.values()):
+        keys = list(data.keys())
+        length = max(len(v) for v in data.values())
+        for i in range(length):
+            yield {k: (data[k][i] if i < len(data[k]) else None) for k in keys}
+    else:
+        yield data
+
+
+# Parquet / XLSX: даты — в ISO-строки, чтобы строки сериализовались в JSON
+
+def _jsonable(v: Any) -> Any:
+    if isinstance(v, (datetime, date, time)):
+        return v.isoformat()
+    return v
+
+
+def iter_parquet(fileobj: BinaryIO) -> Iterator[Row]:
+    import pyarrow.parquet as pq
+
+    try:
+        pf = pq.ParquetFile(fileobj)
+    except Exception as exc:
+        raise IngestError(f"Invalid file: not a Parquet file ({exc})") from exc
+    for batch in pf.iter_batches(batch_size=INGEST_BATCH_ROWS):
+        for row in batch.to_pylist():
+            yield {k: _jsonable(v) for k, v in row.items()}
+
+
+def iter_xlsx(fileobj: BinaryIO) -> Iterator[Row]:
+    from openpyxl import load_workbook
+
+    try:
+        wb = load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as exc:
+        raise IngestError(f"XLSX parsing error: {exc}") from exc
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise IngestError("Invalid file: XLSX header is missing")
+        keys = [str(h) if h is not None else f"col{i}" for i, h in enumerate(header)]
+        for values in rows:
+            if all(v is None for v in values):
+                continue
+            yield {k: _jsonable(v) for k, v in zip(keys, values)}
+    finally:
+        wb.close()
+
+
+# колоночный вход (CSV / Arrow IPC): {колонка: значения} для Validator.validate_columns,
+# без промежуточного списка dict-строк
+
+# Content-Type тела POST /predict/bulk -> формат payload
+BULK_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+    "application/vnd.apache.arrow.stream": "arrow",
+}
+
+
+def bulk_format(content_type: Optional[str]) -> Optional[str]:
+    """Формат тела bulk-запроса; без Content-Type — NDJSON."""
+    media = (content_type or "").split(";", 1)[0].strip().lower()
+    if not media:
+        return "ndjson"
+    return BULK_FORMATS.get(media)
+
+
+def read_columns(fileobj: BinaryIO, fmt: str) -> Dict[str, Any]:
+    if fmt == "csv":
+        return arrow_columns(_read_csv_table(fileobj))
+    if fmt == "arrow":
+        return arrow_columns(_read_arrow_table(fileobj))
+    raise IngestError(f"Unsupported columnar format: {fmt}")
+
+
+def _read_csv_table(fileobj: BinaryIO):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    from src.app.domain.validation import Validator
+
+    names = next(csv.reader([fileobj.readline().decode("utf-8-sig", errors="replace")]), None)
+    if not names:
+        raise IngestError("Invalid file: CSV header is missing")
+    # колонки времени остаются строками — время разбирает валидатор, как в построчном пути;
+    # остальные типизирует pyarrow (цены приходят массивом float64/int64)
+    time_cols = {n: pa.string() for n in names if n.lower() in Validator.TIME_KEYS}
+    try:
+        return pacsv.read_csv(
+            fileobj,
+            read_options=pacsv.ReadOptions(column_names=names),
+            convert_options=pacsv.ConvertOptions(column_types=time_cols),
+        )
+    except pa.ArrowInvalid as exc:
+        raise IngestError(f"CSV parsing error: {exc}") from exc
+
+
+def _read_arrow_table(fileobj: BinaryIO):
+    import pyarrow as pa
+
+    try:
+        return pa.ipc.open_stream(fileobj).read_all()
+    except pa.ArrowInvalid as exc:
+        raise IngestError(f"Invalid file: not an Arrow IPC stream ({exc})") from exc
+
+
+def count_arrow_rows(fileobj: BinaryIO) -> int:
+    """Строки Arrow IPC-потока по пачкам (без сборки таблицы)."""
+    import pyarrow as pa
+
+    try:
+        return sum(batch.num_rows for batch in pa.ipc.open_stream(fileobj))
+    except pa.ArrowInvalid as exc:
+        raise IngestError(f"Invalid file: not an Arrow IPC stream ({exc})") from exc
+
+
+def arrow_columns(table) -> Dict[str, Any]:
+    """
+    Колонки таблицы pyarrow в виде, который понимает Validator.validate_columns:
+    числа и время — массивы NumPy (null -> NaN/NaT), прочее — списки значений.
+    """
+    import pyarrow as pa
+
+    out: Dict[str, Any] = {}
+    for name, col in zip(table.column_names, table.columns):
+        t = col.type
+        if pa.types.is_timestamp(t) and t.tz is not None:
+            # время с tz — epoch-секундами: валидатор трактует их как UTC
+            us = col.cast(pa.timestamp("us", tz=t.tz)).cast(pa.int64())
+            out[name] = us.to_numpy(zero_copy_only=False) / 1e6
+        elif pa.types.is_timestamp(t) or pa.types.is_date(t):
+            out[name] = col.to_numpy(zero_copy_only=False)
+        elif pa.types.is_integer(t) or pa.types.is_floating(t):
+            out[name] = col.to_numpy(zero_copy_only=False)
+        elif pa.types.is_decimal(t):
+            out[name] = col.cast(pa.float64()).to_numpy(zero_copy_only=False)
+        elif pa.types.is_string(t) or pa.types.is_large_string(t):
+            out[name] = col.to_pylist()
+        else:
+            out[name] = [_jsonable(v) for v in col.to_pylist()]
+    return out
+
+
+# проверка на лету
+
+def checked(rows: Iterable[Any], stats: Optional[Dict[str, int]] = None) -> Iterator[Row]:
+    """
+    Пропускает строки дальше, проверяя структуру: каждая строка — объект.
+    stats["rows"] — сколько строк прошло; пустой файл — IngestError.
+    """
+    n = 0
+    for row in rows:
+        if not isinstance(row, dict):
+            raise IngestError("Invalid file: unsupported JSON structure")
+        n += 1
+        if stats is not None:
+            stats["rows"] = n
+        yield row
+    if n == 0:
+        raise IngestError("Invalid file: no rows")
+
+
+class LineCounter:
+    """Счётчик непустых строк NDJSON-потока по кускам байт (без разбора JSON)."""
+
+    def __init__(self) -> None:
+        self.lines = 0
+        self._open = False  # текущая строка уже содержит непробельные символы
+
+    def feed(self, chunk: bytes) -> bytes:
+        start = 0
+        while True:
+            nl = chunk.find(b"\n", start)
+            piece = chunk[start:] if nl < 0 else chunk[start:nl]
+            if piece.strip():
+                self._open = True
+            if nl < 0:
+                return chunk
+            if self._open:
+                self.lines += 1
+            self._open = False
+            start = nl + 1
+
+    def close(self) -> int:
+        if self._open:
+            self.lines += 1
+            self._open = False
+        return self.lines
@@ -0,0 +1,117 @@
+"""
+События завершения джоб: воркер публикует конечный статус в fanout-exchange
+RabbitMQ, каждый процесс API получает все события в свою временную очередь и
+раздаёт их подписчикам (SSE-потокам) этого процесса через JobEventHub.
+"""
+import asyncio, logging, os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from faststream.rabbit import ExchangeType, RabbitExchange
+
+from src.app.domain.enums import JobStatus
+from src.app.infra import codec
+from src.app.domain.prediction import PredictionSummary
+
+JOB_EVENTS_EXCHANGE = os.getenv("JOB_EVENTS_EXCHANGE", "job-events")
+# очередь событий одного подписчика; переполнилась — поток закрывается, клиент переподключается
+JOB_EVENTS_QUEUE_SIZE = int(os.getenv("JOB_EVENTS_QUEUE_SIZE", "64"))
+# интервал комментария-пинга в SSE-потоке (держит соединение через прокси)
+JOB_EVENTS_HEARTBEAT_S = float(os.getenv("JOB_EVENTS_HEARTBEAT_S", "15"))
+
+exchange = RabbitExchange(JOB_EVENTS_EXCHANGE, type=ExchangeType.FANOUT, durable=True)
+
+Event = Dict[str, Any]
+
+
+def event_of(job: PredictionSummary) -> Event:
+    return {
+        "job_id":     job.id,
+        "owner_id":   job.owner_id,
+        "model_name": job.model_name,
+        "status":     job.status.value,
+        "cost":       job.cost,
+        "created_at": job.created_at.isoformat(),
+    }
+
+
+async def publish(broker, jobs: Iterable[PredictionSummary]) -> int:
+    """Опубликовать события для джоб в конечном статусе; PENDING пропускаются."""
+    n = 0
+    for job in jobs:
+        if job.status == JobStatus.PENDING:
+            continue
+        await broker.publish(codec.dumps(event_of(job)), exchange=exchange, content_type=codec.MESSAGE_CONTENT_TYPE)
+        n += 1
+    return n
+
+
+@dataclass(eq=False)
+class Subscription:
+    owner_id: int
+    job_id: Optional[int] = None
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(JOB_EVENTS_QUEUE_SIZE))
+    # подписчик не успевал читать и отключён от хаба
+    overflow: bool = False
+
+    def wants(self, event: Event) -> bool:
+        return self.job_id is None or event.get("job_id") == self.job_id
+
+
+class JobEventHub:
+    """
+    Подписчики процесса по owner_id. dispatch — синхронный и не ждёт читателей:
+    событие кладётся в очереди подписчиков владельца, медленные отключаются.
+    """
+
+    def __init__(self) -> None:
+        self._subs: dict[int, set[Subscription]] = defaultdict(set)
+        self._listeners: list[Callable[[Event], None]] = []
+
+    def add_listener(self, fn: Callable[[Event], None]) -> None:
+        """Синхронный обработчик всех событий процесса (не только подписанных пользователей)."""
+        if fn not in self._listeners:
+            self._listeners.append(fn)
+
+    def subscribe(self, owner_id: int, job_id: Optional[int] = None) -> Subscription:
+        sub = Subscription(owner_id, job_id)
+        self._subs[owner_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._subs.get(sub.owner_id)
+        if subs is None:
+            return
+        subs.discard(sub)
+        if not subs:
+            del self._subs[sub.owner_id]
+
+    def dispatch(self, event: Event) -> int:
+        """Раздать событие; возвращает число подписчиков, получивших его."""
+        for fn in self._listeners:
+            try:
+                fn(event)
+            except Exception:
+                logging.exception("job events: listener %r failed", fn)
+        subs = self._subs.get(event.get("owner_id"))
+        if not subs:
+            return 0
+        n = 0
+        for sub in list(subs):
+            if not sub.wants(event):
+                continue
+            try:
+                sub.queue.put_nowait(event)
+                n += 1
+            except asyncio.QueueFull:
+                sub.overflow = True
+                self.unsubscribe(sub)
+                logging.warning("job events: subscriber of user %s overflowed, dropped", sub.owner_id)
+        return n
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in self._subs.values())
+
+
+hub = JobEventHub()
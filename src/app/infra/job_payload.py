@@ -0,0 +1,354 @@
+"""
+Компактное хранение данных джобы вместо JSON-колонок со строками-словарями.
+
+payload — Arrow IPC (файловый формат) со сжатием zstd, колонки valid_input и прогноза:
+ts (timestamp[us], «настенное» время), tz_offset_us (int64, смещение tz или
+NAIVE), price и prediction (float64). invalid_payload — Arrow IPC (индекс строки,
+строка в JSON); NULL, если невалидных строк нет. Поля декодируются лениво, в тот же
+вид, что отдавали JSON-колонки.
+
+Таблицы пишутся пачками по BATCH_ROWS строк, число строк — в метаданных схемы:
+срез [offset, offset + limit) распаковывает только свои пачки и колонки, счётчики
+строк не распаковывают ничего. Ранние payload в потоковом формате IPC читаются целиком.
+Срез джобы читает bytea из БД по диапазонам (BlobRange): футер IPC и свои пачки.
+"""
+from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+import io, json, os
+
+import numpy as np
+
+from src.app.domain.prediction import JobPayload, InlinePayload
+from src.app.domain.validation import Validator, NAIVE
+
+# формат записи новых результатов: arrow | json (по-старому, в JSON-колонки)
+JOB_STORAGE_FORMAT = os.getenv("JOB_STORAGE_FORMAT", "arrow")
+ZSTD_LEVEL = 3
+# строк в пачке IPC — гранулярность чтения срезом
+BATCH_ROWS = 65536
+
+JSON = "json"
+ARROW_ZSTD = "arrow-zstd"
+
+_US = 1_000_000
+
+
+@dataclass(slots=True)
+class EncodedPayload:
+    data: bytes
+    invalid: Optional[bytes]
+    storage_format: str = ARROW_ZSTD
+
+
+def encode(
+    valid_rows: Optional[Sequence[dict]],
+    predictions: Sequence[Any],
+    invalid_rows: Sequence[Tuple[int, Any]],
+    *,
+    prices: Optional[np.ndarray] = None,
+    wall_us: Optional[np.ndarray] = None,
+    tz_offset_us: Optional[np.ndarray] = None,
+) -> Optional[EncodedPayload]:
+    """
+    Упаковать результат джобы. Колонки времени/цены можно передать готовыми
+    (ValidationResult колоночного движка), иначе они разбираются из valid_rows;
+    valid_rows=None — только колонки (джоба, посчитанная частями).
+    None — данные не укладываются в колоночную схему: хранить как JSON.
+    """
+    import pyarrow as pa
+
+    n = len(valid_rows) if valid_rows is not None else len(wall_us)
+    if len(predictions) != n:
+        return None
+    if isinstance(predictions, np.ndarray):
+        if predictions.dtype != np.float64:
+            return None
+    elif not all(isinstance(p, float) for p in predictions):
+        return None
+
+    if wall_us is None or tz_offset_us is None or prices is None or len(wall_us) != n:
+        if not all(len(r) == 2 and type(r.get("timestamp")) is str and type(r.get("price")) is float
+                   for r in valid_rows):
+            return None
+        iso = [r["timestamp"] for r in valid_rows]
+        ok, wall_us, tz_offset_us = Validator.time_parts(iso)
+        # строка времени должна восстанавливаться байт в байт
+        if not ok.all() or iso_strings(wall_us, tz_offset_us) != iso:
+            return None
+        prices = np.fromiter((r["price"] for r in valid_rows), dtype=np.float64, count=n)
+
+    valid = pa.table({
+        "ts": pa.array(wall_us, pa.int64()).cast(pa.timestamp("us")),
+        "tz_offset_us": pa.array(tz_offset_us, pa.int64()),
+        "price": pa.array(prices, pa.float64()),
+        "prediction": pa.array(np.asarray(predictions, dtype=np.float64)),
+    })
+    invalid = None
+    if invalid_rows:
+        try:
+            rows = [json.dumps(row, ensure_ascii=False) for _, row in invalid_rows]
+        except (TypeError, ValueError):
+            return None
+        invalid = _ipc(pa.table({
+            "idx": pa.array([idx for idx, _ in invalid_rows], pa.int64()),
+            "row": pa.array(rows, pa.large_string()),
+        }))
+    return EncodedPayload(data=_ipc(valid), invalid=invalid)
+
+
+def _ipc(table) -> bytes:
+    import pyarrow as pa
+
+    table = table.combine_chunks().replace_schema_metadata({"rows": str(table.num_rows), "batch_rows": str(BATCH_ROWS)})
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=pa.Codec("zstd", ZSTD_LEVEL))
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table, max_chunksize=BATCH_ROWS)
+    return sink.getvalue().to_pybytes()
+
+
+_FILE_MAGIC = b"ARROW1"
+
+
+class BlobRange(io.RawIOBase):
+    """
+    bytea как файл только для чтения: fetch(pos, n) читает n байт с позиции pos
+    (с 0) — из БД поднимаются только диапазоны, которые запросил читатель IPC.
+    """
+
+    def __init__(self, size: int, fetch: Callable[[int, int], bytes]) -> None:
+        super().__init__()
+        self._size = size
+        self._fetch = fetch
+        self._pos = 0
+        # футер читается при каждом открытии файла — одинаковые диапазоны не перечитываются
+        self._cache: dict[Tuple[int, int], bytes] = {}
+
+    def prefetch_footer(self) -> None:
+        """
+        Прочитать футер IPC-файла заранее: pyarrow читает его при открытии в своём
+        потоке, где fetch (сессия БД) недоступен; пачки читаются в вызывающем потоке.
+        """
+        trailer = self._read_at(self._size - 10, 10)
+        if trailer[4:] == _FILE_MAGIC:
+            n = int.from_bytes(trailer[:4], "little")
+            self._read_at(self._size - 10 - n, n)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, key: slice) -> bytes:
+        start, stop, _ = key.indices(self._size)
+        return self._read_at(start, stop - start)
+
+    def __bytes__(self) -> bytes:
+        return self._read_at(0, self._size)
+
+    def _read_at(self, pos: int, n: int) -> bytes:
+        if n <= 0:
+            return b""
+        if (pos, n) not in self._cache:
+            self._cache[pos, n] = bytes(self._fetch(pos, n))
+        return self._cache[pos, n]
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = base + pos
+        return self._pos
+
+    def readinto(self, b) -> int:
+        data = self._read_at(self._pos, min(len(b), self._size - self._pos))
+        b[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+def _source(data):
+    """Источник для pyarrow: bytes — буфер, BlobRange — файл с чтением по диапазонам."""
+    import pyarrow as pa
+
+    if isinstance(data, BlobRange):
+        data.prefetch_footer()
+        return pa.PythonFile(data, mode="r")
+    return pa.py_buffer(data)
+
+
+def _read(data):
+    import pyarrow as pa
+
+    if data[:len(_FILE_MAGIC)] == _FILE_MAGIC:
+        return pa.ipc.open_file(_source(data)).read_all()
+    return pa.ipc.open_stream(pa.py_buffer(bytes(data))).read_all()
+
+
+class _BatchFile:
+    """Arrow IPC-файл payload: метаданные из футера, пачки — по требованию."""
+
+    def __init__(self, data) -> None:
+        import pyarrow as pa
+
+        self._buf = _source(data)
+        self._schema = pa.ipc.open_file(self._buf).schema
+        meta = self._schema.metadata or {}
+        self.rows = int(meta[b"rows"])
+        self.batch_rows = int(meta[b"batch_rows"])
+
+    def read(self, columns: Sequence[str], offset: int, limit: Optional[int]):
+        """Колонки columns для строк [offset, offset + limit) — только из нужных пачек."""
+        import pyarrow as pa
+
+        stop = self.rows if limit is None else min(self.rows, offset + limit)
+        fields = [self._schema.get_field_index(name) for name in columns]
+        reader = pa.ipc.open_file(self._buf, options=pa.ipc.IpcReadOptions(included_fields=fields))
+        if offset >= stop:
+            return reader.schema.empty_table()
+        first, last = offset // self.batch_rows, (stop - 1) // self.batch_rows
+        batches = [reader.get_batch(i) for i in range(first, last + 1)]
+        return pa.Table.from_batches(batches, reader.schema).slice(offset - first * self.batch_rows, stop - offset)
+
+
+def _tz_suffix(offset_us: int) -> str:
+    tz = timezone(timedelta(microseconds=offset_us))
+    return datetime(2000, 1, 1, tzinfo=tz).isoformat()[len("2000-01-01T00:00:00"):]
+
+
+def iso_strings(wall_us: np.ndarray, tz_offset_us: np.ndarray) -> List[str]:
+    """ISO-строки как у datetime.isoformat() (так их пишет валидатор)."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    wall_us = np.asarray(wall_us, dtype=np.int64)
+    tz_offset_us = np.asarray(tz_offset_us, dtype=np.int64)
+    ts = pa.array(wall_us).cast(pa.timestamp("us"))
+    # без долей секунды isoformat их не пишет, с долями — всегда 6 знаков
+    whole = pa.array(wall_us % _US == 0)
+    text = pc.if_else(
+        whole,
+        ts.cast(pa.timestamp("s"), safe=False).cast(pa.string()),
+        ts.cast(pa.string()),
+    )
+    text = pc.replace_substring(text, " ", "T", max_replacements=1)
+
+    offsets = np.unique(tz_offset_us).tolist()
+    if offsets != [NAIVE]:
+        suffix = np.zeros(len(wall_us), dtype="U16")
+        for off in offsets:
+            if off != NAIVE:
+                suffix[tz_offset_us == off] = _tz_suffix(off)
+        text = pc.binary_join_element_wise(text, pa.array(suffix), "")
+    return text.to_pylist()
+
+
+def _valid_rows(t) -> List[dict]:
+    wall = t.column("ts").cast("int64").to_numpy()
+    iso = iso_strings(wall, t.column("tz_offset_us").to_numpy())
+    return [{"timestamp": ts, "price": p} for ts, p in zip(iso, t.column("price").to_pylist())]
+
+
+def _invalid_list(t) -> List[list]:
+    return [[idx, json.loads(row)] for idx, row in zip(t.column("idx").to_pylist(), t.column("row").to_pylist())]
+
+
+class ArrowPayload(JobPayload):
+    """
+    Данные джобы из bytea: распаковываются при первом обращении к полю. data и
+    invalid — bytes или BlobRange (срез читает из БД только нужные пачки).
+    """
+
+    def __init__(self, data: bytes | BlobRange, invalid: Optional[bytes | BlobRange]) -> None:
+        self._data = data
+        self._invalid = invalid
+
+    @cached_property
+    def _valid_file(self) -> Optional[_BatchFile]:
+        return _BatchFile(self._data) if self._data[:len(_FILE_MAGIC)] == _FILE_MAGIC else None
+
+    @cached_property
+    def _invalid_file(self) -> Optional[_BatchFile]:
+        if not self._invalid or self._invalid[:len(_FILE_MAGIC)] != _FILE_MAGIC:
+            return None
+        return _BatchFile(self._invalid)
+
+    @cached_property
+    def _valid_table(self):
+        return _read(self._data)
+
+    @cached_property
+    def _invalid_table(self):
+        return _read(self._invalid) if self._invalid else None
+
+    @cached_property
+    def _valid_input(self) -> List[dict]:
+        return _valid_rows(self._valid_table)
+
+    @cached_property
+    def _predictions(self) -> List[float]:
+        return self._valid_table.column("prediction").to_pylist()
+
+    @cached_property
+    def _invalid_rows(self) -> List[list]:
+        t = self._invalid_table
+        return [] if t is None else _invalid_list(t)
+
+    def valid_input(self) -> List[dict]:
+        return self._valid_input
+
+    def predictions(self) -> List[float]:
+        return self._predictions
+
+    def invalid_rows(self) -> List[list]:
+        return self._invalid_rows
+
+    def predictions_dump(self):
+        if "_predictions" in self.__dict__:
+            return self._predictions
+        return self._valid_table.column("prediction").to_numpy()
+
+    def n_valid(self) -> int:
+        f = self._valid_file
+        return f.rows if f is not None else self._valid_table.num_rows
+
+    def n_invalid(self) -> int:
+        if not self._invalid:
+            return 0
+        f = self._invalid_file
+        return f.rows if f is not None else self._invalid_table.num_rows
+
+    def valid_slice(self, offset: int, limit: Optional[int]) -> List[dict]:
+        f = self._valid_file
+        if f is None:
+            return super().valid_slice(offset, limit)
+        return _valid_rows(f.read(("ts", "tz_offset_us", "price"), offset, limit))
+
+    def predictions_slice(self, offset: int, limit: Optional[int]) -> List[float]:
+        f = self._valid_file
+        if f is None:
+            return super().predictions_slice(offset, limit)
+        return f.read(("prediction",), offset, limit).column("prediction").to_pylist()
+
+    def invalid_slice(self, offset: int, limit: Optional[int]) -> List[list]:
+        if not self._invalid:
+            return []
+        f = self._invalid_file
+        if f is None:
+            return super().invalid_slice(offset, limit)
+        return _invalid_list(f.read(("idx", "row"), offset, limit))
+
+
+def load(storage_format: Optional[str], data: Optional[bytes], invalid: Optional[bytes],
+         valid_input: Any, predictions: Any, invalid_rows: Any) -> JobPayload:
+    """Payload джобы по колонкам строки prediction_jobs."""
+    if storage_format == ARROW_ZSTD and data is not None:
+        return ArrowPayload(bytes(data), bytes(invalid) if invalid is not None else None)
+    return InlinePayload(valid_input or [], predictions or [], invalid_rows or [])
@@ -1,8 +1,56 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import numpy as np
-from src.app.domain.ml_model import MLModel
+from src.app.domain.ml_model import IncrementalModel, SeriesState
+from src.app.domain.stats import PairStats
 
-class DemoAR(MLModel):
+
+def ar_forecast(a: Any, b: Any, last: Any, horizon: int) -> np.ndarray:
+    """
+    Прогноз рекурсии y[k] = a + b * y[k-1], y[0] = last на шаги k = 1..horizon в
+    замкнутой форме: y[k] = b^k * last + a * (1 + b + ... + b^(k-1)). Скаляры -> (h,),
+    массивы (k,) -> (k, h) — пачка рядов.
+
+    Сумма геометрического ряда при b > 0 считается как expm1(k * log1p(b - 1)) / (b - 1):
+    без потери точности при b ≈ 1 (и ровно k при b == 1); при b <= 0 знаменатель 1 - b >= 1.
+    """
+    a, b, last = (np.asarray(v, dtype=np.float64)[..., None] for v in (a, b, last))
+    k = np.arange(1, horizon + 1, dtype=np.float64)
+    pos = b > 0
+    d = np.where(pos, b - 1.0, 0.0)
+    flat = d == 0.0
+    with np.errstate(over="ignore", invalid="ignore"):
+        p = k * np.log1p(d)
+        bk = np.exp(p)
+        s = np.expm1(p, out=p)
+        s /= np.where(flat, 1.0, d)
+        if flat.any():
+            s = np.where(flat, k, s)
+        if not pos.all():
+            neg_bk = np.power(np.minimum(b, 0.0), k)
+            bk = np.where(pos, bk, neg_bk)
+            s = np.where(pos, s, (1.0 - neg_bk) / (1.0 - np.minimum(b, 0.0)))
+        y = bk * last
+        y += a * s
+        return y
+
+
+def ar_coefs(y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    OLS AR(1) y[t] ~ a + b * y[t-1] по пачке рядов одной длины (k, n), n >= 2: (a, b).
+    Ряд с постоянными y[:-1] (наклон не определён) — b = 0, a = последняя цена.
+    """
+    x, z = y[:, :-1], y[:, 1:]
+    mx, mz = x.mean(axis=1), z.mean(axis=1)
+    dx = x - mx[:, None]
+    sxx = np.einsum("ij,ij->i", dx, dx)
+    sxy = np.einsum("ij,ij->i", dx, z - mz[:, None])
+    flat = sxx == 0.0
+    b = np.where(flat, 0.0, sxy / np.where(flat, 1.0, sxx))
+    a = np.where(flat, y[:, -1], mz - b * mx)
+    return a, b
+
+
+class DemoAR(IncrementalModel):
     name = "Demo"
     price_per_row = 1
 
@@ -14,29 +62,49 @@ class DemoAR(MLModel):
         n = len(rows)
         if n == 0:
             return []
-
-        y_hist = [float(r["price"]) for r in rows if "price" in r]
+        y_hist = np.fromiter((float(r["price"]) for r in rows if "price" in r), dtype=np.float64)
         if len(y_hist) == 0:
             return []
+        return self._forecast(y_hist, n)
 
-        if len(y_hist) == 1:
-            return [y_hist[-1]] * n
+    def predict_prices(self, prices: np.ndarray) -> List[float]:
+        if len(prices) == 0:
+            return []
+        return self._forecast(np.asarray(prices, dtype=np.float64), len(prices))
 
-        y1, y2 = y_hist[:-1], y_hist[1:]
-        mx, my = float(np.mean(y1)), float(np.mean(y2))
-        denom = float(np.sum((np.array(y1) - mx) ** 2))
+    def predict_many(self, prices: np.ndarray, horizon: Optional[int] = None) -> np.ndarray:
+        y = np.asarray(prices, dtype=np.float64)
+        n = y.shape[1]
+        h = n if horizon is None else horizon
+        if n < 2:
+            return np.repeat(y[:, -1:], h, axis=1)
+        a, b = ar_coefs(y)
+        return ar_forecast(a, b, y[:, -1], h)
 
-        if denom == 0.0:
-            last = y_hist[-1]
-            return [last] * n
+    @staticmethod
+    def _forecast(y: np.ndarray, horizon: int) -> List[float]:
+        last = float(y[-1])
+        st = PairStats.of(y[:-1], y[1:])
+        b = st.slope() if st.n else None
+        if b is None:
+            return [last] * horizon
+        return ar_forecast(st.my - b * st.mx, b, last, horizon).tolist()
 
-        b = float(np.sum((np.array(y1) - mx) * (np.array(y2) - my)) / denom)
-        a = my - b * mx
+    # инкрементальный режим: AR(1) y[t] ~ a + b * y[t-1] по парам соседних точек
 
-        preds: List[float] = []
-        prev = y_hist[-1]
-        for _ in range(n):
-            nxt = a + b * prev
-            preds.append(float(nxt))
-            prev = nxt
-        return preds
\ No newline at end of file
+    def update(self, state: SeriesState, ys: np.ndarray) -> Dict[str, Any]:
+        if state.n == 0:
+            x, y = ys[:-1], ys[1:]
+        else:
+            x, y = np.concatenate(([state.last_y], ys[:-1])), ys
+        return PairStats.from_dict(state.stats).merge(PairStats.of(x, y)).to_dict()
+
+    def forecast(self, state: SeriesState, horizon: int) -> List[float]:
+        if state.n == 0:
+            return []
+        last = state.last_y
+        st = PairStats.from_dict(state.stats)
+        b = st.slope()
+        if b is None:
+            return [last] * horizon
+        return ar_forecast(st.my - b * st.mx, b, last, horizon).tolist()
@@ -1,44 +1,95 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import numpy as np
-from sklearn.linear_model import LinearRegression
 
-from src.app.domain.ml_model import MLModel
+from src.app.domain.ml_model import IncrementalModel, SeriesState
+from src.app.domain.stats import PairStats
 
+_PRICE_KEYS = ("price", "value", "target", "close", "y")
 
-class LinearTrend(MLModel):
+
+def trend_coefs(y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    OLS y ~ a + b * t по t = 0..n-1 в замкнутой форме: (a, b). y — ряд (n,) или
+    пачка рядов одной длины (k, n); для пачки a и b — массивы (k,).
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = y.shape[-1]
+    tm = (n - 1) / 2.0
+    ym = y.mean(axis=-1)
+    if n < 2:
+        return ym, np.zeros_like(ym)
+    # Stt = sum (t - tm)^2 = n (n^2 - 1) / 12; sum (t - tm) = 0, поэтому y не центрируется
+    dt = np.arange(n, dtype=np.float64) - tm
+    b = (y @ dt) / (n * (n * n - 1.0) / 12.0)
+    return ym - b * tm, b
+
+
+def trend_forecast(y: np.ndarray, horizon: Optional[int] = None) -> np.ndarray:
+    """Прогноз тренда на horizon шагов (по умолчанию n) за концом ряда; (n,) -> (h,), (k, n) -> (k, h)."""
+    y = np.asarray(y, dtype=np.float64)
+    n = y.shape[-1]
+    h = n if horizon is None else horizon
+    if n == 0:
+        return np.empty(y.shape[:-1] + (0,))
+    a, b = trend_coefs(y)
+    t = np.arange(n, n + h, dtype=np.float64)
+    return np.asarray(a)[..., None] + np.asarray(b)[..., None] * t
+
+
+def _prices(rows: List[Dict[str, Any]]) -> np.ndarray:
+    """Цены строк: у строк валидатора — ключ price, иначе первый подходящий ключ или первое число."""
+    try:
+        return np.fromiter((r["price"] for r in rows), dtype=np.float64, count=len(rows))
+    except (KeyError, TypeError, ValueError):
+        pass
+    y: List[float] = []
+    for r in rows:
+        for key in _PRICE_KEYS:
+            v = r.get(key)
+            if isinstance(v, (int, float)):
+                y.append(float(v))
+                break
+        else:
+            nums = [float(v) for v in r.values() if isinstance(v, (int, float))]
+            if nums:
+                y.append(nums[0])
+    return np.asarray(y, dtype=np.float64)
+
+
+class LinearTrend(IncrementalModel):
     """
     Простая модель: оценивает линейный тренд y ~ a + b * t
     по последним наблюдениям и экстраполирует на N шагов вперёд.
     Использует только цену (price/value/target/close/y).
+    OLS по равноотстоящим t считается в замкнутой форме (NumPy, без sklearn).
     """
     name = "LinearTrend"
     price_per_row = 2
 
     def predict(self, rows: List[Dict[str, Any]]) -> List[float]:
-        # извлекаем последовательность цен
-        y: List[float] = []
-        for r in rows:
-            for key in ("price", "value", "target", "close", "y"):
-                v = r.get(key)
-                if isinstance(v, (int, float)):
-                    y.append(float(v))
-                    break
-            else:
-                nums = [float(v) for v in r.values() if isinstance(v, (int, float))]
-                if nums:
-                    y.append(nums[0])
-
-        n = len(y)
-        if n == 0:
+        y = _prices(rows)
+        if len(y) == 0:
             return []
+        # прогноз на N шагов вперёд
+        return trend_forecast(y, len(rows)).tolist()
 
-        # обучаем OLS
-        X = np.arange(n).reshape(-1, 1)
-        reg = LinearRegression()
-        reg.fit(X, np.array(y, dtype=float))
+    def predict_prices(self, prices: np.ndarray) -> List[float]:
+        return trend_forecast(prices).tolist()
 
-        # прогноз на N шагов вперёд
-        h = len(rows)
-        X_future = np.arange(n, n + h).reshape(-1, 1)
-        y_pred = reg.predict(X_future)
-        return [float(v) for v in y_pred]
\ No newline at end of file
+    def predict_many(self, prices: np.ndarray, horizon: Optional[int] = None) -> np.ndarray:
+        return trend_forecast(prices, horizon)
+
+    # инкрементальный режим: OLS по (номер точки, цена)
+
+    def update(self, state: SeriesState, ys: np.ndarray) -> Dict[str, Any]:
+        t = np.arange(state.n, state.n + len(ys), dtype=np.float64)
+        return PairStats.from_dict(state.stats).merge(PairStats.of(t, ys)).to_dict()
+
+    def forecast(self, state: SeriesState, horizon: int) -> List[float]:
+        if state.n == 0:
+            return []
+        st = PairStats.from_dict(state.stats)
+        b = st.slope() or 0.0
+        a = st.my - b * st.mx
+        t = np.arange(state.n, state.n + horizon, dtype=np.float64)
+        return (a + b * t).tolist()
@@ -1,19 +1,190 @@
-from typing import Dict, Callable
-from src.app.domain.ml_model import MLModel
+from typing import Dict, Callable, Iterable, Any
+from collections import OrderedDict
+from dataclasses import dataclass
+import os, time, logging, threading
+
+from src.app.domain.ml_model import IncrementalModel, MLModel
 from src.app.infra.ml.demo_ar import DemoAR
 from src.app.infra.ml.lintrend import LinearTrend
 
+# бюджет памяти кэша экземпляров моделей (байты)
+MODEL_CACHE_MAX_BYTES: int = int(os.getenv("MODEL_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
 _REGISTRY: Dict[str, Callable[[], MLModel]] = {
     "Demo": DemoAR,
     "LinearTrend": LinearTrend,
 }
 
-def get(name: str) -> MLModel:
+
+@dataclass(slots=True)
+class _Entry:
+    model: MLModel
+    version: str
+    size: int
+
+
+class ModelCache:
+    """
+    Процессный LRU-кэш экземпляров моделей с бюджетом по памяти.
+    Модель загружается лениво при первом get(); если версия фабрики
+    (атрибут version) изменилась — экземпляр перезагружается.
+    """
+
+    def __init__(self, max_bytes: int = MODEL_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_time_s = 0.0
+
+    def get(self, name: str, factory: Callable[[], MLModel]) -> MLModel:
+        version = _version_of(factory)
+        with self._lock:
+            entry = self._lookup(name, version)
+            if entry is not None:
+                self.hits += 1
+                return entry.model
+            self.misses += 1
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # загрузка — вне общего блокировщика, чтобы не тормозить другие модели
+        with load_lock:
+            with self._lock:
+                entry = self._lookup(name, version)
+                if entry is not None:
+                    return entry.model
+
+            t0 = time.perf_counter()
+            model = factory()
+            elapsed = time.perf_counter() - t0
+            size = model.size_bytes()
+
+            with self._lock:
+                self._drop(name)
+                self._entries[name] = _Entry(model, version, size)
+                self._bytes += size
+                self.loads += 1
+                self.load_time_s += elapsed
+                self._evict(keep=name)
+        logging.info("model %s v%s loaded in %.1f ms (%d bytes)", name, version, elapsed * 1e3, size)
+        return model
+
+    def invalidate(self, name: str | None = None) -> None:
+        with self._lock:
+            for key in ([name] if name is not None else list(self._entries)):
+                self._drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "load_time_ms": round(self.load_time_s * 1e3, 3),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "models": {k: e.version for k, e in self._entries.items()},
+            }
+
+    # внутреннее; вызывать под self._lock
+
+    def _lookup(self, name: str, version: str) -> _Entry | None:
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        if entry.version != version:
+            self._drop(name)
+            return None
+        self._entries.move_to_end(name)
+        return entry
+
+    def _drop(self, name: str) -> None:
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self, keep: str) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            victim = next(iter(self._entries))
+            if victim == keep:
+                self._entries.move_to_end(victim)
+                continue
+            self._drop(victim)
+            self.evictions += 1
+            logging.info("model %s evicted from cache", victim)
+
+
+def _version_of(factory: Callable[[], MLModel]) -> str:
+    return str(getattr(factory, "version", MLModel.version))
+
+
+_CACHE = ModelCache()
+
+
+def _factory(name: str) -> Callable[[], MLModel]:
     try:
-        return _REGISTRY[name]()
+        return _REGISTRY[name]
     except KeyError:
         raise KeyError(f"Unknown model: {name}")
 
+
+def register(name: str, factory: Callable[[], MLModel]) -> None:
+    """Зарегистрировать (или заменить) фабрику модели; старый экземпляр выбрасывается из кэша."""
+    _REGISTRY[name] = factory
+    _CACHE.invalidate(name)
+
+
+def get(name: str) -> MLModel:
+    return _CACHE.get(name, _factory(name))
+
+
+def version(name: str) -> str:
+    """Версия модели (атрибут version фабрики) без создания экземпляра."""
+    return _version_of(_factory(name))
+
+
+def price_per_row(name: str) -> int:
+    """Цена за строку без создания экземпляра модели."""
+    return int(getattr(_factory(name), "price_per_row", MLModel.price_per_row))
+
+
+def incremental(name: str) -> bool:
+    """Модель держит достаточные статистики ряда (IncrementalModel) — без создания экземпляра."""
+    factory = _factory(name)
+    return isinstance(factory, type) and issubclass(factory, IncrementalModel)
+
+
+def warm_up(names: Iterable[str] | None = None) -> list[str]:
+    """Заранее загрузить модели (все зарегистрированные, если names не задан)."""
+    loaded = []
+    for name in (list_names() if names is None else names):
+        try:
+            get(name)
+        except KeyError:
+            logging.warning("warm-up: unknown model %s", name)
+            continue
+        loaded.append(name)
+    return loaded
+
+
+def warm_up_spec(spec: str) -> list[str]:
+    """warm_up по строке настройки: "*" — все модели, иначе имена через запятую, пусто — ничего."""
+    spec = spec.strip()
+    if not spec:
+        return []
+    return warm_up(None if spec == "*" else [s.strip() for s in spec.split(",") if s.strip()])
+
+
+def cache_stats() -> Dict[str, Any]:
+    return _CACHE.stats()
+
+
 def list_names(allowed: list[str] | None = None) -> list[str]:
     names = list(_REGISTRY.keys())
-    return [n for n in names if (allowed is None or n in allowed)]
\ No newline at end of file
+    return [n for n in names if (allowed is None or n in allowed)]
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, JSON, Index, LargeBinary, Float, UniqueConstraint
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime, UTC
-from src.app.domain.enums import Role, TxType, JobStatus
+from src.app.domain.enums import Role, TxType, JobStatus, HoldStatus
 
 Base = declarative_base()
 
@@ -21,6 +21,8 @@ class ORMAccount(Base):
     __tablename__ = "accounts"
     id            = Column(Integer, primary_key=True)
     balance       = Column(Integer, default=0)
+    reserved      = Column(Integer, nullable=False, default=0, server_default="0")
+    version       = Column(Integer, nullable=False, default=0, server_default="0")
     owner_id      = Column(Integer, ForeignKey("users.id"))
 
     owner         = relationship("ORMUser", back_populates="account")
@@ -35,7 +37,7 @@ class ORMTransaction(Base):
     reason        = Column(String)
     balance_after = Column(Integer)
     created_at    = Column(DateTime, default=datetime.now(UTC))
-    account_id    = Column(Integer, ForeignKey("accounts.id"))
+    account_id    = Column(Integer, ForeignKey("accounts.id"), index=True)
 
     account       = relationship("ORMAccount", back_populates="transactions")
 
@@ -52,5 +54,60 @@ class ORMPredictionJob(Base):
     created_at    = Column(DateTime, default=datetime.now(UTC))
     status        = Column(Enum(JobStatus), default=JobStatus.OK)
     error         = Column(String, nullable=True)
+    # json — данные в JSON-колонках выше; arrow-zstd — в payload/invalid_payload (infra/job_payload.py)
+    storage_format  = Column(String(16), nullable=False, default="json", server_default="json")
+    payload         = Column(LargeBinary, nullable=True)
+    invalid_payload = Column(LargeBinary, nullable=True)
+    # пакетная джоба (POST /predict/batch): результаты по рядам, JSON-колонки данных пусты
+    series          = Column(JSON, nullable=True)
 
     user          = relationship("ORMUser", back_populates="prediction_jobs")
+
+    # история пользователя: новые сверху, keyset-пагинация по (created_at, id)
+    __table_args__ = (
+        Index("ix_prediction_jobs_owner_created", owner_id, created_at.desc(), id.desc()),
+    )
+
+
+class ORMCreditHold(Base):
+    __tablename__ = "credit_holds"
+    id            = Column(Integer, primary_key=True)
+    account_id    = Column(Integer, ForeignKey("accounts.id"), nullable=False, index=True)
+    job_id        = Column(Integer, ForeignKey("prediction_jobs.id"), nullable=False, unique=True)
+    amount        = Column(Integer, nullable=False)
+    status        = Column(Enum(HoldStatus), nullable=False, default=HoldStatus.ACTIVE)
+    created_at    = Column(DateTime, nullable=False)
+
+
+class ORMPredictionResult(Base):
+    """Кэш результатов инференса: ключ — sha256(модель, версия, валидные строки)."""
+    __tablename__ = "prediction_results"
+    key           = Column(String(64), primary_key=True)
+    model_name    = Column(String, nullable=False)
+    model_version = Column(String, nullable=False)
+    predictions   = Column(JSON, nullable=False)
+    hits          = Column(Integer, nullable=False, default=0)
+    created_at    = Column(DateTime, nullable=False)
+
+
+class ORMModelState(Base):
+    """Состояние инкрементальной модели для ряда клиента (series_id): достаточные статистики."""
+    __tablename__ = "model_states"
+    id            = Column(Integer, primary_key=True)
+    owner_id      = Column(Integer, ForeignKey("users.id"), nullable=False)
+    model_name    = Column(String, nullable=False)
+    series_id     = Column(String(128), nullable=False)
+    model_version = Column(String, nullable=False)
+    n             = Column(Integer, nullable=False)
+    first_ts      = Column(String, nullable=False)
+    first_price   = Column(Float, nullable=False)
+    last_ts       = Column(String, nullable=False)
+    last_price    = Column(Float, nullable=False)
+    stats         = Column(JSON, nullable=False)
+    # sha256 учтённых точек: правка середины истории сбрасывает состояние
+    prefix_hash   = Column(String(64), nullable=True)
+    updated_at    = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(owner_id, model_name, series_id, name="uq_model_states_series"),
+    )
@@ -1,18 +1,38 @@
 import os
-import json
+import uuid
 from typing import Any
-from faststream.rabbit import RabbitBroker
+from faststream.rabbit import RabbitBroker, RabbitQueue
+
+from src.app.infra import codec, job_events, scheduling
 
 RABBIT_URL = os.getenv("RABBIT_URL")
-QUEUE_NAME = os.getenv("QUEUE_NAME")
 
 broker = RabbitBroker(RABBIT_URL)
 
+# у каждого процесса API своя временная очередь на exchange событий джоб:
+# событие получают все процессы, каждый раздаёт его своим SSE-подписчикам
+_job_events_queue = RabbitQueue(
+    f"{job_events.JOB_EVENTS_EXCHANGE}.api.{uuid.uuid4().hex[:12]}", exclusive=True, auto_delete=True,
+)
+
+
+@broker.subscriber(_job_events_queue, job_events.exchange)
+async def _on_job_event(body: bytes) -> None:
+    job_events.hub.dispatch(codec.loads(body))
+
+
 async def start_broker() -> None:
     await broker.start()
+    # очереди джоб объявляет и API: публикация до старта воркера не теряется
+    for queue in scheduling.queues.values():
+        await broker.declare_queue(queue)
 
 async def stop_broker() -> None:
     await broker.stop()
 
-async def enqueue_predict(payload: dict[str, Any]) -> None:
-    await broker.publish(json.dumps(payload), queue=QUEUE_NAME)
\ No newline at end of file
+async def enqueue_predict(payload: dict[str, Any], *, n_rows: int = 0, priority: int | None = None) -> None:
+    """Джоба — в очередь своего размера (scheduling.job_class) с приоритетом справедливой доли."""
+    await broker.publish(
+        codec.dumps(payload), queue=scheduling.queues[scheduling.job_class(n_rows)],
+        content_type=codec.MESSAGE_CONTENT_TYPE, priority=priority,
+    )
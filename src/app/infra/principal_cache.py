@@ -0,0 +1,63 @@
+from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+import os, threading, time
+
+from src.app.domain.user import Principal
+
+# время жизни записи (с); 0 — кэш выключен, пользователь грузится из БД на каждый запрос
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+
+class PrincipalCache:
+    """
+    Процессный кэш аутентифицированных пользователей: (user_id, jti) -> Principal.
+    Держит только идентичность (роль, счёт); токен всё равно проверяется на каждый
+    запрос, кэш лишь избавляет от загрузки пользователя и счёта из БД.
+
+    Записи не сбрасываются по событиям: изменение пользователя в БД (роль, удаление)
+    видно не позже чем через ttl. Токен остаётся действительным до своего срока и
+    без кэша — выход в Web UI лишь удаляет cookie, отзыва токенов нет.
+    """
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_entries: int = PRINCIPAL_CACHE_SIZE) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, jti: str) -> Optional[Principal]:
+        key = (user_id, jti)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, jti: str, principal: Principal) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            key = (principal.user_id, jti)
+            self._entries[key] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "ttl": self.ttl}
+
+
+principals = PrincipalCache()
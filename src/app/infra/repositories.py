@@ -1,12 +1,17 @@
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Tuple
 from datetime import datetime, UTC
 
+from sqlalchemy import select, update, insert, func, and_, or_, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from src.app.infra.models import ORMUser, ORMAccount, ORMTransaction, ORMPredictionJob
+from src.app.infra.models import ORMUser, ORMAccount, ORMTransaction, ORMPredictionJob, ORMCreditHold, ORMModelState
 from src.app.domain.user import Client, Admin
-from src.app.domain.account import Account
-from src.app.domain.prediction import PredictionJob
-from src.app.domain.enums import Role, TxType, JobStatus
+from src.app.domain.account import Account, Transaction, StaleAccount, InsufficientFunds
+from src.app.domain.ml_model import SeriesState
+from src.app.domain.prediction import PredictionJob, PredictionSummary, PredictionSlice, JOB_FIELDS
+from src.app.infra import job_payload
+from src.app.infra.job_payload import EncodedPayload
+from src.app.domain.enums import Role, TxType, JobStatus, HoldStatus
 
 # ORM < - > Domain сопоставление
 
@@ -57,7 +62,9 @@ class UserRepo:
         dom.account = Account.from_dict(
             {"id": orm.account.id,
              "owner_id": orm.id,
-             "balance": orm.account.balance}
+             "balance": orm.account.balance,
+             "reserved": orm.account.reserved,
+             "version": orm.account.version}
         )
         return dom
 
@@ -72,6 +79,27 @@ class AccountRepo:
         return self._s
 
     def load(self, account_id: int) -> Account:
+        """
+        Быстрая загрузка: доверяем материализованному accounts.balance,
+        журнал не читается (история — через transactions()).
+        """
+        orm_acc = self._s.get(ORMAccount, account_id)
+        if orm_acc is None:
+            raise ValueError("Account not found")
+
+        return Account.from_dict(
+            {"id": orm_acc.id,
+             "owner_id": orm_acc.owner_id,
+             "balance": orm_acc.balance,
+             "reserved": orm_acc.reserved,
+             "version": orm_acc.version}
+        )
+
+    def load_with_history(self, account_id: int) -> Account:
+        """
+        Полный replay журнала — O(число транзакций).
+        Нужен для сверки и отладки, не для горячего пути.
+        """
         orm_acc = self._s.get(ORMAccount, account_id)
         if orm_acc is None:
             raise ValueError("Account not found")
@@ -80,24 +108,72 @@ class AccountRepo:
             {"id": orm_acc.id, "owner_id": orm_acc.owner_id, "balance": 0}
         )
 
-        for trx in sorted(orm_acc.transactions, key=lambda t: t.created_at):
+        rows = self._s.scalars(
+            select(ORMTransaction)
+            .where(ORMTransaction.account_id == account_id)
+            .order_by(ORMTransaction.created_at, ORMTransaction.id)
+        ).all()
+        for trx in rows:
             acc.apply(
                 delta  = trx.amount,
                 reason = trx.reason,
                 tx_type= TxType(trx.tx_type),
             )
-            acc.history[-1]._persisted = True
+        for tx, trx in zip(acc.history, rows):
+            tx.id = trx.id
 
+        acc.mark_saved(orm_acc.version)
         return acc
 
+    def transactions(
+        self,
+        account_id: int,
+        *,
+        limit: int = 50,
+        before_id: int | None = None,
+    ) -> List[Transaction]:
+        """Страница журнала, новые сверху; before_id — keyset-курсор."""
+        q = (
+            select(ORMTransaction)
+            .where(ORMTransaction.account_id == account_id)
+            .order_by(ORMTransaction.id.desc())
+            .limit(limit)
+        )
+        if before_id is not None:
+            q = q.where(ORMTransaction.id < before_id)
+
+        return [
+            Transaction(
+                id            = t.id,
+                account_id    = t.account_id,
+                amount        = t.amount,
+                tx_type       = TxType(t.tx_type),
+                reason        = t.reason,
+                balance_after = t.balance_after,
+                created_at    = t.created_at,
+                _persisted    = True,
+            )
+            for t in self._s.scalars(q)
+        ]
+
     def save(self, dom_acc: Account) -> None:
-        orm_acc = self._s.get(ORMAccount, dom_acc.id)
-        orm_acc.balance = dom_acc.balance
+        """
+        Оптимистичная запись: баланс обновляется, только если версия в БД
+        совпадает с загруженной, иначе StaleAccount.
+        """
+        new_version = dom_acc.version + 1
+        res = self._s.execute(
+            update(ORMAccount)
+            .where(ORMAccount.id == dom_acc.id, ORMAccount.version == dom_acc.version)
+            .values(balance=dom_acc.balance, version=new_version)
+        )
+        if res.rowcount != 1:
+            raise StaleAccount(f"Account {dom_acc.id} was modified concurrently")
 
         for tx in dom_acc.pending_transactions():       # only new
             self._s.add(
                 ORMTransaction(
-                    account_id   = orm_acc.id,
+                    account_id   = dom_acc.id,
                     amount       = tx.amount,
                     tx_type      = tx.tx_type,
                     reason       = tx.reason,
@@ -105,7 +181,278 @@ class AccountRepo:
                     created_at   = tx.created_at,
                 )
             )
-            tx._persisted = True
+        dom_acc.mark_saved(new_version)
+
+    # атомарные операции: одно условное UPDATE ... RETURNING + запись в журнал,
+    # без read-modify-write в Python — безопасно при параллельных воркерах
+    def deposit(self, account_id: int, amount: int, reason: str) -> int:
+        new_balance = self._s.execute(
+            update(ORMAccount)
+            .where(ORMAccount.id == account_id)
+            .values(balance=ORMAccount.balance + amount, version=ORMAccount.version + 1)
+            .returning(ORMAccount.balance)
+        ).scalar_one_or_none()
+        if new_balance is None:
+            raise ValueError("Account not found")
+
+        self._append_tx(account_id, amount, TxType.DEPOSIT, reason, new_balance)
+        return new_balance
+
+    def charge(
+        self,
+        account_id: int,
+        cost: int,
+        reason: str,
+        tx_type: TxType = TxType.PREDICTION_CHARGE,
+    ) -> int:
+        """Списать cost, если хватает доступных (не зарезервированных) средств."""
+        new_balance = self._s.execute(
+            update(ORMAccount)
+            .where(
+                ORMAccount.id == account_id,
+                ORMAccount.balance - ORMAccount.reserved >= cost,
+            )
+            .values(balance=ORMAccount.balance - cost, version=ORMAccount.version + 1)
+            .returning(ORMAccount.balance)
+        ).scalar_one_or_none()
+        if new_balance is None:
+            raise InsufficientFunds("Insufficient funds")
+
+        self._append_tx(account_id, -cost, tx_type, reason, new_balance)
+        return new_balance
+
+    # холды: reserve (при постановке в очередь) -> commit | release (в воркере)
+    def reserve(self, account_id: int, job_id: int, amount: int) -> None:
+        ok = self._s.execute(
+            update(ORMAccount)
+            .where(
+                ORMAccount.id == account_id,
+                ORMAccount.balance - ORMAccount.reserved >= amount,
+            )
+            .values(reserved=ORMAccount.reserved + amount)
+            .returning(ORMAccount.id)
+        ).scalar_one_or_none()
+        if ok is None:
+            raise InsufficientFunds("Insufficient funds")
+
+        self._s.add(
+            ORMCreditHold(
+                account_id = account_id,
+                job_id     = job_id,
+                amount     = amount,
+                status     = HoldStatus.ACTIVE,
+                created_at = datetime.now(UTC),
+            )
+        )
+        self._s.flush()
+
+    def commit_hold(self, job_id: int, cost: int, reason: str) -> int | None:
+        """
+        Списать фактическую стоимость против холда джобы и снять холд.
+        None — активного холда нет (списывайте через charge()).
+        """
+        hold = self._active_hold(job_id)
+        if hold is None:
+            return None
+
+        new_balance = self._s.execute(
+            update(ORMAccount)
+            .where(
+                ORMAccount.id == hold.account_id,
+                ORMAccount.balance - ORMAccount.reserved + hold.amount >= cost,
+            )
+            .values(
+                balance=ORMAccount.balance - cost,
+                reserved=ORMAccount.reserved - hold.amount,
+                version=ORMAccount.version + 1,
+            )
+            .returning(ORMAccount.balance)
+        ).scalar_one_or_none()
+        if new_balance is None:
+            raise InsufficientFunds("Insufficient funds")
+
+        hold.status = HoldStatus.COMMITTED
+        if cost > 0:
+            self._append_tx(hold.account_id, -cost, TxType.PREDICTION_CHARGE, reason, new_balance)
+        self._s.flush()
+        return new_balance
+
+    def release_hold(self, job_id: int) -> None:
+        hold = self._active_hold(job_id)
+        if hold is None:
+            return
+
+        self._s.execute(
+            update(ORMAccount)
+            .where(ORMAccount.id == hold.account_id)
+            .values(reserved=ORMAccount.reserved - hold.amount)
+        )
+        hold.status = HoldStatus.RELEASED
+        self._s.flush()
+
+    def commit_holds(self, account_id: int, items: List[Tuple[int, int, str]]) -> int:
+        """
+        Пакетный commit_hold для джоб одного счёта: items — (job_id, cost, reason).
+        Один условный UPDATE счёта на сумму пачки; джобы без холда списываются
+        с доступного баланса. Не хватает на всю пачку — InsufficientFunds, ничего не списано.
+        """
+        job_ids = [job_id for job_id, _, _ in items]
+        holds = self._s.scalars(
+            select(ORMCreditHold)
+            .where(
+                ORMCreditHold.job_id.in_(job_ids),
+                ORMCreditHold.account_id == account_id,
+                ORMCreditHold.status == HoldStatus.ACTIVE,
+            )
+            .with_for_update()
+        ).all()
+        held = sum(h.amount for h in holds)
+        total = sum(cost for _, cost, _ in items)
+
+        new_balance = self._s.execute(
+            update(ORMAccount)
+            .where(
+                ORMAccount.id == account_id,
+                ORMAccount.balance - ORMAccount.reserved + held >= total,
+            )
+            .values(
+                balance=ORMAccount.balance - total,
+                reserved=ORMAccount.reserved - held,
+                version=ORMAccount.version + 1,
+            )
+            .returning(ORMAccount.balance)
+        ).scalar_one_or_none()
+        if new_balance is None:
+            raise InsufficientFunds("Insufficient funds")
+
+        for hold in holds:
+            hold.status = HoldStatus.COMMITTED
+        # по записи журнала на джобу, balance_after — нарастающим итогом
+        balance = new_balance + total
+        for _, cost, reason in items:
+            if cost > 0:
+                balance -= cost
+                self._append_tx(account_id, -cost, TxType.PREDICTION_CHARGE, reason, balance)
+        self._s.flush()
+        return new_balance
+
+    def release_holds(self, job_ids: List[int]) -> None:
+        if not job_ids:
+            return
+        holds = self._s.scalars(
+            select(ORMCreditHold)
+            .where(ORMCreditHold.job_id.in_(job_ids), ORMCreditHold.status == HoldStatus.ACTIVE)
+            .with_for_update()
+        ).all()
+        per_account: dict[int, int] = {}
+        for hold in holds:
+            per_account[hold.account_id] = per_account.get(hold.account_id, 0) + hold.amount
+            hold.status = HoldStatus.RELEASED
+        for account_id in sorted(per_account):
+            self._s.execute(
+                update(ORMAccount)
+                .where(ORMAccount.id == account_id)
+                .values(reserved=ORMAccount.reserved - per_account[account_id])
+            )
+        self._s.flush()
+
+    def _active_hold(self, job_id: int) -> ORMCreditHold | None:
+        return self._s.scalars(
+            select(ORMCreditHold)
+            .where(ORMCreditHold.job_id == job_id, ORMCreditHold.status == HoldStatus.ACTIVE)
+            .with_for_update()
+        ).one_or_none()
+
+    def _append_tx(self, account_id: int, amount: int, tx_type: TxType, reason: str, balance_after: int) -> None:
+        self._s.add(
+            ORMTransaction(
+                account_id   = account_id,
+                amount       = amount,
+                tx_type      = tx_type,
+                reason       = reason,
+                balance_after= balance_after,
+                created_at   = datetime.now(UTC),
+            )
+        )
+
+    # сверка журнала
+    def ledger_totals(self, *, after_id: int = 0, limit: int = 500) -> List[Tuple[int, int, int]]:
+        """(account_id, balance, сумма журнала) для пачки счетов с id > after_id."""
+        ledger = func.coalesce(func.sum(ORMTransaction.amount), 0)
+        q = (
+            select(ORMAccount.id, ORMAccount.balance, ledger)
+            .outerjoin(ORMTransaction, ORMTransaction.account_id == ORMAccount.id)
+            .where(ORMAccount.id > after_id)
+            .group_by(ORMAccount.id, ORMAccount.balance)
+            .order_by(ORMAccount.id)
+            .limit(limit)
+        )
+        return [(r[0], r[1] or 0, int(r[2])) for r in self._s.execute(q)]
+
+    def reserved_totals(self, *, after_id: int = 0, limit: int = 500) -> List[Tuple[int, int, int]]:
+        """(account_id, reserved, сумма активных холдов) для пачки счетов."""
+        held = func.coalesce(func.sum(ORMCreditHold.amount), 0)
+        q = (
+            select(ORMAccount.id, ORMAccount.reserved, held)
+            .outerjoin(
+                ORMCreditHold,
+                (ORMCreditHold.account_id == ORMAccount.id)
+                & (ORMCreditHold.status == HoldStatus.ACTIVE),
+            )
+            .where(ORMAccount.id > after_id)
+            .group_by(ORMAccount.id, ORMAccount.reserved)
+            .order_by(ORMAccount.id)
+            .limit(limit)
+        )
+        return [(r[0], r[1] or 0, int(r[2])) for r in self._s.execute(q)]
+
+    def orphan_hold_jobs(self) -> List[int]:
+        """Активные холды джоб, которые уже не в PENDING (воркер упал между шагами)."""
+        q = (
+            select(ORMCreditHold.job_id)
+            .join(ORMPredictionJob, ORMPredictionJob.id == ORMCreditHold.job_id)
+            .where(
+                ORMCreditHold.status == HoldStatus.ACTIVE,
+                ORMPredictionJob.status != JobStatus.PENDING,
+            )
+        )
+        return list(self._s.scalars(q))
+
+    def reset_reserved(self, account_id: int, observed: int) -> bool:
+        """
+        reserved = сумма активных холдов, посчитанная в самом UPDATE; только если
+        reserved всё ещё observed (значение сверки). False — счёт изменился после
+        сверки: чинить нечего или перепроверить в следующий проход.
+        """
+        held = (
+            select(func.coalesce(func.sum(ORMCreditHold.amount), 0))
+            .where(ORMCreditHold.account_id == account_id, ORMCreditHold.status == HoldStatus.ACTIVE)
+            .scalar_subquery()
+        )
+        res = self._s.execute(
+            update(ORMAccount)
+            .where(ORMAccount.id == account_id, ORMAccount.reserved == observed)
+            .values(reserved=held)
+        )
+        return res.rowcount == 1
+
+    def reset_balance(self, account_id: int, observed: int) -> bool:
+        """
+        balance = сумма журнала, посчитанная в самом UPDATE; только если balance
+        всё ещё observed. Списание или пополнение между сверкой и ремонтом меняет
+        balance — такой счёт не трогаем (False), а не затираем его операцию.
+        """
+        ledger = (
+            select(func.coalesce(func.sum(ORMTransaction.amount), 0))
+            .where(ORMTransaction.account_id == account_id)
+            .scalar_subquery()
+        )
+        res = self._s.execute(
+            update(ORMAccount)
+            .where(ORMAccount.id == account_id, ORMAccount.balance == observed)
+            .values(balance=ledger, version=ORMAccount.version + 1)
+        )
+        return res.rowcount == 1
 
 
 class PredictionRepo:
@@ -151,14 +498,125 @@ class PredictionRepo:
 
         return self._to_domain(orm)
 
-    def list_by_user(self, user_id: int) -> List[PredictionJob]:
-        rows = (
-            self._s.query(ORMPredictionJob)
-            .filter_by(owner_id=user_id)
-            .order_by(ORMPredictionJob.created_at.desc())
-            .all()
+    def get_slice(
+        self,
+        job_id: int,
+        *,
+        offset: int = 0,
+        limit: int | None = None,
+        fields: tuple[str, ...] = JOB_FIELDS,
+    ) -> Optional[PredictionSlice]:
+        """
+        Джоба со срезом данных [offset, offset + limit) по полям fields. payload в
+        bytea не загружается целиком: из БД читаются футер IPC и пачки среза
+        (substr), распаковываются только колонки среза, счётчики строк берутся из
+        метаданных; джобы в JSON-колонках (не перенесённые migrate_job_payloads)
+        режутся после полной загрузки.
+        """
+        J = ORMPredictionJob
+        row = self._s.execute(
+            select(J.owner_id, J.model_name, J.cost, J.created_at, J.status, J.error, J.series,
+                   J.storage_format, func.length(J.payload), func.length(J.invalid_payload))
+            .where(J.id == job_id)
+        ).one_or_none()
+        if row is None:
+            return None
+        owner_id, model_name, cost, created_at, status, error, series, storage_format, size, invalid_size = row
+        if storage_format == job_payload.ARROW_ZSTD and size is not None:
+            payload = job_payload.ArrowPayload(
+                self._blob_range(job_id, J.payload, size),
+                self._blob_range(job_id, J.invalid_payload, invalid_size) if invalid_size else None,
+            )
+        else:
+            legacy = self._s.execute(
+                select(J.valid_input, J.predictions, J.invalid_rows).where(J.id == job_id)
+            ).one()
+            payload = job_payload.load(job_payload.JSON, None, None, *legacy)
+        job = PredictionJob(
+            id=job_id, owner_id=owner_id, model_name=model_name, payload=payload, cost=cost,
+            status=status, error=error, created_at=created_at, series=series,
+        )
+        return job.slice(offset, limit, fields)
+
+    def _blob_range(self, job_id: int, column, size: int) -> job_payload.BlobRange:
+        """bytea джобы с чтением по диапазонам: каждый диапазон — substr одним запросом."""
+        def fetch(pos: int, n: int) -> bytes:
+            return self._s.scalar(select(func.substr(column, pos + 1, n)).where(ORMPredictionJob.id == job_id))
+
+        return job_payload.BlobRange(size, fetch)
+
+    def claim(self, job_id: int) -> Optional[JobStatus]:
+        """
+        Заблокировать строку джобы до конца транзакции и вернуть её статус.
+        None — джобы нет или её уже обрабатывает другой воркер.
+        """
+        return self._s.scalars(
+            select(ORMPredictionJob.status)
+            .where(ORMPredictionJob.id == job_id)
+            .with_for_update(skip_locked=True)
+        ).one_or_none()
+
+    def statuses(self, job_ids: List[int]) -> dict[int, JobStatus]:
+        """Статусы джоб без блокировки (быстрая проверка до тяжёлой работы)."""
+        rows = self._s.execute(
+            select(ORMPredictionJob.id, ORMPredictionJob.status).where(ORMPredictionJob.id.in_(job_ids))
+        ).all()
+        return {job_id: status for job_id, status in rows}
+
+    def claim_many(self, job_ids: List[int]) -> dict[int, JobStatus]:
+        """Пакетный claim: {job_id: статус} только для джоб, которые удалось заблокировать."""
+        rows = self._s.execute(
+            select(ORMPredictionJob.id, ORMPredictionJob.status)
+            .where(ORMPredictionJob.id.in_(job_ids))
+            .order_by(ORMPredictionJob.id)
+            .with_for_update(skip_locked=True)
+        ).all()
+        return {job_id: status for job_id, status in rows}
+
+    def summaries(self, job_ids: List[int]) -> List[PredictionSummary]:
+        """Короткие поля джоб по id (без данных) — для событий о завершении."""
+        J = ORMPredictionJob
+        q = (
+            select(J.id, J.owner_id, J.model_name, J.cost, J.created_at, J.status)
+            .where(J.id.in_(job_ids))
+            .order_by(J.id)
         )
-        return [self._to_domain(r) for r in rows]
+        return [PredictionSummary(*row) for row in self._s.execute(q)]
+
+    def list_summaries(
+        self,
+        user_id: int,
+        *,
+        limit: int = 50,
+        before_id: int | None = None,
+        status: JobStatus | None = None,
+        model_name: str | None = None,
+    ) -> List[PredictionSummary]:
+        """
+        Страница истории, новые сверху; before_id — keyset-курсор (id последней
+        джобы предыдущей страницы). Читаются только короткие колонки — JSON с
+        входными данными и прогнозами не загружается.
+        """
+        J = ORMPredictionJob
+        q = (
+            select(J.id, J.owner_id, J.model_name, J.cost, J.created_at, J.status)
+            .where(J.owner_id == user_id)
+            .order_by(J.created_at.desc(), J.id.desc())
+            .limit(limit)
+        )
+        if before_id is not None:
+            cursor = (
+                select(J.created_at)
+                .where(J.id == before_id, J.owner_id == user_id)
+                .scalar_subquery()
+            )
+            q = q.where(or_(J.created_at < cursor, and_(J.created_at == cursor, J.id < before_id)))
+        if status is not None:
+            q = q.where(J.status == status)
+        if model_name is not None:
+            q = q.where(J.model_name == model_name)
+
+        return [PredictionSummary(*row) for row in self._s.execute(q)]
 
     def mark_ok(
         self,
@@ -168,17 +626,21 @@ class PredictionRepo:
         cost: int,
         valid_input: Optional[List[Any]] = None,
         invalid_rows: Optional[List[Any]] = None,
+        payload: Optional[EncodedPayload] = None,
+        series: Optional[dict] = None,
     ) -> None:
         orm = self._s.get(ORMPredictionJob, job_id)
         if orm is None:
             raise ValueError(f"PredictionJob {job_id} not found")
 
-        orm.predictions = predictions
+        if valid_input is None:
+            valid_input = orm.valid_input
+        if invalid_rows is None:
+            invalid_rows = orm.invalid_rows
+        for name, value in self._data_columns(valid_input, predictions, invalid_rows, payload).items():
+            setattr(orm, name, value)
+        orm.series = series
         orm.cost = cost
-        if valid_input is not None:
-            orm.valid_input = valid_input
-        if invalid_rows is not None:
-            orm.invalid_rows = invalid_rows
         orm.status = JobStatus.OK
         orm.error = None
         self._s.flush()
@@ -192,17 +654,106 @@ class PredictionRepo:
         orm.error = error
         self._s.flush()
 
+    def mark_ok_many(self, items: List[dict]) -> None:
+        """
+        Пакетный mark_ok одним executemany: items — dict с id, predictions, cost,
+        valid_input, invalid_rows и необязательными payload (EncodedPayload), series.
+        """
+        if not items:
+            return
+        params = []
+        for item in items:
+            data = self._data_columns(item["valid_input"], item["predictions"], item["invalid_rows"],
+                                      item.get("payload"))
+            params.append({"id": item["id"], "cost": item["cost"], **data, "series": item.get("series"),
+                           "status": JobStatus.OK, "error": None})
+        self._s.execute(update(ORMPredictionJob), params)
+
+    def mark_error_many(self, items: List[Tuple[int, str]]) -> None:
+        if not items:
+            return
+        self._s.execute(
+            update(ORMPredictionJob),
+            [{"id": job_id, "status": JobStatus.ERROR, "error": error} for job_id, error in items],
+        )
+
+    @staticmethod
+    def _data_columns(valid_input, predictions, invalid_rows, payload: Optional[EncodedPayload]) -> dict:
+        """Колонки данных джобы: упакованный payload или, как раньше, JSON."""
+        if payload is not None:
+            return dict(valid_input=[], predictions=[], invalid_rows=[],
+                        storage_format=payload.storage_format,
+                        payload=payload.data, invalid_payload=payload.invalid)
+        return dict(valid_input=valid_input, predictions=predictions, invalid_rows=invalid_rows,
+                    storage_format=job_payload.JSON, payload=None, invalid_payload=None)
+
     @staticmethod
     def _to_domain(orm: ORMPredictionJob) -> PredictionJob:
         return PredictionJob(
             id           = orm.id,
             owner_id     = orm.owner_id,
             model_name   = orm.model_name,
-            valid_input  = orm.valid_input,
-            predictions  = orm.predictions,
-            invalid_rows = orm.invalid_rows,
+            payload      = job_payload.load(orm.storage_format, orm.payload, orm.invalid_payload,
+                                            orm.valid_input, orm.predictions, orm.invalid_rows),
             cost         = orm.cost,
             status       = orm.status,
             error        = orm.error,
             created_at   = orm.created_at,
-        )
\ No newline at end of file
+            series       = orm.series,
+        )
+
+
+SeriesKey = Tuple[int, str, str]  # (owner_id, model_name, series_id)
+
+
+class ModelStateRepo:
+    """Состояния инкрементальных моделей по рядам клиентов."""
+
+    def __init__(self, s: Session) -> None:
+        self._s = s
+
+    def get_many(self, keys: List[SeriesKey]) -> dict[SeriesKey, SeriesState]:
+        if not keys:
+            return {}
+        M = ORMModelState
+        rows = self._s.scalars(
+            select(M).where(tuple_(M.owner_id, M.model_name, M.series_id).in_(list(set(keys))))
+        ).all()
+        return {(m.owner_id, m.model_name, m.series_id): self._to_domain(m) for m in rows}
+
+    def put(self, key: SeriesKey, state: SeriesState) -> None:
+        """Записать состояние ряда (последняя запись выигрывает)."""
+        owner_id, model_name, series_id = key
+        M = ORMModelState
+        values = dict(
+            model_version = state.version,
+            n             = state.n,
+            first_ts      = state.first[0],
+            first_price   = state.first[1],
+            last_ts       = state.last[0],
+            last_price    = state.last[1],
+            stats         = state.stats,
+            prefix_hash   = state.prefix_hash,
+            updated_at    = datetime.now(UTC),
+        )
+        where = (M.owner_id == owner_id, M.model_name == model_name, M.series_id == series_id)
+        if self._s.execute(update(M).where(*where).values(**values)).rowcount:
+            return
+        try:
+            with self._s.begin_nested():
+                self._s.execute(insert(M).values(owner_id=owner_id, model_name=model_name,
+                                                 series_id=series_id, **values))
+        except IntegrityError:
+            # ряд только что создал другой воркер
+            self._s.execute(update(M).where(*where).values(**values))
+
+    @staticmethod
+    def _to_domain(m: ORMModelState) -> SeriesState:
+        return SeriesState(
+            version     = m.model_version,
+            n           = m.n,
+            first       = (m.first_ts, m.first_price),
+            last        = (m.last_ts, m.last_price),
+            stats       = m.stats,
+            prefix_hash = m.prefix_hash,
+        )
@@ -0,0 +1,151 @@
+from typing import Any, Dict, List, Optional, Sequence
+from collections import OrderedDict
+from datetime import datetime, UTC
+import hashlib, json, logging, os, threading
+
+from sqlalchemy import update, insert
+from sqlalchemy.exc import IntegrityError
+
+from src.app.infra.models import ORMPredictionResult
+
+# off — без кэша | memory — LRU в процессе | pg — LRU + общая таблица prediction_results
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory")
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+
+
+def result_key(model_name: str, model_version: str, rows: Sequence[Dict[str, Any]]) -> str:
+    """
+    sha256 по модели, её версии и валидным строкам {timestamp, price}.
+    Строки уже нормализованы валидатором (ISO-время, float-цена, порядок по времени),
+    поэтому одинаковый датасет в любом исходном виде даёт один ключ.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([model_name, model_version]).encode())
+    h.update(b"\n")
+    h.update(json.dumps(rows, separators=(",", ":"), ensure_ascii=False).encode())
+    return h.hexdigest()
+
+
+class PgResultStore:
+    """Общий для всех воркеров кэш в таблице prediction_results."""
+
+    def __init__(self, engine=None) -> None:
+        self._engine = engine
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from src.app.infra.db import engine
+            self._engine = engine
+        return self._engine
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(ORMPredictionResult)
+                .where(ORMPredictionResult.key == key)
+                .values(hits=ORMPredictionResult.hits + 1)
+                .returning(ORMPredictionResult.predictions)
+            ).scalar_one_or_none()
+
+    def put(self, key: str, model_name: str, model_version: str, predictions: List[float]) -> None:
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(ORMPredictionResult).values(
+                    key           = key,
+                    model_name    = model_name,
+                    model_version = model_version,
+                    predictions   = predictions,
+                    hits          = 0,
+                    created_at    = datetime.now(UTC),
+                ))
+        except IntegrityError:
+            pass  # тот же результат уже записал другой воркер
+
+
+class ResultCache:
+    """
+    Кэш результатов инференса: LRU в процессе, за ним — необязательное общее
+    хранилище. Ошибки общего хранилища не валят джобу (просто промах).
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, shared: Optional[PgResultStore] = None) -> None:
+        self.max_entries = max_entries
+        self._shared = shared
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            preds = self._lru.get(key)
+            if preds is not None:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return preds
+
+        if self._shared is not None:
+            try:
+                preds = self._shared.get(key)
+            except Exception:
+                logging.exception("result cache: shared lookup failed")
+                preds = None
+            if preds is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                    self._remember(key, preds)
+                return preds
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, model_name: str, model_version: str, predictions: List[float]) -> None:
+        with self._lock:
+            self._remember(key, predictions)
+        if self._shared is not None:
+            try:
+                self._shared.put(key, model_name, model_version, predictions)
+            except Exception:
+                logging.exception("result cache: shared store failed")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.shared_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / total, 4) if total else 0.0,
+                "entries": len(self._lru),
+            }
+
+    def _remember(self, key: str, predictions: List[float]) -> None:
+        self._lru[key] = predictions
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+
+_CACHE: Optional[ResultCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def default_cache() -> Optional[ResultCache]:
+    """Кэш процесса по RESULT_CACHE_BACKEND; None — кэш выключен."""
+    global _CACHE
+    if RESULT_CACHE_BACKEND == "off":
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            shared = PgResultStore() if RESULT_CACHE_BACKEND == "pg" else None
+            _CACHE = ResultCache(RESULT_CACHE_SIZE, shared)
+        return _CACHE
+
+
+def cache_stats() -> Dict[str, Any]:
+    cache = default_cache()
+    return cache.stats() if cache is not None else {}
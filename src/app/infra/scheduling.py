@@ -0,0 +1,66 @@
+"""
+Очереди джоб в RabbitMQ. Джобы разного размера идут в разные очереди:
+мелкие (интерактивные: бот, Web UI) и крупные. Так датасет на миллион строк
+не задерживает короткие джобы. Внутри очереди сообщение получает приоритет
+по справедливой доле: чем больше джоб пользователя уже ждёт, тем ниже
+приоритет новой. Воркер делит prefetch между очередями по весам, и крупные
+джобы занимают не больше своей доли процессов инференса.
+"""
+import os
+from typing import Dict
+
+from faststream.rabbit import RabbitQueue
+
+QUEUE_NAME = os.getenv("QUEUE_NAME")
+QUEUE_NAME_SMALL = os.getenv("QUEUE_NAME_SMALL", f"{QUEUE_NAME}.small")
+QUEUE_NAME_LARGE = os.getenv("QUEUE_NAME_LARGE", f"{QUEUE_NAME}.large")
+# джоба крупнее стольких строк идёт в очередь крупных
+SCHEDULER_LARGE_JOB_ROWS = int(os.getenv("SCHEDULER_LARGE_JOB_ROWS", "10000"))
+# x-max-priority очередей (RabbitMQ советует не больше 10); 0 — без приоритетов
+SCHEDULER_MAX_PRIORITY = int(os.getenv("SCHEDULER_MAX_PRIORITY", "9"))
+# доли prefetch воркера по очередям; вес 0 — воркер очередь не слушает
+WORKER_QUEUE_WEIGHTS = os.getenv("WORKER_QUEUE_WEIGHTS", "small=3,large=1")
+
+SMALL, LARGE = "small", "large"
+
+
+def _queue(name: str) -> RabbitQueue:
+    arguments = {"x-max-priority": SCHEDULER_MAX_PRIORITY} if SCHEDULER_MAX_PRIORITY > 0 else None
+    return RabbitQueue(name, arguments=arguments)
+
+
+queues: Dict[str, RabbitQueue] = {SMALL: _queue(QUEUE_NAME_SMALL), LARGE: _queue(QUEUE_NAME_LARGE)}
+
+
+def job_class(n_rows: int) -> str:
+    return LARGE if n_rows > SCHEDULER_LARGE_JOB_ROWS else SMALL
+
+
+def priority(queued: int) -> int | None:
+    """Приоритет сообщения по числу джоб пользователя, уже ждущих в очереди: первая — наивысший."""
+    if SCHEDULER_MAX_PRIORITY <= 0:
+        return None
+    return max(SCHEDULER_MAX_PRIORITY - max(queued, 0), 0)
+
+
+def parse_weights(spec: str) -> Dict[str, int]:
+    """"small=3,large=1" -> {"small": 3, "large": 1}; неизвестная очередь — ValueError."""
+    weights = {SMALL: 0, LARGE: 0}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip()
+        if name not in weights:
+            raise ValueError(f"Unknown queue in WORKER_QUEUE_WEIGHTS: {name}")
+        weights[name] = int(value)
+    if not any(weights.values()):
+        raise ValueError("WORKER_QUEUE_WEIGHTS: all weights are zero")
+    return weights
+
+
+def prefetch_split(total: int, weights: Dict[str, int]) -> Dict[str, int]:
+    """Prefetch воркера по очередям пропорционально весам; очередь с весом > 0 получает хотя бы 1."""
+    active = {name: w for name, w in weights.items() if w > 0}
+    share = sum(active.values())
+    return {name: max(total * w // share, 1) for name, w in active.items()}
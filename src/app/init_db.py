@@ -1,13 +1,37 @@
 from src.app.infra.db import engine, SessionLocal
 from src.app.infra.models import ORMUser, ORMAccount, Base
 from src.app.domain.user import Client, Admin
+from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 import logging
 
 logging.basicConfig(level=logging.INFO)
 
+# Идемпотентные миграции для уже существующих таблиц (create_all их не трогает)
+MIGRATIONS = [
+    "ALTER TABLE accounts ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE accounts ADD COLUMN IF NOT EXISTS reserved INTEGER NOT NULL DEFAULT 0",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_account_id ON transactions (account_id)",
+    "CREATE INDEX IF NOT EXISTS ix_prediction_jobs_owner_created "
+    "ON prediction_jobs (owner_id, created_at DESC, id DESC)",
+    "ALTER TABLE prediction_jobs ADD COLUMN IF NOT EXISTS storage_format VARCHAR(16) NOT NULL DEFAULT 'json'",
+    "ALTER TABLE prediction_jobs ADD COLUMN IF NOT EXISTS payload BYTEA",
+    "ALTER TABLE prediction_jobs ADD COLUMN IF NOT EXISTS invalid_payload BYTEA",
+    "ALTER TABLE prediction_jobs ADD COLUMN IF NOT EXISTS series JSON",
+    "ALTER TABLE model_states ADD COLUMN IF NOT EXISTS prefix_hash VARCHAR(64)",
+    # payload уже сжат zstd: без TOAST-сжатия substr среза читает только свои куски
+    "ALTER TABLE prediction_jobs ALTER COLUMN payload SET STORAGE EXTERNAL",
+    "ALTER TABLE prediction_jobs ALTER COLUMN invalid_payload SET STORAGE EXTERNAL",
+]
+
+def migrate():
+    with engine.begin() as conn:
+        for ddl in MIGRATIONS:
+            conn.execute(text(ddl))
+
 def main():
     Base.metadata.create_all(bind=engine)
+    migrate()
     db = SessionLocal()
 
     demo_user  = Client("demo@user",  Client.hash_password("user"))
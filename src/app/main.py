@@ -2,14 +2,20 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.app.api import router as api_router
+from src.app.api.responses import ORJSONResponse
 from src.app.web import router as web_router
 from src.app.infra.mq import start_broker, stop_broker
+from src.app.infra import job_events
+from src.app.services.admission import admission
+from src.app.infra.db import async_engine
+from src.app.web import api_client
 
 app = FastAPI(
     title="ML-Service-Coincast",
     version="0.1.0",
     docs_url="/docs",
     redoc_url=None,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -26,8 +32,22 @@ app.include_router(web_router)
 
 @app.on_event("startup")
 async def _mq_start():
+    # завершённые джобы освобождают место в очереди пользователя (лимит допуска)
+    job_events.hub.add_listener(admission.on_job_event)
     await start_broker()
 
 @app.on_event("shutdown")
 async def _mq_stop():
-    await stop_broker()
\ No newline at end of file
+    await stop_broker()
+
+@app.on_event("startup")
+async def _web_client_start():
+    await api_client.start(app)
+
+@app.on_event("shutdown")
+async def _web_client_stop():
+    await api_client.stop()
+
+@app.on_event("shutdown")
+async def _db_stop():
+    await async_engine.dispose()
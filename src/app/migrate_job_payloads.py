@@ -0,0 +1,74 @@
+"""
+Перенос данных завершённых джоб из JSON-колонок в компактный payload
+(Arrow IPC + zstd, infra/job_payload.py).
+
+    docker compose run --rm --no-deps init-db python -m src.app.migrate_job_payloads
+
+Идемпотентно и порциями: JOB_MIGRATION_BATCH джоб на транзакцию, по возрастанию id.
+Джобы, чьи данные не укладываются в колоночную схему, остаются в JSON —
+чтение поддерживает оба формата, так что скрипт можно прервать и запустить снова.
+"""
+import json, logging, os
+
+from sqlalchemy import select, update
+
+from src.app.domain.enums import JobStatus
+from src.app.infra import job_payload
+from src.app.infra.db import SessionLocal
+from src.app.infra.models import ORMPredictionJob
+from src.app.init_db import migrate
+
+logging.basicConfig(level=logging.INFO)
+
+JOB_MIGRATION_BATCH = int(os.getenv("JOB_MIGRATION_BATCH", "200"))
+
+
+def migrate_batch(db, after_id: int) -> tuple[int, int, int, int, int]:
+    """(последний id, перенесено, оставлено в JSON, байт JSON, байт payload)."""
+    J = ORMPredictionJob
+    rows = db.execute(
+        select(J.id, J.valid_input, J.predictions, J.invalid_rows)
+        .where(J.id > after_id, J.storage_format == job_payload.JSON, J.status == JobStatus.OK)
+        .order_by(J.id)
+        .limit(JOB_MIGRATION_BATCH)
+    ).all()
+    if not rows:
+        return after_id, 0, 0, 0, 0
+
+    params, skipped, json_bytes, bin_bytes = [], 0, 0, 0
+    for job_id, valid_input, predictions, invalid_rows in rows:
+        enc = job_payload.encode(valid_input or [], predictions or [], invalid_rows or [])
+        if enc is None:
+            skipped += 1
+            continue
+        json_bytes += len(json.dumps([valid_input, predictions, invalid_rows]))
+        bin_bytes += len(enc.data) + len(enc.invalid or b"")
+        params.append({
+            "id": job_id, "valid_input": [], "predictions": [], "invalid_rows": [],
+            "storage_format": enc.storage_format, "payload": enc.data, "invalid_payload": enc.invalid,
+        })
+    if params:
+        db.execute(update(J), params)
+    db.commit()
+    return rows[-1][0], len(params), skipped, json_bytes, bin_bytes
+
+
+def main() -> None:
+    migrate()
+    db = SessionLocal()
+    last_id, moved, skipped, json_bytes, bin_bytes = 0, 0, 0, 0, 0
+    try:
+        while True:
+            last_id, n, s, jb, bb = migrate_batch(db, last_id)
+            if not n and not s:
+                break
+            moved, skipped, json_bytes, bin_bytes = moved + n, skipped + s, json_bytes + jb, bin_bytes + bb
+            logging.info("up to job %s: %s moved, %s kept as JSON", last_id, moved, skipped)
+    finally:
+        db.close()
+    logging.info("done: %s jobs moved (%.1f MB JSON -> %.1f MB), %s kept as JSON",
+                 moved, json_bytes / 2**20, bin_bytes / 2**20, skipped)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
-from src.app.domain.account import Account
 from src.app.domain.enums import TxType
 from src.app.infra.repositories import AccountRepo
+from src.app.infra.async_repositories import AsyncAccountRepo
 
 
 class AccountService:
@@ -9,18 +9,32 @@ class AccountService:
     def __init__(self, acc_repo: AccountRepo):
         self._acc_repo = acc_repo
 
-    # фасады
+    # фасады: атомарные операции на стороне SQL
     def deposit(self, account_id: int, amount: int, reason: str) -> int:
-        acc: Account = self._acc_repo.load(account_id)
-        acc.apply(delta=amount, reason=reason, tx_type=TxType.DEPOSIT)
-        self._acc_repo.save(acc)
-        return acc.balance
+        return self._acc_repo.deposit(account_id, amount, reason)
 
     def charge_for_prediction(self, account_id: int, cost: int, reason: str) -> int:
-        acc = self._acc_repo.load(account_id)
-        acc.apply(delta=-cost, reason=reason, tx_type=TxType.PREDICTION_CHARGE)
-        self._acc_repo.save(acc)
-        return acc.balance
+        return self._acc_repo.charge(account_id, cost, reason, TxType.PREDICTION_CHARGE)
 
-    def history(self, account_id: int):
-        return self._acc_repo.load(account_id).history
\ No newline at end of file
+    def history(self, account_id: int, *, limit: int = 50, before_id: int | None = None):
+        return self._acc_repo.transactions(account_id, limit=limit, before_id=before_id)
+
+
+
+class AsyncAccountService:
+    """AccountService для API (async-репозиторий)."""
+
+    def __init__(self, acc_repo: AsyncAccountRepo):
+        self._acc_repo = acc_repo
+
+    async def balance(self, account_id: int):
+        return await self._acc_repo.load(account_id)
+
+    async def deposit(self, account_id: int, amount: int, reason: str) -> int:
+        return await self._acc_repo.deposit(account_id, amount, reason)
+
+    async def charge_for_prediction(self, account_id: int, cost: int, reason: str) -> int:
+        return await self._acc_repo.charge(account_id, cost, reason, TxType.PREDICTION_CHARGE)
+
+    async def history(self, account_id: int, *, limit: int = 50, before_id: int | None = None):
+        return await self._acc_repo.transactions(account_id, limit=limit, before_id=before_id)
@@ -0,0 +1,256 @@
+"""
+Допуск джоб до записи в БД: цена запроса по модели, лимиты пользователя
+(джоб в очереди, строк в минуту) и проверка доступного баланса по кэшу.
+Отказ (402/429) обходится без INSERT джобы и холда; холд в БД остаётся
+окончательной проверкой средств.
+
+Состояние — процессное, как у кэша пользователей: лимиты считаются на процесс
+API. Методы вызываются из event loop и между собой не конкурируют (await —
+только при загрузке баланса, после неё лимиты проверяются заново).
+"""
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+import os, time
+
+from src.app.services.model_gateway import ModelGateway
+
+COST_PER_ROW = int(os.getenv("COST_PER_ROW"))
+# джоб пользователя в очереди (принятых процессом и ещё не завершённых); 0 — без лимита
+ADMISSION_MAX_QUEUED_JOBS = int(os.getenv("ADMISSION_MAX_QUEUED_JOBS", "100"))
+# строк пользователя за скользящую минуту; 0 — без лимита
+ADMISSION_ROWS_PER_MINUTE = int(os.getenv("ADMISSION_ROWS_PER_MINUTE", "0"))
+# время жизни кэша доступного баланса и таблицы цен (с)
+ADMISSION_BALANCE_TTL_S = float(os.getenv("ADMISSION_BALANCE_TTL_S", "5"))
+ADMISSION_PRICE_TTL_S = float(os.getenv("ADMISSION_PRICE_TTL_S", "60"))
+# джоба без события о завершении перестаёт занимать место в очереди через (с)
+ADMISSION_QUEUED_TTL_S = float(os.getenv("ADMISSION_QUEUED_TTL_S", "3600"))
+
+RATE_WINDOW_S = 60.0
+
+
+class PriceTable:
+    """Цена строки по моделям: COST_PER_ROW × MLModel.price_per_row, кэш на ttl секунд."""
+
+    def __init__(self, ttl: float = ADMISSION_PRICE_TTL_S, model_gateway: ModelGateway | None = None) -> None:
+        self.ttl = ttl
+        self._models = model_gateway or ModelGateway()
+        self._prices: Dict[str, int] = {}
+        self._expires = 0.0
+
+    def row_price(self, model_name: str) -> int:
+        """Кредитов за строку; неизвестная модель — ModelGateway.UnknownModel."""
+        now = time.monotonic()
+        if now >= self._expires:
+            self._prices.clear()
+            self._expires = now + self.ttl
+        price = self._prices.get(model_name)
+        if price is None:
+            price = self._prices[model_name] = COST_PER_ROW * self._models.price_per_row(model_name)
+        return price
+
+    def clear(self) -> None:
+        self._prices.clear()
+
+
+prices = PriceTable()
+
+
+@dataclass(slots=True)
+class Estimate:
+    model_name: str
+    n_rows: int
+    price_per_row: int
+    cost: int
+
+
+@dataclass(eq=False, slots=True)
+class Ticket:
+    """Принятый запрос: занимает место в очереди пользователя и строки в окне лимита."""
+    user_id: int
+    account_id: int
+    n_rows: int
+    cost: int
+    admitted_at: float
+    job_id: Optional[int] = None
+    released: bool = False
+
+
+class AdmissionController:
+
+    class NotEnoughCredits(Exception): ...
+
+    class RateLimited(Exception):
+        def __init__(self, reason: str, retry_after: float) -> None:
+            super().__init__(reason)
+            self.retry_after = retry_after
+
+    UnknownModel = ModelGateway.UnknownModel
+
+    def __init__(
+        self,
+        *,
+        price_table: PriceTable | None = None,
+        max_queued_jobs: int = ADMISSION_MAX_QUEUED_JOBS,
+        rows_per_minute: int = ADMISSION_ROWS_PER_MINUTE,
+        balance_ttl: float = ADMISSION_BALANCE_TTL_S,
+        queued_ttl: float = ADMISSION_QUEUED_TTL_S,
+    ) -> None:
+        self._prices = price_table or prices
+        self.max_queued_jobs = max_queued_jobs
+        self.rows_per_minute = rows_per_minute
+        self.balance_ttl = balance_ttl
+        self.queued_ttl = queued_ttl
+        self._queued: Dict[int, set[Ticket]] = defaultdict(set)
+        self._window: Dict[int, deque[Ticket]] = defaultdict(deque)
+        self._window_rows: Dict[int, int] = defaultdict(int)
+        self._balances: Dict[int, tuple[float, int]] = {}
+        self.rejected = 0
+
+    def estimate(self, model_name: str, n_rows: int) -> Estimate:
+        price = self._prices.row_price(model_name)
+        return Estimate(model_name, n_rows, price, n_rows * price)
+
+    def check_queue(self, user_id: int) -> None:
+        """Только лимит очереди — до приёма тела, пока число строк неизвестно."""
+        self._check(user_id, 0, time.monotonic())
+
+    async def available(self, account_id: int, load: Callable[[], Awaitable[int]]) -> int:
+        """Доступный баланс (balance - reserved) из кэша; промах — загрузка одной строки счёта."""
+        now = time.monotonic()
+        cached = self._balances.get(account_id)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        value = await load()
+        self._balances[account_id] = (time.monotonic() + self.balance_ttl, value)
+        return value
+
+    async def admit(
+        self, user_id: int, account_id: int, model_name: str, n_rows: int, load: Callable[[], Awaitable[int]],
+    ) -> Ticket:
+        """
+        Оценка стоимости и проверки до записи в БД. Кэш баланса только занижается
+        (холд вычитается сразу, пополнения он не видит), поэтому отказ по нему
+        перепроверяется свежим значением — 402 только по данным из БД.
+        """
+        est = self.estimate(model_name, n_rows)
+        try:
+            self._check(user_id, n_rows, time.monotonic())
+            if est.cost > 0:
+                cached = self._balances.get(account_id)
+                if cached is None or cached[0] <= time.monotonic() or cached[1] < est.cost:
+                    self._balances.pop(account_id, None)
+                    if await self.available(account_id, load) < est.cost:
+                        raise AdmissionController.NotEnoughCredits
+                # за время загрузки баланса могли пройти другие запросы пользователя
+                self._check(user_id, n_rows, time.monotonic())
+        except (AdmissionController.RateLimited, AdmissionController.NotEnoughCredits):
+            self.rejected += 1
+            raise
+
+        ticket = Ticket(user_id, account_id, n_rows, est.cost, time.monotonic())
+        self._queued[user_id].add(ticket)
+        self._window[user_id].append(ticket)
+        self._window_rows[user_id] += n_rows
+        cached = self._balances.get(account_id)
+        if cached is not None:
+            self._balances[account_id] = (cached[0], cached[1] - est.cost)
+        return ticket
+
+    def bind(self, ticket: Ticket, job_id: int) -> None:
+        """Джоба записана: её событие о завершении освободит место в очереди."""
+        ticket.job_id = job_id
+
+    def release(self, ticket: Ticket) -> None:
+        """Запрос не дошёл до очереди: вернуть место и строки, баланс перечитать."""
+        if ticket.released:
+            return
+        ticket.released = True
+        self._discard(ticket)
+        if ticket in self._window.get(ticket.user_id, ()):
+            self._window_rows[ticket.user_id] -= ticket.n_rows
+        self._balances.pop(ticket.account_id, None)
+
+    def on_job_event(self, event: Dict[str, Any]) -> None:
+        """Событие о завершении джобы (job_events.hub): место в очереди свободно."""
+        queued = self._queued.get(event.get("owner_id"))
+        if not queued:
+            return
+        for ticket in [t for t in queued if t.job_id == event.get("job_id")]:
+            self._discard(ticket)
+            # списание уже в БД: кэш баланса счёта устарел
+            self._balances.pop(ticket.account_id, None)
+
+    def invalidate_balance(self, account_id: int) -> None:
+        """Баланс счёта изменился не через допуск (пополнение): снимок перечитать."""
+        self._balances.pop(account_id, None)
+
+    def queued(self, user_id: int) -> int:
+        self._expire(user_id, time.monotonic())
+        return len(self._queued.get(user_id, ()))
+
+    def _discard(self, ticket: Ticket) -> None:
+        queued = self._queued.get(ticket.user_id)
+        if queued is None:
+            return
+        queued.discard(ticket)
+        if not queued:
+            del self._queued[ticket.user_id]
+
+    def _expire(self, user_id: int, now: float) -> None:
+        queued = self._queued.get(user_id)
+        if queued:
+            for ticket in [t for t in queued if now - t.admitted_at > self.queued_ttl]:
+                self._discard(ticket)
+        window = self._window.get(user_id)
+        if window is None:
+            return
+        while window and now - window[0].admitted_at >= RATE_WINDOW_S:
+            ticket = window.popleft()
+            if not ticket.released:
+                self._window_rows[user_id] -= ticket.n_rows
+        if not window:
+            del self._window[user_id]
+            self._window_rows.pop(user_id, None)
+
+    def _check(self, user_id: int, n_rows: int, now: float) -> None:
+        self._expire(user_id, now)
+        queued = self._queued.get(user_id, ())
+        if self.max_queued_jobs and len(queued) >= self.max_queued_jobs:
+            # место освободится с событием о завершении; раньше истечения TTL — точно
+            oldest = min(t.admitted_at for t in queued)
+            raise AdmissionController.RateLimited(
+                f"Too many queued jobs (max {self.max_queued_jobs})",
+                min(RATE_WINDOW_S, self.queued_ttl - (now - oldest)),
+            )
+        if self.rows_per_minute and n_rows:
+            used = self._window_rows.get(user_id, 0)
+            if used + n_rows > self.rows_per_minute:
+                raise AdmissionController.RateLimited(
+                    f"Rows per minute limit exceeded ({self.rows_per_minute})",
+                    self._retry_after(user_id, n_rows, now),
+                )
+
+    def _retry_after(self, user_id: int, n_rows: int, now: float) -> float:
+        """Через сколько секунд в окне освободится место под n_rows (запрос больше лимита — окно целиком)."""
+        need = self._window_rows.get(user_id, 0) + n_rows - self.rows_per_minute
+        if n_rows > self.rows_per_minute:
+            return RATE_WINDOW_S
+        for ticket in self._window.get(user_id, ()):
+            if ticket.released:
+                continue
+            need -= ticket.n_rows
+            if need <= 0:
+                return max(RATE_WINDOW_S - (now - ticket.admitted_at), 0.0)
+        return RATE_WINDOW_S
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": sum(len(q) for q in self._queued.values()),
+            "users": len(self._queued),
+            "balances": len(self._balances),
+            "rejected": self.rejected,
+        }
+
+
+admission = AdmissionController()
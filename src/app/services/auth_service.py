@@ -1,8 +1,10 @@
+import asyncio
 from dataclasses import dataclass
 from typing import Callable
 
 from src.app.domain.user import Client, Admin
 from src.app.infra.repositories import UserRepo, AccountRepo
+from src.app.infra.async_repositories import AsyncUserRepo
 
 
 @dataclass(slots=True)
@@ -40,4 +42,30 @@ class AuthService:
         dom_user = self._users.get_by_email(email)
         if not dom_user or not dom_user.check_password(raw_password):
             raise AuthService.BadCredentials
-        return TokenDTO(access_token=self._make_token(dom_user.id))
\ No newline at end of file
+        return TokenDTO(access_token=self._make_token(dom_user.id))
+
+
+class AsyncAuthService:
+    """AuthService для API: async-репозиторий, bcrypt — в потоке, не на event loop."""
+
+    EmailExists = AuthService.EmailExists
+    BadCredentials = AuthService.BadCredentials
+
+    def __init__(self, user_repo: AsyncUserRepo, token_factory: Callable[[int], str]):
+        self._users = user_repo
+        self._make_token = token_factory
+
+    async def register(self, email: str, raw_password: str, is_admin=False) -> TokenDTO:
+        if await self._users.get_by_email(email):
+            raise AuthService.EmailExists
+
+        hashed = await asyncio.to_thread(Client.hash_password, raw_password)
+        dom_user = (Admin if is_admin else Client)(email=email, password=hashed)
+        saved = await self._users.add(dom_user)
+        return TokenDTO(access_token=self._make_token(saved.id))
+
+    async def login(self, email: str, raw_password: str) -> TokenDTO:
+        dom_user = await self._users.get_by_email(email)
+        if not dom_user or not await asyncio.to_thread(dom_user.check_password, raw_password):
+            raise AuthService.BadCredentials
+        return TokenDTO(access_token=self._make_token(dom_user.id))
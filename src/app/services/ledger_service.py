@@ -0,0 +1,95 @@
+import logging
+from dataclasses import dataclass
+from typing import List
+
+from src.app.infra.repositories import AccountRepo
+
+
+@dataclass(slots=True)
+class LedgerMismatch:
+    account_id: int
+    balance: int
+    ledger: int
+
+    @property
+    def drift(self) -> int:
+        return self.balance - self.ledger
+
+
+class LedgerReconciler:
+    """Сверка материализованного accounts.balance с журналом транзакций."""
+
+    def __init__(self, acc_repo: AccountRepo, batch_size: int = 500):
+        self._acc_repo = acc_repo
+        self._batch = batch_size
+
+    def check(self) -> List[LedgerMismatch]:
+        mismatches: List[LedgerMismatch] = []
+        after_id = 0
+        while True:
+            chunk = self._acc_repo.ledger_totals(after_id=after_id, limit=self._batch)
+            if not chunk:
+                break
+            for account_id, balance, ledger in chunk:
+                if balance != ledger:
+                    mismatches.append(LedgerMismatch(account_id, balance, ledger))
+            after_id = chunk[-1][0]
+
+        for m in mismatches:
+            logging.warning(
+                "ledger mismatch: account=%s balance=%s ledger=%s drift=%s",
+                m.account_id, m.balance, m.ledger, m.drift,
+            )
+        return mismatches
+
+    def check_reserved(self) -> List[LedgerMismatch]:
+        """accounts.reserved против суммы активных холдов (ledger = сумма холдов)."""
+        mismatches: List[LedgerMismatch] = []
+        after_id = 0
+        while True:
+            chunk = self._acc_repo.reserved_totals(after_id=after_id, limit=self._batch)
+            if not chunk:
+                break
+            for account_id, reserved, held in chunk:
+                if reserved != held:
+                    mismatches.append(LedgerMismatch(account_id, reserved, held))
+            after_id = chunk[-1][0]
+
+        for m in mismatches:
+            logging.warning(
+                "reserve mismatch: account=%s reserved=%s holds=%s",
+                m.account_id, m.balance, m.ledger,
+            )
+        return mismatches
+
+    def release_orphan_holds(self) -> int:
+        """Снять холды джоб, которые уже завершились, но холд не был закрыт."""
+        jobs = self._acc_repo.orphan_hold_jobs()
+        for job_id in jobs:
+            self._acc_repo.release_hold(job_id)
+        if jobs:
+            logging.warning("ledger: released %d orphan hold(s)", len(jobs))
+        return len(jobs)
+
+    def repair(self, mismatches: List[LedgerMismatch]) -> int:
+        """
+        Журнал — источник истины: balance = сумма транзакций (считается в UPDATE).
+        Счёт, balance которого изменился после check(), пропускается — его
+        перепроверит следующий проход. Возвращает число исправленных счетов.
+        """
+        fixed = 0
+        for m in mismatches:
+            if self._acc_repo.reset_balance(m.account_id, m.balance):
+                fixed += 1
+            else:
+                logging.info("ledger: account %s changed since check, skipping repair", m.account_id)
+        return fixed
+
+    def repair_reserved(self, mismatches: List[LedgerMismatch]) -> int:
+        fixed = 0
+        for m in mismatches:
+            if self._acc_repo.reset_reserved(m.account_id, m.balance):
+                fixed += 1
+            else:
+                logging.info("ledger: account %s reserve changed since check, skipping repair", m.account_id)
+        return fixed
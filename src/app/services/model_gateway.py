@@ -1,19 +1,84 @@
-from typing import Any, Dict, List, Optional
-from src.app.infra.ml.registry import get as get_model, list_names
+from functools import reduce
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from src.app.domain.ml_model import IncrementalModel, MLModel, SeriesState
+from src.app.infra.ml.registry import get as get_model, incremental, list_names, price_per_row as model_price, version as model_version
 
 class ModelGateway:
     class UnknownModel(Exception):
         ...
 
-    def predict(self, model_name: str, rows: List[Dict[str, Any]]) -> List[float]:
+    def _get(self, model_name: str):
         try:
-            model = get_model(model_name)
+            return get_model(model_name)
         except KeyError as e:
             raise ModelGateway.UnknownModel(str(e)) from e
+
+    def predict(self, model_name: str, rows: List[Dict[str, Any]], prices: Optional[np.ndarray] = None) -> List[float]:
+        """prices — готовая колонка цен rows (если есть): модели, которые умеют, берут её."""
+        model = self._get(model_name)
+        if prices is not None and len(prices) == len(rows):
+            preds = model.predict_prices(prices)
+            if preds is not None:
+                return preds
         return model.predict(rows)
 
+    def predict_many(self, model_name: str, prices: np.ndarray, horizon: int) -> np.ndarray:
+        """Пачка рядов одной длины (k, n) -> прогнозы (k, horizon)."""
+        preds = self._get(model_name).predict_many(prices, horizon)
+        if preds is None:
+            raise ValueError(f"Model {model_name} does not support batch forecasts")
+        return preds
+
+    def supports_many(self, model_name: str) -> bool:
+        """Модель умеет прогнозировать пачку рядов одним вызовом (переопределяет predict_many)."""
+        return type(self._get(model_name)).predict_many is not MLModel.predict_many
+
+    def is_incremental(self, model_name: str) -> bool:
+        return isinstance(self._get(model_name), IncrementalModel)
+
+    def supports_parts(self, model_name: str) -> bool:
+        """Можно ли считать модель по частям ряда — без создания экземпляра модели."""
+        try:
+            return incremental(model_name)
+        except KeyError as e:
+            raise ModelGateway.UnknownModel(str(e)) from e
+
+    def predict_series(
+        self, model_name: str, state: Optional[SeriesState], rows: List[Dict[str, Any]],
+        prices: Optional[np.ndarray] = None,
+    ) -> Tuple[List[float], SeriesState]:
+        """
+        Прогноз инкрементальной модели по ряду: (прогноз на len(rows) шагов, новое
+        состояние); prices — колонка цен валидатора, если есть.
+        """
+        model = self._get(model_name)
+        state = model.advance(state, rows, prices)
+        return model.forecast(state, len(rows)), state
+
+    def part_stats(self, model_name: str, offset: int, prev: Optional[float], prices: np.ndarray) -> Dict[str, Any]:
+        """Статистики части ряда: prices начинаются с точки номер offset, prev — цена перед ними."""
+        model = self._get(model_name)
+        state = SeriesState(version=model.version, n=offset, last=None if prev is None else ("", prev))
+        return model.update(state, prices)
+
+    def forecast_parts(self, model_name: str, parts: List[Dict[str, Any]], n: int, last: float, horizon: int) -> List[float]:
+        """Прогноз ряда из n точек по статистикам его частей (в порядке ряда)."""
+        model = self._get(model_name)
+        state = SeriesState(version=model.version, n=n, last=("", last), stats=reduce(model.merge, parts))
+        return model.forecast(state, horizon)
+
     def list_models(self, allowed: Optional[List[str]] = None) -> List[str]:
         return list_names(allowed)
 
     def price_per_row(self, model_name: str) -> int:
-        return get_model(model_name).price_per_row
\ No newline at end of file
+        try:
+            return model_price(model_name)
+        except KeyError as e:
+            raise ModelGateway.UnknownModel(str(e)) from e
+
+    def version(self, model_name: str) -> str:
+        try:
+            return model_version(model_name)
+        except KeyError as e:
+            raise ModelGateway.UnknownModel(str(e)) from e
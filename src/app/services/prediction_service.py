@@ -1,64 +1,517 @@
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, field
+from collections import defaultdict
+from itertools import groupby
 
-from src.app.domain.enums import TxType
-from src.app.domain.account import Account
-from src.app.domain.prediction import PredictionJob
-from src.app.domain.validation import Validator
-from src.app.infra.repositories import AccountRepo, PredictionRepo
+import numpy as np
+
+from src.app.domain.enums import TxType, JobStatus
+from src.app.domain.account import InsufficientFunds
+from src.app.domain.prediction import PredictionJob, PredictionSummary, PredictionSlice, JOB_FIELDS
+from src.app.domain.ml_model import SeriesState
+from src.app.domain.validation import Validator, ValidationResult
+from src.app.infra.repositories import AccountRepo, PredictionRepo, ModelStateRepo
+from src.app.infra.async_repositories import AsyncAccountRepo, AsyncPredictionRepo
+from src.app.infra.result_cache import ResultCache, default_cache, result_key
+from src.app.infra import job_payload
+from src.app.infra.job_payload import EncodedPayload
 from src.app.services.model_gateway import ModelGateway
+from src.app.services.admission import prices
 
 COST_PER_ROW: int = int(os.getenv("COST_PER_ROW"))
+# сколько процентов обычной стоимости списывать, если результат взят из кэша
+RESULT_CACHE_HIT_BILLING_PCT: int = int(os.getenv("RESULT_CACHE_HIT_BILLING_PCT", "100"))
+
+
+def series_rows(n_rows: int, horizon: Optional[int]) -> int:
+    """Строки к оплате за ряд пакетной джобы: история или шаги прогноза, что больше."""
+    return max(n_rows, horizon or 0)
+
+
+@dataclass(slots=True)
+class JobRequest:
+    """Сообщение очереди: джоба и её сырые строки (или ссылка на них в blob store)."""
+    job_id: int
+    account_id: int
+    model_name: str
+    raw_rows: List[Dict[str, Any]]
+    data_ref: Optional[str] = None
+    # формат payload по ссылке: ndjson (строки) | csv | arrow (колонки) | series (ряды пакетной джобы)
+    data_format: str = "ndjson"
+    # колоночный payload — валидируется без сборки dict-строк
+    columns: Optional[Dict[str, Any]] = None
+    owner_id: Optional[int] = None
+    # ряд клиента: инкрементальная модель продолжает его состояние (model_state)
+    series_id: Optional[str] = None
+    model_state: Optional[SeriesState] = None
+    # пакетная джоба: ряды {"name", "data", "horizon"} вместо raw_rows
+    series: Optional[List[Dict[str, Any]]] = None
+    # строк в payload по оценке API (для деления большой джобы на части)
+    n_rows: Optional[int] = None
+
+
+@dataclass(slots=True)
+class JobOutcome:
+    """Результат вычисления джобы (валидация + инференс) до записи в БД."""
+    job_id: int
+    account_id: int
+    model_name: str
+    valid_rows: List[Dict[str, Any]] = field(default_factory=list)
+    invalid_rows: List[Any] = field(default_factory=list)
+    predictions: Optional[List[float]] = None
+    error: Optional[str] = None
+    cached: bool = False
+    # данные для записи в компактном виде (кодируются там же, где считались)
+    payload: Optional[EncodedPayload] = None
+    # новое состояние ряда инкрементальной модели (пишется вместе с результатом)
+    series_key: Optional[Tuple[int, str, str]] = None
+    model_state: Optional[SeriesState] = None
+    # результаты пакетной джобы по рядам
+    series: Optional[Dict[str, Dict[str, Any]]] = None
+    # число валидных строк, если джоба считалась частями (valid_rows не собираются)
+    n_valid: Optional[int] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def n_rows(self) -> int:
+        """Строки к оплате: валидные строки джобы; у пакетной — series_rows по рядам с прогнозом."""
+        if self.series is not None:
+            return sum(series_rows(r["n_valid"], r["horizon"]) for r in self.series.values() if r["n_valid"])
+        if self.n_valid is not None:
+            return self.n_valid
+        return len(self.valid_rows)
+
+    @property
+    def cost(self) -> int:
+        # цена строки — по модели (COST_PER_ROW × price_per_row), как у оценки при постановке
+        full = self.n_rows * prices.row_price(self.model_name)
+        if not self.cached:
+            return full
+        # попадание в кэш: RESULT_CACHE_HIT_BILLING_PCT от полной цены, с округлением вверх
+        return -(-full * RESULT_CACHE_HIT_BILLING_PCT // 100)
+
+    @property
+    def reason(self) -> str:
+        return f"Prediction {self.model_name}" + (" (cached)" if self.cached else "")
+
+
+@dataclass(slots=True)
+class ValidatedPart:
+    """Часть большой джобы после валидации: колонки валидных строк (по времени) и ошибки с номерами строк джобы."""
+    prices: np.ndarray
+    wall_us: np.ndarray
+    tz_offset_us: np.ndarray
+    invalid_rows: List[Any] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.prices)
 
 
 class PredictionService:
 
     class NotEnoughCredits(Exception): ...
     class ModelError(Exception): ...
+    class JobUnavailable(Exception): ...
 
-    def __init__(self, acc_repo: AccountRepo, pred_repo: PredictionRepo, model_gateway: ModelGateway | None = None):
+    def __init__(
+        self,
+        acc_repo: AccountRepo,
+        pred_repo: PredictionRepo,
+        model_gateway: ModelGateway | None = None,
+        result_cache: ResultCache | None = None,
+        state_repo: ModelStateRepo | None = None,
+    ):
         self._acc_repo  = acc_repo
         self._pred_repo = pred_repo
+        self._state_repo = state_repo
         self._validator = Validator()
         self._models = model_gateway or ModelGateway()
+        self._results = result_cache if result_cache is not None else default_cache()
 
-    def _run_model(self, name: str, rows: list[dict]) -> list[float]:
+    def _run_model(self, name: str, rows: list[dict], prices: Optional[np.ndarray] = None) -> list[float]:
         try:
-            return self._models.predict(name, rows)
+            return self._models.predict(name, rows, prices)
         except Exception as exc:
             raise PredictionService.ModelError(str(exc)) from exc
 
+    def _cache_get(self, name: str, rows: list[dict]) -> tuple[Optional[Tuple[str, str]], Optional[list[float]]]:
+        """((ключ, версия модели) или None, если кэш выключен; прогноз из кэша или None)."""
+        if self._results is None:
+            return None, None
+        try:
+            version = self._models.version(name)
+        except ModelGateway.UnknownModel as exc:
+            raise PredictionService.ModelError(str(exc)) from exc
+        key = result_key(name, version, rows)
+        preds = self._results.get(key)
+        if preds is not None and len(preds) == len(rows):
+            return (key, version), preds
+        return (key, version), None
+
+    def _cache_put(self, name: str, entry: Optional[Tuple[str, str]], rows: list[dict], preds: list[float]) -> None:
+        if entry is not None and len(preds) == len(rows):
+            self._results.put(entry[0], name, entry[1], preds)
+
+    def _predict_cached(
+        self, name: str, rows: list[dict], prices: Optional[np.ndarray] = None,
+    ) -> tuple[list[float], bool]:
+        """(прогноз, взят ли из кэша); кэш — по хэшу валидных строк, модели и её версии."""
+        entry, preds = self._cache_get(name, rows)
+        if preds is not None:
+            return preds, True
+        preds = self._run_model(name, rows, prices)
+        self._cache_put(name, entry, rows, preds)
+        return preds, False
+
+    def _predict_series(
+        self, req: JobRequest, rows: list[dict], prices: Optional[np.ndarray] = None,
+    ) -> tuple[list[float], bool, Optional[SeriesState]]:
+        """
+        Прогноз по ряду клиента: инкрементальная модель продолжает req.model_state
+        (обучение — за O(новых точек)); прочие модели считаются как обычно.
+        """
+        try:
+            incremental = self._models.is_incremental(req.model_name)
+        except ModelGateway.UnknownModel as exc:
+            raise PredictionService.ModelError(str(exc)) from exc
+        if not incremental:
+            preds, cached = self._predict_cached(req.model_name, rows, prices)
+            return preds, cached, None
+        try:
+            preds, state = self._models.predict_series(req.model_name, req.model_state, rows, prices)
+        except Exception as exc:
+            raise PredictionService.ModelError(str(exc)) from exc
+        return preds, False, state
+
+    def _save_states(self, outcomes: List[JobOutcome]) -> None:
+        if self._state_repo is None:
+            return
+        for o in outcomes:
+            if o.model_state is not None and o.series_key is not None:
+                self._state_repo.put(o.series_key, o.model_state)
+
     def create_pending_job(self, *, owner_id: int, model_name: str) -> PredictionJob:
         return self._pred_repo.create_pending(owner_id=owner_id, model_name=model_name)
 
-    def _charge_and_save_ok(
+    def create_reserved_job(
         self,
         *,
+        owner_id: int,
         account_id: int,
-        job_id: int,
         model_name: str,
-        valid_rows: List[Dict[str, Any]],
-        invalid_rows: List[Dict[str, Any]],
-        predictions: List[float],
-    ) -> None:
-        cost = len(valid_rows) * COST_PER_ROW
-
-        acc: Account = self._acc_repo.load(account_id)
-        if acc.balance < cost:
-            self._pred_repo.mark_error(job_id, "not_enough_credits")
+        est_cost: int,
+    ) -> PredictionJob:
+        """PENDING-джоба + холд на оценочную стоимость (атомарно проверяет доступный баланс)."""
+        pending = self._pred_repo.create_pending(owner_id=owner_id, model_name=model_name)
+        if est_cost > 0:
+            try:
+                self._acc_repo.reserve(account_id, pending.id, est_cost)
+            except InsufficientFunds:
+                raise PredictionService.NotEnoughCredits
+        return pending
+
+    def abandon_job(self, job_id: int, error: str) -> None:
+        """Джоба не попала в очередь: пометить ошибкой и снять холд."""
+        self._fail(job_id, error)
+
+    def _charge(self, outcome: JobOutcome) -> None:
+        """
+        Списание — одним условным UPDATE в БД: против холда джобы, если он есть,
+        иначе напрямую с баланса. Без read-modify-write в Python.
+        """
+        cost = outcome.cost
+        try:
+            if self._acc_repo.commit_hold(outcome.job_id, cost, outcome.reason) is None and cost > 0:
+                self._acc_repo.charge(outcome.account_id, cost, outcome.reason, TxType.PREDICTION_CHARGE)
+        except InsufficientFunds:
             raise PredictionService.NotEnoughCredits
 
-        if cost > 0:
-            acc.apply(-cost, f"Prediction {model_name}", TxType.PREDICTION_CHARGE)
-            self._acc_repo.save(acc)
+    @staticmethod
+    def _ok_fields(outcome: JobOutcome) -> Dict[str, Any]:
+        return dict(
+            predictions=outcome.predictions,
+            cost=outcome.cost,
+            valid_input=outcome.valid_rows,
+            invalid_rows=outcome.invalid_rows,
+            payload=outcome.payload,
+            series=outcome.series,
+        )
+
+    def _fail(self, job_id: int, error: str) -> None:
+        self._pred_repo.mark_error(job_id, error)
+        self._acc_repo.release_hold(job_id)
+
+    # вычисление: без обращений к БД
 
-        self._pred_repo.mark_ok(
-            job_id=job_id,
-            predictions=predictions,
-            cost=cost,
-            valid_input=valid_rows,
-            invalid_rows=invalid_rows,
+    def _validated(self, req: JobRequest) -> Tuple[JobOutcome, ValidationResult]:
+        """Валидация джобы; outcome с ошибкой, если валидных строк нет."""
+        if req.columns is not None:
+            res = self._validator.validate_columns(req.columns)
+        else:
+            res = self._validator.validate(req.raw_rows)
+        outcome = JobOutcome(
+            job_id=req.job_id,
+            account_id=req.account_id,
+            model_name=req.model_name,
+            valid_rows=res.valid_rows,
+            invalid_rows=res.invalid_rows,
         )
+        # Жёсткое требование: dataset должен содержать колонку времени и цену
+        if not res.valid_rows:
+            outcome.error = "no_valid_rows: dataset must contain a time (date/datetime) and a numeric price"
+        return outcome, res
+
+    @staticmethod
+    def _finish(outcome: JobOutcome, res: ValidationResult, preds: List[float], cached: bool) -> JobOutcome:
+        if len(preds) != len(res.valid_rows):
+            outcome.error = "Model returned wrong number of predictions"
+            return outcome
+        outcome.predictions = preds
+        outcome.cached = cached
+        if job_payload.JOB_STORAGE_FORMAT == "arrow":
+            outcome.payload = job_payload.encode(
+                res.valid_rows, preds, res.invalid_rows,
+                prices=res.prices, wall_us=res.ts_wall_us, tz_offset_us=res.tz_offset_us,
+            )
+        return outcome
+
+    def compute(self, req: JobRequest) -> JobOutcome:
+        if req.series is not None:
+            return self.compute_series(req)
+        outcome, res = self._validated(req)
+        if not outcome.ok:
+            return outcome
+
+        try:
+            if req.series_id is not None and req.owner_id is not None:
+                preds, cached, outcome.model_state = self._predict_series(req, res.valid_rows, res.prices)
+                outcome.series_key = (req.owner_id, req.model_name, req.series_id)
+            else:
+                preds, cached = self._predict_cached(req.model_name, res.valid_rows, res.prices)
+        except PredictionService.ModelError as err:
+            outcome.error = str(err)
+            return outcome
+        return self._finish(outcome, res, preds, cached)
+
+    def compute_group(self, group: List[JobRequest]) -> List[JobOutcome]:
+        """
+        Джобы одного счёта и одной модели: валидация — по джобе, инференс — один
+        вызов модели (predict_many) на все джобы с одинаковым числом валидных строк.
+        Попадания в кэш результатов в вызов не попадают. Ряды клиента (series_id),
+        пакетные джобы и модели без predict_many считаются по одной (compute).
+        """
+        model_name = group[0].model_name
+        try:
+            batchable = self._models.supports_many(model_name)
+        except ModelGateway.UnknownModel:
+            batchable = False
+        outcomes: Dict[int, JobOutcome] = {}
+        stacks: Dict[int, List[Tuple[JobOutcome, ValidationResult]]] = defaultdict(list)
+        for r in group:
+            if not batchable or r.series is not None or (r.series_id is not None and r.owner_id is not None):
+                outcomes[r.job_id] = self.compute(r)
+                continue
+            outcome, res = self._validated(r)
+            outcomes[r.job_id] = outcome
+            if outcome.ok:
+                stacks[len(res.valid_rows)].append((outcome, res))
+
+        for n, items in stacks.items():
+            misses: List[Tuple[JobOutcome, ValidationResult, Optional[Tuple[str, str]]]] = []
+            for outcome, res in items:
+                try:
+                    entry, preds = self._cache_get(model_name, res.valid_rows)
+                except PredictionService.ModelError as err:
+                    outcome.error = str(err)
+                    continue
+                if preds is not None:
+                    self._finish(outcome, res, preds, True)
+                else:
+                    misses.append((outcome, res, entry))
+            if not misses:
+                continue
+            stack = np.vstack([self._prices_of(res) for _, res, _ in misses])
+            try:
+                preds = self._models.predict_many(model_name, stack, n).tolist()
+            except Exception as exc:
+                for outcome, _, _ in misses:
+                    outcome.error = str(exc)
+                continue
+            for (outcome, res, entry), p in zip(misses, preds):
+                self._cache_put(model_name, entry, res.valid_rows, p)
+                self._finish(outcome, res, p, False)
+        return [outcomes[r.job_id] for r in group]
+
+    @staticmethod
+    def _prices_of(res: ValidationResult) -> np.ndarray:
+        if res.prices is not None:
+            return res.prices
+        return np.fromiter((r["price"] for r in res.valid_rows), dtype=np.float64, count=len(res.valid_rows))
+
+    def compute_series(self, req: JobRequest) -> JobOutcome:
+        """
+        Пакетная джоба: каждый ряд валидируется отдельно, ряды одной длины с одним
+        горизонтом прогнозируются одним вызовом модели (predict_many). Ряд без
+        валидных строк получает свою ошибку; джоба — ошибку, только если таких все.
+        """
+        outcome = JobOutcome(job_id=req.job_id, account_id=req.account_id, model_name=req.model_name)
+        results: Dict[str, Dict[str, Any]] = {}
+        groups: Dict[Tuple[int, int], List[Tuple[str, np.ndarray]]] = defaultdict(list)
+        for item in req.series:
+            res = self._validator.validate(item.get("data") or [])
+            n = len(res.valid_rows)
+            horizon = item.get("horizon") or n
+            results[item["name"]] = {
+                "horizon": horizon, "n_valid": n, "n_invalid": len(res.invalid_rows),
+                "invalid_rows": res.invalid_rows, "predictions": None, "error": None,
+            }
+            if n == 0:
+                results[item["name"]]["error"] = "no_valid_rows"
+                continue
+            groups[(n, horizon)].append((item["name"], self._prices_of(res)))
+
+        if not groups:
+            outcome.error = "no_valid_rows: dataset must contain a time (date/datetime) and a numeric price"
+            return outcome
+        try:
+            for (_, horizon), group in groups.items():
+                preds = self._models.predict_many(req.model_name, np.vstack([p for _, p in group]), horizon)
+                for (name, _), p in zip(group, preds.tolist()):
+                    results[name]["predictions"] = p
+        except Exception as exc:
+            outcome.error = str(exc)
+            return outcome
+        outcome.predictions = []
+        outcome.series = results
+        return outcome
+
+    # большая джоба частями: валидация и статистики частей — в разных процессах,
+    # сборка и прогноз — в одном; dict-строки всей джобы не собираются
+
+    def validate_part(self, rows: List[Dict[str, Any]], offset: int) -> ValidatedPart:
+        """Валидация строк джобы с номера offset."""
+        res = self._validator.validate(rows)
+        invalid_rows = [(idx + offset, row) for idx, row in res.invalid_rows]
+        if res.prices is not None:
+            return ValidatedPart(res.prices, res.ts_wall_us, res.tz_offset_us, invalid_rows)
+        # построчный путь валидатора: колонки — из ISO-строк валидных строк
+        n = len(res.valid_rows)
+        if n == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return ValidatedPart(np.empty(0, dtype=np.float64), empty, empty, invalid_rows)
+        _, wall, off = Validator.time_parts([r["timestamp"] for r in res.valid_rows])
+        prices = np.fromiter((r["price"] for r in res.valid_rows), dtype=np.float64, count=n)
+        return ValidatedPart(prices, wall, off, invalid_rows)
+
+    @staticmethod
+    def gather_parts(parts: List[ValidatedPart]) -> Optional[ValidatedPart]:
+        """
+        Части (в порядке строк джобы) -> колонки всей джобы по времени, как у validate.
+        None — у строк разные tz-смещения: порядок задают ISO-строки, считать джобу целиком.
+        """
+        off = np.concatenate([p.tz_offset_us for p in parts])
+        if len(off) and not (off == off[0]).all():
+            return None
+        wall = np.concatenate([p.wall_us for p in parts])
+        # стабильная сортировка: равные моменты — в порядке строк, как у валидатора
+        order = np.argsort(wall, kind="stable")
+        return ValidatedPart(
+            np.concatenate([p.prices for p in parts])[order],
+            wall[order],
+            off[order],
+            [row for p in parts for row in p.invalid_rows],
+        )
+
+    def part_stats(self, model_name: str, offset: int, prev: Optional[float], prices: np.ndarray) -> Dict[str, Any]:
+        """Статистики модели по точкам ряда [offset, offset + len(prices)); prev — точка перед ними."""
+        return self._models.part_stats(model_name, offset, prev, prices)
+
+    def finish_parts(self, req: JobRequest, cols: ValidatedPart, stats: List[Dict[str, Any]]) -> Optional[JobOutcome]:
+        """
+        Прогноз по статистикам частей и payload джобы. None — результат не
+        укладывается в колоночный payload: джобу нужно считать целиком.
+        """
+        outcome = JobOutcome(job_id=req.job_id, account_id=req.account_id, model_name=req.model_name,
+                             invalid_rows=cols.invalid_rows, n_valid=len(cols))
+        if len(cols) == 0:
+            outcome.error = "no_valid_rows: dataset must contain a time (date/datetime) and a numeric price"
+            return outcome
+        try:
+            preds = self._models.forecast_parts(req.model_name, stats, len(cols), float(cols.prices[-1]), len(cols))
+            if len(preds) != len(cols):
+                raise PredictionService.ModelError("Model returned wrong number of predictions")
+        except Exception as exc:
+            outcome.error = str(exc)
+            return outcome
+        outcome.payload = job_payload.encode(
+            None, np.asarray(preds, dtype=np.float64), cols.invalid_rows,
+            prices=cols.prices, wall_us=cols.wall_us, tz_offset_us=cols.tz_offset_us,
+        )
+        if outcome.payload is None:
+            return None
+        # прогнозы — только в payload (в JSON-колонки они не пишутся)
+        outcome.predictions = []
+        return outcome
+
+    # запись результата: списание + статус джобы
+
+    def settle(self, outcome: JobOutcome) -> None:
+        if not outcome.ok:
+            self._fail(outcome.job_id, outcome.error)
+            return
+
+        session = self._acc_repo.session
+        try:
+            with session.begin_nested():
+                self._charge(outcome)
+                self._pred_repo.mark_ok(outcome.job_id, **self._ok_fields(outcome))
+                self._save_states([outcome])
+        except PredictionService.NotEnoughCredits:
+            self._fail(outcome.job_id, "not_enough_credits")
+            raise
+
+    def settle_many(self, outcomes: List[JobOutcome]) -> None:
+        """
+        Пакетная запись в текущей транзакции: списания — одним UPDATE на счёт,
+        статусы — пакетными mark_ok/mark_error. Если пачке счёта не хватает средств,
+        его джобы списываются по одной, каждая в своём savepoint, — недостача
+        одной джобы не задевает остальные.
+        """
+        session = self._acc_repo.session
+        done: List[JobOutcome] = []
+        failed: List[JobOutcome] = [o for o in outcomes if not o.ok]
+
+        ok = sorted((o for o in outcomes if o.ok), key=lambda o: o.account_id)
+        for account_id, group in groupby(ok, key=lambda o: o.account_id):
+            group = list(group)
+            try:
+                with session.begin_nested():
+                    self._acc_repo.commit_holds(account_id, [(o.job_id, o.cost, o.reason) for o in group])
+                done.extend(group)
+                continue
+            except InsufficientFunds:
+                pass
+
+            for o in group:
+                try:
+                    with session.begin_nested():
+                        self._charge(o)
+                    done.append(o)
+                except PredictionService.NotEnoughCredits:
+                    o.error = "not_enough_credits"
+                    failed.append(o)
+
+        self._pred_repo.mark_ok_many([{"id": o.job_id, **self._ok_fields(o)} for o in done])
+        self._save_states(done)
+        self._pred_repo.mark_error_many([(o.job_id, o.error) for o in failed])
+        self._acc_repo.release_holds([o.job_id for o in failed])
+
+    def _run_and_settle(self, req: JobRequest) -> None:
+        self.settle(self.compute(req))
 
     def make_prediction(
         self,
@@ -70,37 +523,10 @@ class PredictionService:
         валидируем, создаём pending,
         если валидных строк нет — помечаем ошибкой; иначе считаем, списываем, сохраняем OK.
         """
-        res = self._validator.validate(raw_rows)
-
         # создаём pending-запись сразу, чтобы всегда была история
         pending = self._pred_repo.create_pending(owner_id=user.id, model_name=model_name)
 
-        # Жёсткое требование: dataset должен содержать колонку времени и цену
-        if not res.valid_rows:
-            self._pred_repo.mark_error(
-                pending.id,
-                "no_valid_rows: dataset must contain a time (date/datetime) and a numeric price"
-            )
-            return self._pred_repo.get(pending.id)
-
-        session = self._acc_repo.session
-        with session.begin_nested():
-            try:
-                preds = self._run_model(model_name, res.valid_rows)
-                if len(preds) != len(res.valid_rows):
-                    raise PredictionService.ModelError("Model returned wrong number of predictions")
-
-                self._charge_and_save_ok(
-                    account_id=user.account.id,
-                    job_id=pending.id,
-                    model_name=model_name,
-                    valid_rows=res.valid_rows,
-                    invalid_rows=res.invalid_rows,
-                    predictions=preds,
-                )
-            except PredictionService.ModelError as err:
-                self._pred_repo.mark_error(pending.id, str(err))
-
+        self._run_and_settle(JobRequest(pending.id, user.account.id, model_name, raw_rows))
         return self._pred_repo.get(pending.id)
 
     def process_existing_job(
@@ -113,41 +539,152 @@ class PredictionService:
     ) -> PredictionJob:
         """
         Воркер: валидирует вход, при отсутствии валидных строк помечает ошибкой,
-        иначе делает инференс, списывает и помечает job OK/ERROR.
+        иначе делает инференс, списывает (закрывает холд) и помечает job OK/ERROR.
+        Повторная доставка уже обработанной джобы ничего не списывает.
         """
-        res = self._validator.validate(raw_rows)
-
-        # Жёсткое требование: time+price обязательны
-        if not res.valid_rows:
-            self._pred_repo.mark_error(
-                job_id,
-                "no_valid_rows: dataset must contain a time (date/datetime) and a numeric price"
-            )
+        status = self._pred_repo.claim(job_id)
+        if status is None:
+            raise PredictionService.JobUnavailable(job_id)
+        if status != JobStatus.PENDING:
             return self._pred_repo.get(job_id)
 
-        session = self._acc_repo.session
-        with session.begin_nested():
-            try:
-                preds = self._run_model(model_name, res.valid_rows)
-                if len(preds) != len(res.valid_rows):
-                    raise PredictionService.ModelError("Model returned wrong number of predictions")
-
-                self._charge_and_save_ok(
-                    account_id=account_id,
-                    job_id=job_id,
-                    model_name=model_name,
-                    valid_rows=res.valid_rows,
-                    invalid_rows=res.invalid_rows,
-                    predictions=preds,
-                )
-            except PredictionService.NotEnoughCredits:
-                raise
-            except PredictionService.ModelError as err:
-                self._pred_repo.mark_error(job_id, str(err))
-
+        self._run_and_settle(JobRequest(job_id, account_id, model_name, raw_rows))
         return self._pred_repo.get(job_id)
 
     process_job = process_existing_job
 
-    def history(self, user_id: int) -> list[PredictionJob]:
-        return self._pred_repo.list_by_user(user_id)
\ No newline at end of file
+    def apply(self, outcome: JobOutcome) -> PredictionJob:
+        """
+        Записать результат, посчитанный вне транзакции (compute в другом процессе):
+        claim джобы, затем settle. Уже обработанная джоба не меняется.
+        """
+        status = self._pred_repo.claim(outcome.job_id)
+        if status is None:
+            raise PredictionService.JobUnavailable(outcome.job_id)
+        if status == JobStatus.PENDING:
+            self.settle(outcome)
+        return self._pred_repo.get(outcome.job_id)
+
+    def compute_many(self, requests: List[JobRequest]) -> List[JobOutcome]:
+        """Инференс группами (счёт, модель) — compute_group; повторы одной джобы считаются один раз."""
+        unique: Dict[int, JobRequest] = {}
+        for r in requests:
+            unique.setdefault(r.job_id, r)
+        key = lambda r: (r.account_id, r.model_name)
+        outcomes: List[JobOutcome] = []
+        for _, group in groupby(sorted(unique.values(), key=key), key=key):
+            outcomes.extend(self.compute_group(list(group)))
+        return outcomes
+
+    def process_batch(self, requests: List[JobRequest]) -> Dict[int, Optional[JobStatus]]:
+        """
+        Воркер, пакетный режим: claim всех джоб одним запросом, инференс группами
+        (счёт, модель), запись результатов — settle_many в одной транзакции.
+        Возвращает {job_id: итоговый статус}; None — джобу держит другой воркер.
+        """
+        statuses = self._pred_repo.claim_many([r.job_id for r in requests])
+        pending = [r for r in requests if statuses.get(r.job_id) == JobStatus.PENDING]
+        return self._settle_claimed(statuses, self.compute_many(pending), [r.job_id for r in requests])
+
+    def apply_batch(self, outcomes: List[JobOutcome]) -> Dict[int, Optional[JobStatus]]:
+        """Пакетный apply: claim всех джоб одним запросом, settle_many для PENDING."""
+        job_ids = [o.job_id for o in outcomes]
+        statuses = self._pred_repo.claim_many(job_ids)
+        pending: Dict[int, JobOutcome] = {}
+        for o in outcomes:
+            if statuses.get(o.job_id) == JobStatus.PENDING:
+                pending.setdefault(o.job_id, o)  # повторная доставка в той же пачке
+        return self._settle_claimed(statuses, list(pending.values()), job_ids)
+
+    def _settle_claimed(
+        self,
+        statuses: Dict[int, JobStatus],
+        outcomes: List[JobOutcome],
+        job_ids: List[int],
+    ) -> Dict[int, Optional[JobStatus]]:
+        self.settle_many(outcomes)
+        for o in outcomes:
+            statuses[o.job_id] = JobStatus.OK if o.ok else JobStatus.ERROR
+        return {job_id: statuses.get(job_id) for job_id in job_ids}
+
+    def history(
+        self,
+        user_id: int,
+        *,
+        limit: int = 50,
+        before_id: int | None = None,
+        status: JobStatus | None = None,
+        model_name: str | None = None,
+    ) -> list[PredictionSummary]:
+        return self._pred_repo.list_summaries(
+            user_id, limit=limit, before_id=before_id, status=status, model_name=model_name,
+        )
+
+
+class AsyncPredictionService:
+    """
+    Часть PredictionService, нужная API (постановка джобы, история), поверх
+    async-репозиториев. Вычисление и запись результатов — в воркере (sync).
+    """
+
+    NotEnoughCredits = PredictionService.NotEnoughCredits
+
+    def __init__(self, acc_repo: AsyncAccountRepo, pred_repo: AsyncPredictionRepo):
+        self._acc_repo  = acc_repo
+        self._pred_repo = pred_repo
+
+    async def create_reserved_job(
+        self,
+        *,
+        owner_id: int,
+        account_id: int,
+        model_name: str,
+        est_cost: int,
+    ) -> PredictionJob:
+        """PENDING-джоба + холд на оценочную стоимость (атомарно проверяет доступный баланс)."""
+        pending = await self._pred_repo.create_pending(owner_id=owner_id, model_name=model_name)
+        if est_cost > 0:
+            try:
+                await self._acc_repo.reserve(account_id, pending.id, est_cost)
+            except InsufficientFunds:
+                raise PredictionService.NotEnoughCredits
+        return pending
+
+    async def available_balance(self, account_id: int) -> int:
+        """balance - reserved одним чтением строки счёта (без журнала)."""
+        return (await self._acc_repo.load(account_id)).available
+
+    async def abandon_job(self, job_id: int, error: str) -> None:
+        """Джоба не попала в очередь: пометить ошибкой и снять холд."""
+        await self._pred_repo.mark_error(job_id, error)
+        await self._acc_repo.release_hold(job_id)
+
+    async def get_job(self, job_id: int) -> Optional[PredictionJob]:
+        return await self._pred_repo.get(job_id)
+
+    async def get_summary(self, job_id: int) -> Optional[PredictionSummary]:
+        found = await self._pred_repo.summaries([job_id])
+        return found[0] if found else None
+
+    async def get_job_slice(
+        self,
+        job_id: int,
+        *,
+        offset: int = 0,
+        limit: int | None = None,
+        fields: tuple[str, ...] = JOB_FIELDS,
+    ) -> Optional[PredictionSlice]:
+        return await self._pred_repo.get_slice(job_id, offset=offset, limit=limit, fields=fields)
+
+    async def history(
+        self,
+        user_id: int,
+        *,
+        limit: int = 50,
+        before_id: int | None = None,
+        status: JobStatus | None = None,
+        model_name: str | None = None,
+    ) -> list[PredictionSummary]:
+        return await self._pred_repo.list_summaries(
+            user_id, limit=limit, before_id=before_id, status=status, model_name=model_name,
+        )
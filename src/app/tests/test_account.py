@@ -48,4 +48,38 @@ def test_top_up_negative_amount_rejected(api: httpx.Client, random_email, regist
     response = api.post("/account/top-up",
                         headers=auth_headers(token),
                         json={"amount": -1, "reason": "tests"})
-    assert response.status_code in (400, 422)
\ No newline at end of file
+    assert response.status_code in (400, 422)
+
+def test_transactions_are_paginated_newest_first(api: httpx.Client, random_email, register_or_login, auth_headers):
+    email = random_email("txpage")
+    token = register_or_login(api, email)
+
+    for amount in (1, 2, 3):
+        api.post("/account/top-up", headers=auth_headers(token), json={"amount": amount, "reason": "tests"})
+
+    first = api.get("/account/transactions", headers=auth_headers(token), params={"limit": 2}).json()
+    assert [t["amount"] for t in first] == [3, 2]
+
+    rest = api.get("/account/transactions", headers=auth_headers(token),
+                   params={"limit": 2, "before_id": first[-1]["id"]}).json()
+    assert [t["amount"] for t in rest] == [1]
+
+
+def test_concurrent_top_ups_are_not_lost(api: httpx.Client, random_email, register_or_login, auth_headers):
+    from concurrent.futures import ThreadPoolExecutor
+
+    email = random_email("race")
+    token = register_or_login(api, email)
+    start = api.get("/account/balance", headers=auth_headers(token)).json()["balance"]
+
+    def _top_up(_):
+        with httpx.Client(base_url=api.base_url, timeout=10.0) as cli:
+            return cli.post("/account/top-up", headers=auth_headers(token),
+                            json={"amount": 1, "reason": "race"}).status_code
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        codes = list(pool.map(_top_up, range(20)))
+    assert codes == [201] * 20
+
+    final = api.get("/account/balance", headers=auth_headers(token)).json()["balance"]
+    assert final == start + 20
@@ -0,0 +1,24 @@
+import pytest
+
+from src.app.infra.blobs import decode_ndjson, encode_ndjson
+from src.app.infra.ingest import IngestError
+
+
+def test_ndjson_roundtrip_with_ranges():
+    rows = [{"i": i, "price": i / 3} for i in range(100)]
+    data = b"".join(encode_ndjson(rows))
+    # пустые строки не считаются строками датасета
+    chunks = [data[i:i + 37] for i in range(0, len(data), 37)] + [b"\n\n"]
+    assert list(decode_ndjson(chunks)) == rows
+    assert list(decode_ndjson(chunks, 10, 25)) == rows[10:25]
+    assert list(decode_ndjson(chunks, 90)) == rows[90:]
+
+
+@pytest.mark.parametrize("payload, line", [
+    (b'[1\n2]\n3,4\n', 1),
+    (b'{"a":1}\n{"a":1},{"b":2}\n{"c":3}\n', 2),
+    (b'{"a":1}\n\n{"b":\n', 3),
+])
+def test_ndjson_rejects_line_that_is_not_one_value(payload, line):
+    with pytest.raises(IngestError, match=f"NDJSON line {line}:"):
+        list(decode_ndjson([payload]))
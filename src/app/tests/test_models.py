@@ -1,7 +1,45 @@
 import httpx
+import numpy as np
+import pytest
+
+from src.app.infra.ml.demo_ar import DemoAR
 
 
 def test_list_models_returns_array(api: httpx.Client):
     response = api.get("/models/")
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
\ No newline at end of file
+    assert isinstance(response.json(), list)
+
+
+def _ar_series(a: float, b: float, n: int, y0: float = 10.0) -> np.ndarray:
+    y = [y0]
+    for _ in range(n - 1):
+        y.append(a + b * y[-1])
+    return np.array(y)
+
+
+def _ar_loop(y: np.ndarray, horizon: int) -> list[float]:
+    """Эталон: МНК AR(1) по парам соседних точек и прямой цикл nxt = a + b * prev."""
+    b, a = np.polyfit(y[:-1], y[1:], 1)
+    out, prev = [], float(y[-1])
+    for _ in range(horizon):
+        prev = a + b * prev
+        out.append(prev)
+    return out
+
+
+@pytest.mark.parametrize("b", [-1.2, -0.7, 0.999999, 1.0, 1.000001, 1.05])
+@pytest.mark.parametrize("horizon", [3, 7, 60])
+def test_demo_ar_closed_form_matches_loop(b, horizon):
+    # b <= 0 — ветка степеней, b ≈ 1 и b > 1 — expm1/log1p
+    y = _ar_series(0.5, b, horizon)
+    rows = [{"timestamp": f"2025-01-01T00:{i // 60:02d}:{i % 60:02d}", "price": float(p)} for i, p in enumerate(y)]
+    model = DemoAR()
+    assert model.predict(rows) == pytest.approx(_ar_loop(y, horizon), rel=1e-6)
+
+    batch = np.vstack([y, _ar_series(-2.0, b, horizon, y0=3.0)])
+    for h in (1, horizon, 2 * horizon):
+        got = model.predict_many(batch, h)
+        assert got.shape == (2, h)
+        for row, series in zip(got, batch):
+            assert row.tolist() == pytest.approx(_ar_loop(series, h), rel=1e-6)
@@ -1,3 +1,7 @@
+import json
+
+import pytest
+
 import httpx
 
 
@@ -35,4 +39,347 @@ def test_prediction_completes_ok_and_cost_matches_valid_count(
     valid_rows = job.get("valid_input")
     assert isinstance(predictions, list)
     assert len(predictions) == len(valid_rows)
-    assert job.get("cost") >= 0
\ No newline at end of file
+    assert job.get("cost") >= 0
+
+def test_submit_reserves_estimated_cost(api: httpx.Client, random_email, register_or_login, auth_headers):
+    email = random_email("hold")
+    token = register_or_login(api, email)
+
+    rows = [{"date": "2025-05-01", "value": 1}, {"date": "2025-05-02", "value": 2}]
+    top_up = api.post("/account/top-up", headers=auth_headers(token), json={"amount": 1, "reason": "tests"})
+    assert top_up.status_code == 201
+
+    # оценка (2 строки) больше доступного баланса -> 402, ничего не зарезервировано
+    response = api.post("/predict/", headers=auth_headers(token),
+                        json={"model_name": "Demo", "data": rows})
+    assert response.status_code == 402
+    balance = api.get("/account/balance", headers=auth_headers(token)).json()
+    assert balance["reserved"] == 0
+
+
+def test_large_payload_goes_through_claim_check(
+    api: httpx.Client, random_email, register_or_login, auth_headers, poll_job
+):
+    email = random_email("bigpayload")
+    token = register_or_login(api, email)
+
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 100_000, "reason": "tests"})
+
+    # ~400 КБ JSON — больше порога CLAIM_CHECK_MIN_BYTES по умолчанию
+    rows = [{"date": f"2025-05-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+             "value": i, "note": "x" * 20} for i in range(6000)]
+    submit = api.post("/predict/", headers=auth_headers(token),
+                      json={"model_name": "Demo", "data": rows})
+    assert submit.status_code == 202
+
+    job = poll_job(api, token, submit.json()["id"])
+    assert job["status"] == "OK"
+    assert len(job["valid_input"]) == len(rows)
+
+
+def test_bulk_ndjson_upload(api: httpx.Client, random_email, register_or_login, auth_headers, poll_job):
+    email = random_email("bulk")
+    token = register_or_login(api, email)
+
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 100_000, "reason": "tests"})
+
+    rows = [{"date": f"2025-05-01T{i // 60 % 24:02d}:{i % 60:02d}:00", "value": i} for i in range(1000)]
+    body = "".join(json.dumps(r) + "\n" for r in rows).encode()
+    # тело отдаётся кусками — как при потоковой загрузке из Web UI
+    chunks = (body[i:i + 4096] for i in range(0, len(body), 4096))
+    submit = api.post("/predict/bulk", params={"model_name": "Demo"},
+                      headers={**auth_headers(token), "Content-Type": "application/x-ndjson"}, content=chunks)
+    assert submit.status_code == 202
+
+    job = poll_job(api, token, submit.json()["id"])
+    assert job["status"] == "OK"
+    assert len(job["valid_input"]) == len(rows)
+
+    empty = api.post("/predict/bulk", params={"model_name": "Demo"}, headers=auth_headers(token), content=b"\n")
+    assert empty.status_code == 422
+
+
+def test_bulk_csv_upload_is_validated_by_columns(
+    api: httpx.Client, random_email, register_or_login, auth_headers, poll_job
+):
+    email = random_email("bulkcsv")
+    token = register_or_login(api, email)
+
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 1000, "reason": "tests"})
+
+    body = "date,value\n" + "".join(f"2025-05-{d:02d},{d * 1.5}\n" for d in range(1, 21)) + "2025-05-21,n/a\n"
+    submit = api.post("/predict/bulk", params={"model_name": "Demo"},
+                      headers={**auth_headers(token), "Content-Type": "text/csv"}, content=body.encode())
+    assert submit.status_code == 202
+
+    job = poll_job(api, token, submit.json()["id"])
+    assert job["status"] == "OK"
+    assert len(job["valid_input"]) == 20
+    assert len(job["invalid_rows"]) == 1
+
+    other = api.post("/predict/bulk", params={"model_name": "Demo"},
+                     headers={**auth_headers(token), "Content-Type": "application/xml"}, content=b"<rows/>")
+    assert other.status_code == 415
+
+
+def test_resubmitted_dataset_gives_same_predictions(
+    api: httpx.Client, random_email, register_or_login, auth_headers, poll_job
+):
+    email = random_email("resubmit")
+    token = register_or_login(api, email)
+
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 1000, "reason": "tests"})
+
+    rows = [{"date": f"2025-05-{d:02d}", "value": d * 1.5} for d in range(1, 21)]
+    jobs = []
+    # тот же датасет в другом виде (порядок строк, имена колонок) — тот же ключ кэша
+    for data in (rows, [{"ts": r["date"], "price": str(r["value"])} for r in reversed(rows)]):
+        submit = api.post("/predict/", headers=auth_headers(token),
+                          json={"model_name": "Demo", "data": data})
+        jobs.append(poll_job(api, token, submit.json()["id"]))
+
+    assert [j["status"] for j in jobs] == ["OK", "OK"]
+    assert jobs[0]["predictions"] == jobs[1]["predictions"]
+    assert jobs[0]["valid_input"] == jobs[1]["valid_input"]
+
+
+def test_history_keyset_pages_and_filters(api: httpx.Client, random_email, register_or_login, auth_headers):
+    email = random_email("phpages")
+    token = register_or_login(api, email)
+
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 1000, "reason": "tests"})
+
+    rows = [{"date": "2025-05-01", "value": 1}, {"date": "2025-05-02", "value": 2}]
+    ids = [
+        api.post("/predict/", headers=auth_headers(token), json={"model_name": model, "data": rows}).json()["id"]
+        for model in ("Demo", "Demo", "LinearTrend")
+    ]
+
+    first = api.get("/predict/history", headers=auth_headers(token), params={"limit": 2}).json()
+    second = api.get("/predict/history", headers=auth_headers(token),
+                     params={"limit": 2, "before_id": first[-1]["id"]}).json()
+    assert [j["id"] for j in first + second] == sorted(ids, reverse=True)
+    assert "predictions" not in first[0]
+
+    demo = api.get("/predict/history", headers=auth_headers(token), params={"model": "Demo"}).json()
+    assert sorted(j["id"] for j in demo) == ids[:2]
+
+
+def test_job_data_keeps_shape_in_compact_storage(
+    api: httpx.Client, random_email, register_or_login, auth_headers, poll_job
+):
+    email = random_email("storage")
+    token = register_or_login(api, email)
+
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 1000, "reason": "tests"})
+
+    data = [
+        {"date": "2025-05-02T10:00:00+03:00", "value": "2,5"},
+        {"date": "2025-05-01", "value": 1},
+        {"date": "2025-05-03T00:00:00.250000Z", "value": 3},
+        {"date": "nope", "value": 4},
+    ]
+    submit = api.post("/predict/", headers=auth_headers(token), json={"model_name": "Demo", "data": data})
+    job = poll_job(api, token, submit.json()["id"])
+    assert job["status"] == "OK"
+
+    assert job["valid_input"] == [
+        {"timestamp": "2025-05-01T00:00:00", "price": 1.0},
+        {"timestamp": "2025-05-02T10:00:00+03:00", "price": 2.5},
+        {"timestamp": "2025-05-03T00:00:00.250000+00:00", "price": 3.0},
+    ]
+    assert all(isinstance(p, float) for p in job["predictions"])
+    assert job["invalid_rows"] == [[3, {"_error": "bad_time", "date": "nope", "value": 4}]]
+
+
+def test_job_slice_returns_requested_fields_and_counts(
+    api: httpx.Client, random_email, register_or_login, auth_headers, poll_job
+):
+    email = random_email("slice")
+    token = register_or_login(api, email)
+
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 1000, "reason": "tests"})
+
+    data = [{"date": f"2025-05-{d:02d}", "value": d} for d in range(1, 11)] + [{"date": "nope", "value": 0}]
+    submit = api.post("/predict/", headers=auth_headers(token), json={"model_name": "Demo", "data": data})
+    full = poll_job(api, token, submit.json()["id"])
+    assert full["status"] == "OK"
+
+    r = api.get(f"/predict/{full['id']}", headers=auth_headers(token),
+                params={"offset": 3, "limit": 4, "fields": "predictions"})
+    assert r.status_code == 200, r.text
+    part = r.json()
+    assert part["n_valid"] == 10 and part["n_invalid"] == 1
+    assert part["predictions"] == full["predictions"][3:7]
+    assert part["valid_input"] is None and part["invalid_rows"] is None
+
+    r = api.get(f"/predict/{full['id']}", headers=auth_headers(token), params={"fields": "valid_input,invalid_rows"})
+    assert r.json()["valid_input"] == full["valid_input"]
+    assert r.json()["invalid_rows"] == full["invalid_rows"]
+
+    r = api.get(f"/predict/{full['id']}", headers=auth_headers(token), params={"fields": "secret"})
+    assert r.status_code == 422
+
+
+def test_job_events_stream_reports_completion(
+    api: httpx.Client, random_email, register_or_login, auth_headers
+):
+    email = random_email("events")
+    token = register_or_login(api, email)
+
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 1000, "reason": "tests"})
+
+    data = [{"date": "2025-05-01", "value": 1}, {"date": "2025-05-02", "value": 2}]
+    job_id = api.post("/predict/", headers=auth_headers(token), json={"model_name": "Demo", "data": data}).json()["id"]
+
+    # поток одной джобы отдаёт событие о завершении (сразу, если уже готова) и закрывается
+    event = None
+    with api.stream("GET", f"/predict/{job_id}/events", headers=auth_headers(token),
+                    timeout=httpx.Timeout(10.0, read=60.0)) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        name = None
+        for line in r.iter_lines():
+            if line.startswith("event:"):
+                name = line.split(":", 1)[1].strip()
+            elif line.startswith("data:") and name == "job":
+                event = json.loads(line.split(":", 1)[1])
+                break
+    assert event is not None
+    assert event["job_id"] == job_id and event["status"] == "OK"
+
+    assert api.get(f"/predict/{job_id}/events").status_code == 401
+
+
+@pytest.mark.parametrize("model_name", ["Demo", "LinearTrend"])
+def test_series_append_matches_full_refit(
+    api: httpx.Client, random_email, register_or_login, auth_headers, poll_job, model_name
+):
+    email = random_email("series")
+    token = register_or_login(api, email)
+
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 5000, "reason": "tests"})
+
+    rows = [{"date": f"2025-05-{d:02d}", "value": 100 + d + (d * 7 % 5) * 0.3} for d in range(1, 31)]
+
+    def run(data, series_id=None):
+        body = {"model_name": model_name, "data": data}
+        if series_id is not None:
+            body["series_id"] = series_id
+        submit = api.post("/predict/", headers=auth_headers(token), json=body)
+        assert submit.status_code == 202, submit.text
+        job = poll_job(api, token, submit.json()["id"])
+        assert job["status"] == "OK"
+        return job["predictions"]
+
+    # первая джоба ряда обучает состояние, вторая (история + новые точки) — продолжает его
+    run(rows[:25], series_id="btc-usd")
+    incremental = run(rows, series_id="btc-usd")
+    assert incremental == pytest.approx(run(rows), rel=1e-9)
+
+    # история не продолжает ряд (другое начало) — состояние строится заново
+    assert run(rows[1:], series_id="btc-usd") == pytest.approx(run(rows[1:]), rel=1e-9)
+
+    # исправлена учтённая точка в середине (первая и последняя те же) — тоже с нуля, а не старые суммы
+    run(rows[:25], series_id="eth-usd")
+    edited = [dict(r) for r in rows]
+    edited[10]["value"] += 50
+    assert run(edited, series_id="eth-usd") == pytest.approx(run(edited), rel=1e-9)
+
+
+def test_batch_forecasts_series_in_one_job(
+    api: httpx.Client, random_email, register_or_login, auth_headers, poll_job
+):
+    email = random_email("batch")
+    token = register_or_login(api, email)
+
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 5000, "reason": "tests"})
+
+    def rows(k):
+        return [{"date": f"2025-05-{d:02d}", "value": 100 + k * d + (d * 7 % 5) * 0.3} for d in range(1, 21)]
+
+    series = [
+        {"name": "AAA", "data": rows(1), "horizon": 3},
+        {"name": "BBB", "data": rows(2), "horizon": 3},
+        {"name": "CCC", "data": rows(3)},
+        {"name": "BAD", "data": [{"date": "nope", "value": 1}]},
+    ]
+    submit = api.post("/predict/batch", headers=auth_headers(token), json={"model_name": "Demo", "series": series})
+    assert submit.status_code == 202, submit.text
+    job = poll_job(api, token, submit.json()["id"])
+    assert job["status"] == "OK"
+
+    result = job["series"]
+    assert set(result) == {"AAA", "BBB", "CCC", "BAD"}
+    assert [len(result[n]["predictions"]) for n in ("AAA", "BBB", "CCC")] == [3, 3, 20]
+    assert result["BAD"]["error"] == "no_valid_rows" and result["BAD"]["n_invalid"] == 1
+
+    # тот же ряд отдельной джобой: горизонт по умолчанию — его длина, прогноз тот же
+    single = api.post("/predict/", headers=auth_headers(token), json={"model_name": "Demo", "data": rows(3)})
+    assert poll_job(api, token, single.json()["id"])["predictions"] == pytest.approx(result["CCC"]["predictions"])
+
+    # одно списание на всю пакетную джобу: пополнение, пакет, одиночная джоба
+    txs = api.get("/account/transactions", headers=auth_headers(token)).json()
+    assert len(txs) == 3
+    assert txs[1]["amount"] == -job["cost"]
+
+    dup = api.post("/predict/batch", headers=auth_headers(token),
+                   json={"model_name": "Demo", "series": [series[0], series[0]]})
+    assert dup.status_code == 422
+
+
+def test_batch_long_horizon_is_charged_per_step(
+    api: httpx.Client, random_email, register_or_login, auth_headers, poll_job
+):
+    email = random_email("horizon")
+    token = register_or_login(api, email)
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 100000, "reason": "tests"})
+
+    # 2 точки истории, 1000 шагов прогноза: оплачиваются шаги, а не 2 строки
+    short = [{"date": "2025-05-01", "value": 1}, {"date": "2025-05-02", "value": 2}]
+    submit = api.post("/predict/batch", headers=auth_headers(token),
+                      json={"model_name": "Demo", "series": [{"name": "S", "data": short, "horizon": 1000}]})
+    assert submit.status_code == 202, submit.text
+    job = poll_job(api, token, submit.json()["id"])
+    assert job["status"] == "OK"
+    assert len(job["series"]["S"]["predictions"]) == 1000
+
+    est = api.get("/predict/estimate", headers=auth_headers(token), params={"model_name": "Demo", "rows": 1000}).json()
+    assert job["cost"] == est["cost"]
+
+
+def test_estimate_prices_by_model_and_rejects_before_db(api: httpx.Client, random_email, register_or_login, auth_headers):
+    email = random_email("estimate")
+    token = register_or_login(api, email)
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 10, "reason": "tests"})
+
+    demo = api.get("/predict/estimate", headers=auth_headers(token), params={"model_name": "Demo", "rows": 4}).json()
+    trend = api.get("/predict/estimate", headers=auth_headers(token),
+                    params={"model_name": "LinearTrend", "rows": 4}).json()
+    assert trend["price_per_row"] == 2 * demo["price_per_row"]
+    assert trend["cost"] == 4 * trend["price_per_row"]
+    assert demo["available"] == 10
+
+    unknown = api.get("/predict/estimate", headers=auth_headers(token), params={"model_name": "Nope", "rows": 1})
+    assert unknown.status_code == 422
+
+    # оценка больше доступного баланса: 402 без джобы в истории
+    rows = [{"date": f"2025-05-{d:02d}", "value": d} for d in range(1, 7)]
+    response = api.post("/predict/", headers=auth_headers(token), json={"model_name": "LinearTrend", "data": rows})
+    assert response.status_code == 402
+    assert api.get("/predict/history", headers=auth_headers(token)).json() == []
+
+
+def test_top_up_after_402_admits_next_job(api: httpx.Client, random_email, register_or_login, auth_headers):
+    email = random_email("topup402")
+    token = register_or_login(api, email)
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 1, "reason": "tests"})
+
+    rows = [{"date": f"2025-05-{d:02d}", "value": d} for d in range(1, 7)]
+    response = api.post("/predict/", headers=auth_headers(token), json={"model_name": "Demo", "data": rows})
+    assert response.status_code == 402
+
+    # пополнение сбрасывает снимок баланса допуска: следующий запрос принят сразу
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 1000, "reason": "tests"})
+    response = api.post("/predict/", headers=auth_headers(token), json={"model_name": "Demo", "data": rows})
+    assert response.status_code == 202, response.text
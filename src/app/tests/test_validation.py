@@ -59,4 +59,31 @@ def test_invalid_payload_type_rejected(api: httpx.Client, random_email, register
 
     response = api.post("/predict/", headers=auth_headers(token),
                         json={"model_name": "Demo", "data": "oops"})
-    assert response.status_code in (400, 422)
\ No newline at end of file
+    assert response.status_code in (400, 422)
+
+def test_large_batch_validated_and_sorted(
+    api: httpx.Client, random_email, register_or_login, auth_headers, poll_job
+):
+    email = random_email("bigbatch")
+    token = register_or_login(api, email)
+
+    api.post("/account/top-up", headers=auth_headers(token), json={"amount": 100_000, "reason": "tests"})
+
+    # батч крупнее порога колоночного движка, строки в обратном порядке
+    data = [{"date": f"2025-05-01T00:{i // 60:02d}:{i % 60:02d}", "value": f"{i},5"} for i in range(1500)][::-1]
+    data[10] = {"date": "error", "value": 1}
+    data[20] = {"date": "2025-05-01", "value": "n/a"}
+    data[30] = "not a row"
+    submit = api.post("/predict/", headers=auth_headers(token),
+                      json={"model_name": "Demo", "data": data})
+    job = poll_job(api, token, submit.json()["id"])
+    assert job["status"] == "OK"
+
+    errors = {idx: row["_error"] for idx, row in job["invalid_rows"]}
+    assert errors == {10: "bad_time", 20: "bad_price", 30: "not_a_dict"}
+
+    valid_rows = job["valid_input"]
+    assert len(valid_rows) == 1497
+    stamps = [r["timestamp"] for r in valid_rows]
+    assert stamps == sorted(stamps)
+    assert valid_rows[0]["price"] == 0.5
@@ -0,0 +1,71 @@
+import os
+from typing import Optional
+
+import httpx
+
+API_BASE = os.getenv("API_BASE")
+# inprocess — вызовы API без сети, прямо в ASGI-приложение; http — по API_BASE через пул соединений
+WEB_API_MODE = os.getenv("WEB_API_MODE", "inprocess")
+WEB_API_TIMEOUT = float(os.getenv("WEB_API_TIMEOUT", "30"))
+WEB_API_CONNECT_TIMEOUT = float(os.getenv("WEB_API_CONNECT_TIMEOUT", "5"))
+WEB_API_MAX_CONNECTIONS = int(os.getenv("WEB_API_MAX_CONNECTIONS", "100"))
+WEB_API_MAX_KEEPALIVE = int(os.getenv("WEB_API_MAX_KEEPALIVE", "20"))
+# HTTP/2 для режима http (нужен пакет h2)
+WEB_API_HTTP2 = os.getenv("WEB_API_HTTP2", "0") == "1"
+
+# префикс, под которым main.py подключает API-роутеры
+_INPROCESS_BASE = "http://app/api"
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(WEB_API_TIMEOUT, connect=WEB_API_CONNECT_TIMEOUT)
+
+
+def _http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=API_BASE,
+        timeout=_timeout(),
+        limits=httpx.Limits(
+            max_connections=WEB_API_MAX_CONNECTIONS,
+            max_keepalive_connections=WEB_API_MAX_KEEPALIVE,
+        ),
+        http2=WEB_API_HTTP2,
+    )
+
+
+def _inprocess_client(app) -> httpx.AsyncClient:
+    # ошибки API — ответ 500, как по сети, а не исключение в обработчике страницы
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url=_INPROCESS_BASE, timeout=_timeout())
+
+
+async def start(app=None, mode: str | None = None) -> httpx.AsyncClient:
+    """Создать общий клиент Web UI -> API (на старте приложения)."""
+    global _client
+    await stop()
+    mode = mode or WEB_API_MODE
+    # inprocess без приложения (скрипты, тесты) — обычный HTTP-клиент
+    if mode == "inprocess" and app is not None:
+        _client = _inprocess_client(app)
+    elif mode in ("inprocess", "http"):
+        _client = _http_client()
+    else:
+        raise ValueError(f"Unknown WEB_API_MODE: {mode}")
+    return _client
+
+
+async def stop() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def client() -> httpx.AsyncClient:
+    """Общий клиент; если приложение не запускало start() — HTTP-клиент по API_BASE."""
+    global _client
+    if _client is None:
+        _client = _http_client()
+    return _client
@@ -1,4 +1,4 @@
-import os, json, io
+import os
 from typing import Optional, Any, List, Dict
 from urllib.parse import urlencode, quote
 
@@ -6,9 +6,12 @@ import httpx
 from fastapi import APIRouter, Request, Depends, Form, UploadFile, File, status, HTTPException, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import iterate_in_threadpool
 from datetime import datetime, UTC
 
-API_BASE = os.getenv("API_BASE")
+from src.app.infra import blobs, ingest
+from src.app.web import api_client
+
 templates = Jinja2Templates(directory="src/app/web/templates")
 templates.env.globals["now"] = lambda: datetime.now(UTC)
 router = APIRouter(tags=["Web UI"])
@@ -36,8 +39,7 @@ async def _api(method: str, path: str, token: Optional[str] = None, **kwargs) ->
     if token:
         headers["Authorization"] = f"Bearer {token}"
 
-    async with httpx.AsyncClient(base_url=API_BASE) as cli:
-        return await cli.request(method, path, headers=headers, **kwargs)
+    return await api_client.client().request(method, path, headers=headers, **kwargs)
 
 def _alert_partial(request: Request, message: str, tone: str = "error", status_code: int = 400) -> HTMLResponse:
     return templates.TemplateResponse(
@@ -67,69 +69,6 @@ def _redirect(request: Request, url: str):
         return resp
     return RedirectResponse(url, status_code=302)
 
-def _ext(name: str) -> str:
-    return (name or "").lower().rsplit(".", 1)[-1] if "." in (name or "") else ""
-
-def _parse_json_bytes(b: bytes) -> List[Dict[str, Any]]:
-    text = b.decode("utf-8").strip()
-    data: Any = None
-
-    try:
-        data = json.loads(text)
-    except json.JSONDecodeError as je:
-        raise HTTPException(
-            400,
-            f"Invalid file: not a valid JSON. Fix quotes/format"
-        ) from je
-
-    if isinstance(data, dict):
-        if data and all(isinstance(v, list) for v in data.values()):
-            keys = list(data.keys())
-            length = max(len(v) for v in data.values()) if data else 0
-            rows: List[Dict[str, Any]] = []
-            for i in range(length):
-                rows.append({k: (data[k][i] if i < len(data[k]) else None) for k in keys})
-            return rows
-        return [data]
-
-    if isinstance(data, list):
-        if not all(isinstance(x, dict) for x in data):
-            raise HTTPException(400, "Invalid file: unsupported JSON structure")
-        return data
-
-    raise HTTPException(400, "Invalid file: unsupported JSON structure")
-
-
-async def _parse_upload(file: UploadFile) -> List[Dict[str, Any]]:
-    """
-    Лёгкий парсер на стороне Web-UI.
-    """
-    content = await file.read()
-    ext = _ext(file.filename)
-    ctype = (file.content_type or "").lower()
-
-    # CSV
-    if ext == "csv" or "csv" in ctype:
-        text = content.decode("utf-8", errors="replace")
-        import csv
-        reader = csv.DictReader(io.StringIO(text))
-        return list(reader)
-
-    # JSON
-    if ext == "json" or "json" in ctype:
-        return _parse_json_bytes(content)
-
-    # Parquet
-    if ext in ("parquet", "pq") or "parquet" in ctype:
-        try:
-            import pandas as pd
-        except Exception:
-            raise HTTPException(400, "Parquet parsing requires pandas+pyarrow installed")
-        df = pd.read_parquet(io.BytesIO(content))
-        return df.to_dict(orient="records")
-
-    raise HTTPException(400, f"Unsupported file type: {file.filename or ctype}")
-
 async def _load_models(request: Request, token: str) -> List[str]:
     r = await _api("GET", "/models/", token)
     if r.status_code // 100 == 4:
@@ -245,14 +184,25 @@ async def topup(request: Request, amount: int = Form(...), token: str = Depends(
     return RedirectResponse("/balance", 302)
 
 
+TX_PAGE_SIZE = 50
+
 @router.get("/tx", response_class=HTMLResponse)
-async def tx_history(request: Request, token: str = Depends(_guard)):
-    r = await _api("GET", "/account/transactions", token)
+async def tx_history(
+    request: Request,
+    before_id: int | None = Query(None),
+    token: str = Depends(_guard),
+):
+    params: Dict[str, Any] = {"limit": TX_PAGE_SIZE}
+    if before_id:
+        params["before_id"] = before_id
+    r = await _api("GET", "/account/transactions", token, params=params)
     if r.status_code // 100 == 4:
         return _redirect_to_login(request)
     r.raise_for_status()
+    txs = r.json()
+    older = txs[-1].get("id") if len(txs) == TX_PAGE_SIZE else None
     return templates.TemplateResponse("account/history.html",
-                                      {"request": request, "txs": r.json()})
+                                      {"request": request, "txs": txs, "older": older})
 
 
 @router.get("/predict", response_class=HTMLResponse)
@@ -267,30 +217,45 @@ async def predict_submit(
     file: UploadFile = File(...),
     token: str = Depends(_guard),
 ):
-    # парсим файл
-    try:
-        rows = await _parse_upload(file)
-        if isinstance(rows, dict):
-            rows = [rows]
-        if not isinstance(rows, list):
-            raise ValueError("Parsed data is not a list")
-    except HTTPException as e:
+    # файл разбирается потоково (в потоке threadpool) и уходит в API как NDJSON:
+    # ни файл, ни список строк целиком в памяти не собираются
+    async def _form_error(detail: str, status_code: int):
         if _is_htmx(request):
-            return _alert_partial(request, e.detail, tone="error", status_code=e.status_code)
+            return _alert_partial(request, detail, tone="error", status_code=status_code)
         models = await _load_models(request, token)
         return templates.TemplateResponse("predict/form.html",
-                                          {"request": request, "models": models, "error": e.detail},
-                                          status_code=e.status_code)
-    except Exception as e:
-        if _is_htmx(request):
-            return _alert_partial(request, f"File parse error: {e}", tone="error", status_code=400)
-        models = await _load_models(request, token)
-        return templates.TemplateResponse("predict/form.html",
-                                          {"request": request, "models": models, "error": str(e)},
-                                          status_code=400)
+                                          {"request": request, "models": models, "error": detail},
+                                          status_code=status_code)
+
+    fmt = ingest.detect_format(file.filename, file.content_type)
+    if fmt is None:
+        return await _form_error(f"Unsupported file type: {file.filename or file.content_type}", 400)
+
+    chunks = iterate_in_threadpool(blobs.encode_ndjson(ingest.checked(ingest.iter_rows(file.file, fmt))))
+    try:
+        first = await anext(chunks)  # ошибки формата в начале файла — до обращения к API
+    except ingest.IngestError as e:
+        return await _form_error(str(e), 400)
 
-    # отправляем в API
-    r = await _api("POST", "/predict/", token, json={"model_name": model_name, "data": rows})
+    parse_error: list[ingest.IngestError] = []
+
+    async def body():
+        yield first
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except ingest.IngestError as e:
+            parse_error.append(e)
+            raise
+
+    # ошибка разбора посреди файла обрывает загрузку; API удаляет недописанный payload
+    try:
+        r = await _api("POST", "/predict/bulk", token, params={"model_name": model_name},
+                       content=body(), headers={"Content-Type": "application/x-ndjson"})
+    except ingest.IngestError:
+        pass
+    if parse_error:
+        return await _form_error(str(parse_error[0]), 400)
 
     if r.status_code == 401 or r.status_code == 404:
         return _redirect_to_login(request)
@@ -327,9 +292,14 @@ async def predict_submit(
                                       status_code=r.status_code)
 
 
+# карточка джобы показывает первые строки прогноза и невалидных строк, счётчики — полные
+JOB_PREVIEW_ROWS = 50
+
+
 @router.get("/job/{job_id}", response_class=HTMLResponse)
 async def job_view(request: Request, job_id: int, token: str = Depends(_guard)):
-    r = await _api("GET", f"/predict/{job_id}", token)
+    r = await _api("GET", f"/predict/{job_id}", token,
+                   params={"limit": JOB_PREVIEW_ROWS, "fields": "predictions,invalid_rows"})
     if r.status_code // 100 == 4:
         return _redirect_to_login(request)
     if r.status_code == 404:
@@ -348,19 +318,29 @@ async def job_view(request: Request, job_id: int, token: str = Depends(_guard)):
     return templates.TemplateResponse("predict/show.html", ctx)
 
 
+PH_PAGE_SIZE = 50
+
+
 @router.get("/ph", response_class=HTMLResponse)
-async def pred_history_page(request: Request, token: str = Depends(_guard)):
-    r = await _api("GET", "/predict/history", token)
-    if r.status_code // 100 == 4:
-        return _redirect_to_login(request)
-    r.raise_for_status()
-    jobs = r.json()
-    return templates.TemplateResponse("predict/history.html", {"request": request, "jobs": jobs})
+async def pred_history_page(
+    request: Request,
+    before_id: int | None = Query(None),
+    token: str = Depends(_guard),
+):
+    # строки подгружает /ph/partial: он же проверяет токен (401 — на логин), отдельный запрос к API не нужен
+    return templates.TemplateResponse("predict/history.html", {"request": request, "before_id": before_id})
 
 
 @router.get("/ph/partial", response_class=HTMLResponse)
-async def pred_history_partial(request: Request, token: str = Depends(_guard)):
-    r = await _api("GET", "/predict/history", token)
+async def pred_history_partial(
+    request: Request,
+    before_id: int | None = Query(None),
+    token: str = Depends(_guard),
+):
+    params: Dict[str, Any] = {"limit": PH_PAGE_SIZE}
+    if before_id:
+        params["before_id"] = before_id
+    r = await _api("GET", "/predict/history", token, params=params)
 
     # истёкший/недействительный токен
     if r.status_code // 100 == 4:
@@ -370,6 +350,8 @@ async def pred_history_partial(request: Request, token: str = Depends(_guard)):
         return _alert_partial(request, "Failed to load history", tone="error", status_code=r.status_code)
 
     jobs = r.json()
-    resp = templates.TemplateResponse("predict/_job_rows.html", {"request": request, "jobs": jobs})
+    older = jobs[-1]["id"] if len(jobs) == PH_PAGE_SIZE else None
+    resp = templates.TemplateResponse("predict/_job_rows.html",
+                                      {"request": request, "jobs": jobs, "older": older})
     resp.headers["Cache-Control"] = "no-store"
     return resp
\ No newline at end of file
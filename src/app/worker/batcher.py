@@ -0,0 +1,73 @@
+import asyncio, logging, time
+from typing import Any, Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Batcher(Generic[T]):
+    """
+    Собирает элементы из конкурентных submit() в пачки: не больше max_size
+    и не дольше max_wait_ms с момента первого элемента. Пачка уходит в
+    асинхронный handler (пока он работает, собирается следующая пачка);
+    submit() ждёт, пока его пачка обработана.
+    """
+
+    def __init__(self, handler: Callable[[List[T]], Awaitable[Any]], *, max_size: int, max_wait_ms: int) -> None:
+        self._handler = handler
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue[Tuple[T, asyncio.Future]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, fut))
+        await fut
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def _collect(self) -> List[Tuple[T, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            task = asyncio.create_task(self._flush(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _flush(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        try:
+            await self._handler([item for item, _ in batch])
+        except Exception as exc:
+            logging.exception("batch of %d failed", len(batch))
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+        else:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_result(None)
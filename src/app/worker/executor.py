@@ -0,0 +1,240 @@
+import asyncio, logging, multiprocessing, os
+from collections import defaultdict
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+from functools import partial
+from typing import Any, Callable, Iterable, Optional, TypeVar
+
+from src.app.infra import blobs, ingest, job_payload
+from src.app.infra.ml import registry
+from src.app.infra import result_cache
+from src.app.services.model_gateway import ModelGateway
+from src.app.services.prediction_service import PredictionService, JobRequest, JobOutcome, ValidatedPart
+
+# потоки для блокирующего I/O (SQLAlchemy)
+WORKER_DB_THREADS = int(os.getenv("WORKER_DB_THREADS", "4"))
+# процессы для валидации и инференса; 0 — считать в потоках (без отдельных процессов)
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 1)))
+WORKER_MP_START = os.getenv("WORKER_MP_START", "spawn")
+# раз в сколько джоб процесс пишет в лог статистику кэшей
+WORKER_STATS_EVERY = int(os.getenv("WORKER_STATS_EVERY", "100"))
+# строк в части большой NDJSON-джобы: части валидируются и считаются в разных
+# процессах пула; джоба делится, если в ней хотя бы две части; 0 — не делить
+WORKER_CHUNK_ROWS = int(os.getenv("WORKER_CHUNK_ROWS", "250000"))
+
+R = TypeVar("R")
+
+_service: Optional[PredictionService] = None
+_computed = 0
+
+
+def _init_process(warmup: str) -> None:
+    registry.warm_up_spec(warmup)
+
+
+def _svc() -> PredictionService:
+    global _service
+    if _service is None:
+        _service = PredictionService(None, None)
+    return _service
+
+
+def _loaded(req: JobRequest) -> JobRequest | JobOutcome:
+    """Payload по ссылке читается в процессе пула — строки не гоняются через pickle; ошибка — outcome."""
+    if req.data_ref is None:
+        return req
+    try:
+        return _load_payload(req)
+    except ingest.IngestError as exc:
+        return JobOutcome(req.job_id, req.account_id, req.model_name, error=f"invalid_payload: {exc}")
+
+
+def _computed_stats(outcome: JobOutcome) -> None:
+    global _computed
+    _computed += 1
+    if outcome.cached:
+        logging.info("job %s: result cache hit", outcome.job_id)
+    if WORKER_STATS_EVERY and _computed % WORKER_STATS_EVERY == 0:
+        logging.info("pid %s: result cache %s; model cache %s",
+                     os.getpid(), result_cache.cache_stats(), registry.cache_stats())
+
+
+def compute_job(req: JobRequest) -> JobOutcome:
+    """Валидация + инференс одной джобы; выполняется в процессе пула (без БД)."""
+    req = _loaded(req)
+    if isinstance(req, JobOutcome):
+        return req
+    outcome = _svc().compute(req)
+    _computed_stats(outcome)
+    return outcome
+
+
+def compute_group(reqs: list[JobRequest]) -> list[JobOutcome]:
+    """Джобы одного счёта и модели — одной задачей пула: инференс одним вызовом модели (compute_group)."""
+    loaded = [_loaded(r) for r in reqs]
+    todo = [r for r in loaded if isinstance(r, JobRequest)]
+    outcomes = {o.job_id: o for o in _svc().compute_group(todo)} if todo else {}
+    for o in outcomes.values():
+        _computed_stats(o)
+    return [r if isinstance(r, JobOutcome) else outcomes[r.job_id] for r in loaded]
+
+
+def validate_chunk(data_ref: str, start: int, stop: Optional[int]) -> ValidatedPart:
+    """Часть большой джобы: строки NDJSON [start, stop) читаются и валидируются в процессе пула."""
+    return _svc().validate_part(list(blobs.read_rows(data_ref, start, stop)), start)
+
+
+def chunk_stats(model_name: str, offset: int, prev: Optional[float], prices) -> dict:
+    return _svc().part_stats(model_name, offset, prev, prices)
+
+
+def _load_payload(req: JobRequest) -> JobRequest:
+    if req.data_format == "series":
+        # пакетная джоба: ряд на строку NDJSON
+        return replace(req, series=list(blobs.read_rows(req.data_ref)))
+    if req.data_format == "ndjson":
+        return replace(req, raw_rows=list(blobs.read_rows(req.data_ref)))
+    # CSV / Arrow — сразу в колонки, мимо списка dict-строк
+    with blobs.open_file(req.data_ref) as f:
+        return replace(req, columns=ingest.read_columns(f, req.data_format))
+
+
+class WorkerExecutor:
+    """
+    Исполнители воркера: пул потоков для работы с БД и пул процессов для
+    CPU-bound вычислений, чтобы event loop консьюмера не блокировался.
+    """
+
+    def __init__(
+        self,
+        *,
+        db_threads: int = WORKER_DB_THREADS,
+        processes: int = WORKER_PROCESSES,
+        warmup: str = "",
+    ) -> None:
+        self._threads = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix="worker-db")
+        self._processes = processes
+        self._warmup = warmup
+        self._procs: Optional[ProcessPoolExecutor] = self._new_process_pool()
+
+    def _new_process_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._processes <= 0:
+            return None
+        return ProcessPoolExecutor(
+            max_workers=self._processes,
+            mp_context=multiprocessing.get_context(WORKER_MP_START),
+            initializer=_init_process,
+            initargs=(self._warmup,),
+        )
+
+    async def _run(self, executor: Executor, fn: Callable[..., R], *args: Any) -> R:
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(fn, *args))
+
+    async def db(self, fn: Callable[..., R], *args: Any) -> R:
+        return await self._run(self._threads, fn, *args)
+
+    def _chunked(self, req: JobRequest) -> bool:
+        """Делить ли джобу на части: большой NDJSON-payload, один ряд инкрементальной модели."""
+        if (WORKER_CHUNK_ROWS <= 0 or req.n_rows is None or req.n_rows < 2 * WORKER_CHUNK_ROWS
+                or req.data_ref is None or req.data_format != "ndjson" or req.series_id is not None
+                or job_payload.JOB_STORAGE_FORMAT != "arrow"):
+            return False
+        try:
+            return ModelGateway().supports_parts(req.model_name)
+        except ModelGateway.UnknownModel:
+            return False
+
+    async def _compute_chunked(self, executor: Executor, req: JobRequest) -> JobOutcome:
+        """
+        Джоба частями по WORKER_CHUNK_ROWS строк: каждая часть читается и валидируется
+        в своём процессе, колонки собираются здесь (по времени), статистики модели по
+        частям ряда — снова в пуле, прогноз — из слитых статистик. В этом процессе
+        живут только колонки джобы, а не её строки.
+        """
+        bounds = list(range(0, req.n_rows, WORKER_CHUNK_ROWS))
+        stops = bounds[1:] + [None]  # последняя часть — до конца payload
+        parts = await asyncio.gather(*(
+            self._run(executor, validate_chunk, req.data_ref, lo, hi) for lo, hi in zip(bounds, stops)
+        ))
+        svc = _svc()
+        cols = svc.gather_parts(parts)
+        del parts
+        if cols is None:
+            logging.info("job %s: mixed tz offsets, computing as a whole", req.job_id)
+            return await self._run(executor, compute_job, req)
+        n = len(cols)
+        stats = await asyncio.gather(*(
+            self._run(executor, chunk_stats, req.model_name, lo, float(cols.prices[lo - 1]) if lo else None,
+                      cols.prices[lo:lo + WORKER_CHUNK_ROWS])
+            for lo in range(0, n, WORKER_CHUNK_ROWS)
+        ))
+        outcome = svc.finish_parts(req, cols, stats)
+        if outcome is None:
+            return await self._run(executor, compute_job, req)
+        logging.info("job %s: %d rows in %d chunks", req.job_id, req.n_rows, len(bounds))
+        return outcome
+
+    def _restart(self, pool: Optional[ProcessPoolExecutor], exc: BaseException) -> None:
+        # процесс упал (OOM/segfault): пересоздаём пул один раз
+        if self._procs is pool:
+            logging.error("process pool is broken, restarting: %s", exc)
+            self._procs = self._new_process_pool()
+            pool.shutdown(wait=False)
+
+    async def compute(self, req: JobRequest) -> JobOutcome:
+        """Результат джобы; сбой самого исполнителя превращается в ошибку джобы."""
+        pool = self._procs
+        try:
+            if self._chunked(req):
+                return await self._compute_chunked(pool or self._threads, req)
+            return await self._run(pool or self._threads, compute_job, req)
+        except ingest.IngestError as exc:
+            # payload, прочитанный частями (_compute_chunked), не разобрался — как у compute_job
+            return JobOutcome(req.job_id, req.account_id, req.model_name, error=f"invalid_payload: {exc}")
+        except BrokenProcessPool as exc:
+            self._restart(pool, exc)
+            return self._error(req, exc)
+        except Exception as exc:
+            logging.exception("job %s: compute failed", req.job_id)
+            return self._error(req, exc)
+
+    async def _compute_group(self, reqs: list[JobRequest]) -> list[JobOutcome]:
+        if len(reqs) == 1:
+            return [await self.compute(reqs[0])]
+        pool = self._procs
+        try:
+            return await self._run(pool or self._threads, compute_group, reqs)
+        except BrokenProcessPool as exc:
+            self._restart(pool, exc)
+            return [self._error(r, exc) for r in reqs]
+        except Exception as exc:
+            logging.exception("jobs %s: compute failed", [r.job_id for r in reqs])
+            return [self._error(r, exc) for r in reqs]
+
+    async def compute_many(self, requests: Iterable[JobRequest]) -> list[JobOutcome]:
+        """
+        Пачка джоб: группа (счёт, модель) — одна задача пула с одним вызовом модели
+        на джобы одной длины; группы считаются параллельно. Большие джобы
+        (делятся на части) и пакетные — по одной.
+        """
+        groups: dict[tuple[int, str], list[JobRequest]] = defaultdict(list)
+        single: list[JobRequest] = []
+        for r in requests:
+            if r.series is not None or r.data_format == "series" or self._chunked(r):
+                single.append(r)
+            else:
+                groups[(r.account_id, r.model_name)].append(r)
+        results = await asyncio.gather(
+            *(self.compute(r) for r in single), *(self._compute_group(g) for g in groups.values()),
+        )
+        return results[:len(single)] + [o for group in results[len(single):] for o in group]
+
+    @staticmethod
+    def _error(req: JobRequest, exc: BaseException) -> JobOutcome:
+        return JobOutcome(req.job_id, req.account_id, req.model_name, error=f"worker_error: {exc}")
+
+    def shutdown(self) -> None:
+        if self._procs is not None:
+            self._procs.shutdown(wait=True, cancel_futures=True)
+        self._threads.shutdown(wait=True)
@@ -0,0 +1,44 @@
+import os, logging, time
+
+from src.app.infra.db import SessionLocal
+from src.app.infra.repositories import AccountRepo
+from src.app.services.ledger_service import LedgerReconciler
+
+logging.basicConfig(level=logging.INFO)
+
+LEDGER_CHECK_INTERVAL = float(os.getenv("LEDGER_CHECK_INTERVAL", "300"))
+LEDGER_AUTOFIX = os.getenv("LEDGER_AUTOFIX", "0") == "1"
+
+
+def run_once() -> int:
+    db = SessionLocal()
+    try:
+        checker = LedgerReconciler(AccountRepo(db))
+        checker.release_orphan_holds()
+        db.commit()
+
+        mismatches = checker.check()
+        reserved = checker.check_reserved()
+        if LEDGER_AUTOFIX and (mismatches or reserved):
+            fixed = checker.repair(mismatches) + checker.repair_reserved(reserved)
+            db.commit()
+            logging.info("ledger: repaired %d account(s)", fixed)
+        return len(mismatches) + len(reserved)
+    except Exception:
+        db.rollback()
+        logging.exception("ledger check failed")
+        return -1
+    finally:
+        db.close()
+
+
+def main() -> None:
+    while True:
+        found = run_once()
+        if found == 0:
+            logging.info("ledger: all balances match")
+        time.sleep(LEDGER_CHECK_INTERVAL)
+
+
+if __name__ == "__main__":
+    main()
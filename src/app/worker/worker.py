@@ -1,55 +1,248 @@
-import os, json, logging, asyncio
+import os, logging, asyncio
+from dataclasses import replace
 from sqlalchemy.orm import Session
-from faststream.rabbit import RabbitBroker
+from faststream.rabbit import RabbitBroker, Channel
 from faststream import FastStream
 
 from src.app.infra.db import SessionLocal
-from src.app.infra.repositories import AccountRepo, PredictionRepo
-from src.app.services.prediction_service import PredictionService
+from src.app.infra.repositories import AccountRepo, PredictionRepo, ModelStateRepo
+from src.app.services.prediction_service import PredictionService, JobRequest, JobOutcome
+from src.app.domain.enums import JobStatus
+from src.app.worker.batcher import Batcher
+from src.app.worker.executor import WorkerExecutor, WORKER_PROCESSES
+from src.app.infra.ml import registry
+from src.app.infra import blobs, codec, job_events, scheduling
 
 logging.basicConfig(level=logging.INFO)
 
 RABBIT_URL = os.getenv("RABBIT_URL")
 QUEUE_NAME = os.getenv("QUEUE_NAME")
+# модели для загрузки при старте: "*" — все, иначе список через запятую
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "")
+# пакетный режим: до WORKER_BATCH_SIZE джоб в одной транзакции (1 — по одной)
+WORKER_BATCH_SIZE = int(os.getenv("WORKER_BATCH_SIZE", "1"))
+WORKER_BATCH_WAIT_MS = int(os.getenv("WORKER_BATCH_WAIT_MS", "50"))
+# сколько сообщений брокер отдаёт воркеру без ack (одновременно в обработке);
+# делится между очередями мелких и крупных джоб по WORKER_QUEUE_WEIGHTS
+WORKER_PREFETCH = int(os.getenv("WORKER_PREFETCH", str(max(WORKER_BATCH_SIZE, 2 * max(WORKER_PROCESSES, 1)))))
+PREFETCH = scheduling.prefetch_split(WORKER_PREFETCH, scheduling.parse_weights(scheduling.WORKER_QUEUE_WEIGHTS))
 
 broker = RabbitBroker(RABBIT_URL)
 app = FastStream(broker)
 
-@broker.subscriber(QUEUE_NAME)
-async def handle(body: str) -> None:
-    payload = json.loads(body)
-    job_id     = payload["job_id"]
-    account_id = payload["account_id"]
-    model_name = payload["model"]
-    rows       = payload["data"]
+
+executor: WorkerExecutor | None = None
+
+
+@app.on_startup
+def start_executor() -> None:
+    global executor
+    executor = WorkerExecutor(warmup=MODEL_WARMUP)
+    # с пулом процессов модели прогреваются в каждом процессе (initializer)
+    if WORKER_PROCESSES <= 0:
+        loaded = registry.warm_up_spec(MODEL_WARMUP)
+        logging.info("models warmed up: %s; cache: %s", loaded, registry.cache_stats())
+
+
+def _parse(body: bytes | str) -> JobRequest:
+    payload = codec.loads(body)
+    return JobRequest(
+        job_id      = payload["job_id"],
+        account_id  = payload["account_id"],
+        model_name  = payload["model"],
+        raw_rows    = payload.get("data", []),
+        data_ref    = payload.get("data_ref"),
+        data_format = payload.get("data_format", "ndjson"),
+        owner_id    = payload.get("user_id"),
+        series_id   = payload.get("series_id"),
+        series      = payload.get("series"),
+        n_rows      = payload.get("rows"),
+    )
+
+
+def _pending(job_ids: list[int]) -> set[int]:
+    db: Session = SessionLocal()
+    try:
+        statuses = PredictionRepo(db).statuses(job_ids)
+    finally:
+        db.close()
+    return {job_id for job_id, st in statuses.items() if st == JobStatus.PENDING}
+
+
+def _states(keys: list) -> dict:
+    db: Session = SessionLocal()
+    try:
+        return ModelStateRepo(db).get_many(keys)
+    finally:
+        db.close()
+
+
+async def _load_states(reqs: list[JobRequest]) -> list[JobRequest]:
+    """Подставить в запросы с series_id сохранённые состояния рядов."""
+    keys = [(r.owner_id, r.model_name, r.series_id) for r in reqs
+            if r.series_id is not None and r.owner_id is not None]
+    if not keys:
+        return reqs
+    states = await executor.db(_states, keys)
+    return [replace(r, model_state=states.get((r.owner_id, r.model_name, r.series_id))) for r in reqs]
+
+
+def _summaries(job_ids: list[int]):
     db: Session = SessionLocal()
-    svc = PredictionService(AccountRepo(db), PredictionRepo(db))
+    try:
+        return PredictionRepo(db).summaries(job_ids)
+    finally:
+        db.close()
+
 
+async def notify_done(job_ids) -> None:
+    """События о закрытых джобах (клиенты API ждут их вместо опроса); сбой не роняет обработку."""
+    job_ids = sorted(job_ids)
+    if not job_ids:
+        return
     try:
-        job = svc.process_job(
-            job_id=job_id,
-            account_id=account_id,
-            model_name=model_name,
-            raw_rows=rows,
-        )
+        await job_events.publish(broker, await executor.db(_summaries, job_ids))
+    except Exception:
+        logging.exception("failed to publish events for jobs %s", job_ids)
+
+
+def _drop_blobs(refs: list[str]) -> None:
+    for ref in refs:
+        try:
+            blobs.delete(ref)
+        except Exception:
+            logging.exception("failed to delete blob %s", ref)
+
+
+def settle_one(outcome: JobOutcome) -> bool:
+    """True — джоба в конечном статусе (её payload больше не нужен)."""
+    db: Session = SessionLocal()
+    svc = PredictionService(AccountRepo(db), PredictionRepo(db), state_repo=ModelStateRepo(db))
+    job_id = outcome.job_id
+
+    try:
+        job = svc.apply(outcome)
         db.commit()
         logging.info("job %s done: status=%s cost=%s", job.id, job.status, job.cost)
+        return True
 
     except PredictionService.NotEnoughCredits:
         db.commit()
         logging.warning("job %s failed: not enough credits", job_id)
+        return True
+
+    except PredictionService.JobUnavailable:
+        db.rollback()
+        logging.info("job %s is locked by another worker, skipping", job_id)
+        return False
 
     except Exception as exc:
         logging.exception("job %s failed with unexpected error", job_id)
+        db.rollback()
         try:
-            PredictionRepo(db).mark_error(job_id, f"worker_error: {exc}")
+            # джобу могла успеть закрыть повторная доставка — её результат не трогаем
+            status = PredictionRepo(db).claim(job_id)
+            if status == JobStatus.PENDING:
+                PredictionRepo(db).mark_error(job_id, f"worker_error: {exc}")
+                AccountRepo(db).release_hold(job_id)
             db.commit()
+            return status is not None
         except Exception:
             db.rollback()
+            return False
 
     finally:
         db.close()
 
 
+def settle_batch(outcomes: list[JobOutcome]) -> set[int]:
+    """
+    Пачка в одной транзакции; при сбое пачки — откат и запись по одной.
+    Возвращает id джоб в конечном статусе.
+    """
+    db: Session = SessionLocal()
+    svc = PredictionService(AccountRepo(db), PredictionRepo(db), state_repo=ModelStateRepo(db))
+    statuses = None
+    try:
+        statuses = svc.apply_batch(outcomes)
+        db.commit()
+    except Exception:
+        logging.exception("batch of %d jobs failed, falling back to single jobs", len(outcomes))
+        db.rollback()
+    finally:
+        db.close()
+
+    if statuses is None:
+        return {o.job_id for o in outcomes if settle_one(o)}
+
+    done = {job_id for job_id, st in statuses.items() if st is not None}
+    logging.info("batch done: %d jobs, %d locked elsewhere; statuses=%s", len(done), len(statuses) - len(done), statuses)
+    return done
+
+
+async def process_one(req: JobRequest) -> None:
+    # уже обработанные (повторная доставка) не гоняем через модель
+    if req.job_id not in await executor.db(_pending, [req.job_id]):
+        logging.info("job %s is not pending, skipping", req.job_id)
+        finished = True
+    else:
+        [req] = await _load_states([req])
+        outcome = await executor.compute(req)
+        finished = await executor.db(settle_one, outcome)
+        if finished:
+            await notify_done([req.job_id])
+    # payload по ссылке удаляется, только когда джоба закрыта
+    if finished and req.data_ref is not None:
+        await executor.db(_drop_blobs, [req.data_ref])
+
+
+async def process_batch(reqs: list[JobRequest]) -> None:
+    pending = await executor.db(_pending, [r.job_id for r in reqs])
+    todo = await _load_states([r for r in reqs if r.job_id in pending])
+    outcomes = await executor.compute_many(todo)
+    done = await executor.db(settle_batch, outcomes) if outcomes else set()
+    await notify_done(done)
+    refs = {r.data_ref for r in reqs if r.data_ref is not None and (r.job_id in done or r.job_id not in pending)}
+    if refs:
+        await executor.db(_drop_blobs, sorted(refs))
+
+
+batcher = (
+    Batcher(process_batch, max_size=WORKER_BATCH_SIZE, max_wait_ms=WORKER_BATCH_WAIT_MS)
+    if WORKER_BATCH_SIZE > 1 else None
+)
+
+
+@app.on_shutdown
+async def stop_executor() -> None:
+    if batcher is not None:
+        await batcher.close()
+    if executor is not None:
+        executor.shutdown()
+
+
+# event loop только принимает сообщения: БД — в пуле потоков, инференс — в пуле процессов
+async def handle(body: bytes) -> None:
+    req = _parse(body)
+    if batcher is None:
+        await process_one(req)
+    else:
+        await batcher.submit(req)
+
+
+async def handle_large(body: bytes) -> None:
+    # крупные джобы не пакетируются: пачка ждала бы самую долгую
+    await process_one(_parse(body))
+
+
+for _name, _handler in ((scheduling.SMALL, handle), (scheduling.LARGE, handle_large)):
+    if _name in PREFETCH:
+        broker.subscriber(scheduling.queues[_name], channel=Channel(prefetch_count=PREFETCH[_name]))(_handler)
+
+# общая очередь до разделения по размеру: дочитываем оставшиеся в ней сообщения
+if QUEUE_NAME not in (scheduling.QUEUE_NAME_SMALL, scheduling.QUEUE_NAME_LARGE):
+    broker.subscriber(QUEUE_NAME, channel=Channel(prefetch_count=PREFETCH.get(scheduling.SMALL, 1)))(handle)
+
+
 if __name__ == "__main__":
-    asyncio.run(app.run())
\ No newline at end of file
+    asyncio.run(app.run())